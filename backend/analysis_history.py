@@ -0,0 +1,86 @@
+"""
+Crop analysis history with keyset pagination.
+
+Pages are ordered newest first by (timestamp, id) and continue from an opaque
+cursor holding the last row's sort key, so every page is an index range scan
+no matter how deep the client has paged. Image payloads are projected out
+unless asked for.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+# Returned by default; legacy documents may still embed ``image_base64``
+HISTORY_FIELDS = (
+    "id", "disease_name", "confidence", "treatment", "treatment_hi", "state", "timestamp",
+    "image_sha256", "image_size", "image_content_type",
+)
+IMAGE_PAYLOAD_FIELDS = ("image_base64",)
+
+
+async def ensure_history_indexes(collection: AsyncIOMotorCollection) -> None:
+    """Indexes backing the newest-first history listing, with and without a disease filter"""
+    await collection.create_index([("timestamp", -1), ("id", -1)], name="history_timestamp_id")
+    await collection.create_index(
+        [("disease_name", 1), ("timestamp", -1), ("id", -1)], name="history_disease_timestamp_id"
+    )
+
+
+def encode_cursor(timestamp: datetime, record_id: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), record_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of ``encode_cursor``; raises ValueError for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, record_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(record_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+async def list_history(
+    collection: AsyncIOMotorCollection,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    disease: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_image: bool = False
+) -> Dict[str, Any]:
+    """One page of analyses, newest first, plus the cursor for the next page"""
+    query: Dict[str, Any] = {}
+    if disease:
+        query["disease_name"] = disease
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lt"] = end
+    if cursor:
+        after_timestamp, after_id = decode_cursor(cursor)
+        keyset = {"$or": [
+            {"timestamp": {"$lt": after_timestamp}},
+            {"timestamp": after_timestamp, "id": {"$lt": after_id}},
+        ]}
+        query = {"$and": [query, keyset]} if query else keyset
+
+    fields = HISTORY_FIELDS + (IMAGE_PAYLOAD_FIELDS if include_image else ())
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    # One extra row tells us whether another page exists without counting
+    rows: List[Dict[str, Any]] = await collection.find(query, projection).sort(
+        [("timestamp", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"]) if has_more else None
+    return {"items": rows, "next_cursor": next_cursor, "has_more": has_more}
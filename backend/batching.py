@@ -0,0 +1,145 @@
+"""
+Asyncio micro-batching for provider calls.
+
+Concurrent callers submit single items; a background worker groups them into
+batches of up to ``max_batch_size`` items or whatever arrived within
+``max_wait_ms`` of the first item, calls the batch function once, and hands each
+caller its own result.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects concurrent submissions into batches for a batch-capable provider call"""
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Awaitable[List[R]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 25,
+        name: str = "batcher"
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: Optional["asyncio.Queue[Tuple[T, asyncio.Future]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.counters = {
+            "batches": 0,
+            "items": 0,
+            "full_flushes": 0,
+            "timeout_flushes": 0,
+            "errors": 0,
+        }
+        self.size_histogram: Dict[int, int] = {}
+        self.total_batch_seconds = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run(), name=f"{self.name}-worker")
+
+    async def submit(self, item: T) -> R:
+        """Queue one item and wait for its result from the batch it lands in"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Stopped mid-collection: these were taken off the queue, so stop() can't fail them
+                self._fail(batch, RuntimeError(f"{self.name} is shutting down"))
+                raise
+
+            if len(batch) >= self.max_batch_size:
+                self.counters["full_flushes"] += 1
+            else:
+                self.counters["timeout_flushes"] += 1
+
+            # Dispatch without blocking collection of the next batch
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        started = time.perf_counter()
+        try:
+            results = await self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name}: batch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"{self.name} batch of {len(items)} failed: {e}")
+            self._fail(batch, e)
+            return
+        finally:
+            self.total_batch_seconds += time.perf_counter() - started
+            self.counters["batches"] += 1
+            self.counters["items"] += len(items)
+            self.size_histogram[len(items)] = self.size_histogram.get(len(items), 0) + 1
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[T, asyncio.Future]], error: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def stop(self) -> None:
+        """Stop collecting, let in-flight batches finish and fail anything still queued"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        queued = []
+        while self._queue is not None and not self._queue.empty():
+            queued.append(self._queue.get_nowait())
+        self._fail(queued, RuntimeError(f"{self.name} is shutting down"))
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight_batches": len(self._inflight),
+            "avg_batch_size": round(self.counters["items"] / batches, 2) if batches else 0.0,
+            "avg_batch_fill": round(self.counters["items"] / (batches * self.max_batch_size), 4) if batches else 0.0,
+            "avg_batch_ms": round(self.total_batch_seconds * 1000 / batches, 2) if batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.size_histogram.items())},
+        }
@@ -0,0 +1,133 @@
+"""
+Throughput benchmark for crop photo preprocessing.
+
+Runs batches of concurrent uploads through ``ImagePreprocessor`` in each
+execution mode and photo size:
+
+- ``inline``: preprocessing called directly on the event loop, for reference;
+- ``thread``: ``workers=0``;
+- ``process:N``: a pool of N worker processes.
+
+For each run it reports images/s, per-image latency, input and output sizes, and
+event-loop lag. Lag is how late a 5 ms ticker wakes up while the batch runs, so
+it shows whether request handling would have stalled.
+
+    cd backend
+    python benchmarks/bench_image_preprocess.py
+    python benchmarks/bench_image_preprocess.py --megapixels 12 --count 48 --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import latency_summary, run_metadata, write_results  # noqa: E402
+from image_preprocess import ImagePreprocessor, preprocess_image  # noqa: E402
+from load_test import make_photo  # noqa: E402
+
+TICK_SECONDS = 0.005
+
+
+async def measure_loop_lag(lags_ms: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags_ms.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+
+async def run_batch(mode: str, photos: List[bytes], preprocessor: ImagePreprocessor = None) -> Dict[str, Any]:
+    latencies_ms: List[float] = []
+    sizes_out: List[int] = []
+
+    async def one(photo: bytes) -> None:
+        started = time.perf_counter()
+        if preprocessor is None:
+            image = preprocess_image(photo)
+        else:
+            image = await preprocessor.process(photo)
+        latencies_ms.append((time.perf_counter() - started) * 1000)
+        sizes_out.append(len(image.data))
+
+    lags_ms: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_lag(lags_ms, stop))
+    await asyncio.sleep(TICK_SECONDS * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*[one(photo) for photo in photos])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    lag = latency_summary(lags_ms)
+    return {
+        "mode": mode,
+        "images": len(photos),
+        "images_per_s": round(len(photos) / elapsed, 2),
+        **latency_summary(latencies_ms),
+        "avg_bytes_in": round(sum(len(p) for p in photos) / len(photos)),
+        "avg_bytes_out": round(sum(sizes_out) / len(sizes_out)),
+        "loop_lag_p99_ms": lag["p99_ms"],
+        "loop_lag_max_ms": lag["max_ms"],
+    }
+
+
+async def main_async(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": run_metadata(count=args.count, max_side=args.max_side, workers=args.workers),
+        "runs": [],
+    }
+    modes = ["inline", "thread"] + [f"process:{n}" for n in args.workers]
+    for megapixels in args.megapixels:
+        # Distinct photos, so nothing downstream could shortcut on identical bytes
+        variants = [make_photo(megapixels) for _ in range(min(args.count, 4))]
+        photos = [variants[i % len(variants)] for i in range(args.count)]
+        for mode in modes:
+            preprocessor = None
+            if mode != "inline":
+                workers = int(mode.split(":")[1]) if mode.startswith("process") else 0
+                preprocessor = ImagePreprocessor(workers=workers, max_side=args.max_side)
+                await preprocessor.start()
+                # Warm-up image: first-use costs (imports in workers) aren't measured
+                await preprocessor.process(photos[0])
+            try:
+                run = await run_batch(mode, photos, preprocessor)
+            finally:
+                if preprocessor is not None:
+                    await preprocessor.stop()
+            run["megapixels"] = megapixels
+            results["runs"].append(run)
+            print(
+                f"{megapixels:4.0f} MP  {mode:10}  {run['images_per_s']:7.2f} img/s  "
+                f"p50 {run['p50_ms']:8.1f}  p99 {run['p99_ms']:8.1f} ms  "
+                f"{run['avg_bytes_in'] / 1024:7.0f} -> {run['avg_bytes_out'] / 1024:5.0f} KB  "
+                f"loop lag p99 {run['loop_lag_p99_ms']:7.1f}  max {run['loop_lag_max_ms']:7.1f} ms"
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kisan AI image preprocessing benchmark")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[4, 8, 12])
+    parser.add_argument("--count", type=int, default=24, help="Concurrent uploads per run")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=sorted({1, min(4, os.cpu_count() or 1)}),
+        help="Process pool sizes to compare"
+    )
+    parser.add_argument("--max-side", type=int, default=1280)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/image_preprocess-<time>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    path = write_results("image_preprocess", results, args.output)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Shared helpers for the backend benchmarks: loading the app in-process against a
+MongoDB stand-in, latency percentiles, memory sampling and JSON result files.
+"""
+
+import asyncio
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def load_server(mongo_url: Optional[str] = None):
+    """Import ``server`` for in-process benchmarking
+
+    Without ``mongo_url`` the app runs against mongomock-motor (from
+    requirements-dev.txt): an in-memory MongoDB stand-in, so no database server
+    is needed. Image and TTS blobs go to
+    a temporary directory either way, and so does the reference data snapshot.
+    """
+    scratch = Path(tempfile.mkdtemp(prefix="kisan-bench-"))
+    os.environ["MONGO_URL"] = mongo_url or "mongodb://localhost:27017"
+    os.environ.setdefault("DB_NAME", "kisan_benchmark")
+    os.environ["IMAGE_STORE_BACKEND"] = "local"
+    os.environ["IMAGE_STORE_DIR"] = str(scratch / "images")
+    os.environ["TTS_CACHE_DIR"] = str(scratch / "tts")
+    os.environ["REFERENCE_SNAPSHOT_PATH"] = str(scratch / "reference.snapshot")
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+    import server
+
+    if mongo_url is None:
+        _use_mongo_standin(server)
+    return server
+
+
+def _use_mongo_standin(server) -> None:
+    from mongomock_motor import AsyncMongoMockClient
+    from price_history import PRICE_HISTORY_COLLECTION
+
+    client = AsyncMongoMockClient()
+    db = client[os.environ["DB_NAME"]]
+    server.client = client
+    server.db = db
+    if server.vision_cache.collection is not None:
+        server.vision_cache.collection = db.vision_cache
+    server.translation_memory.collection = db.translation_memory
+    server.crop_analysis_writer.collection = db.crop_analyses
+
+    # mongomock has no time-series collections; a regular collection with the same indexes stands in
+    async def ensure_price_history_collection(database) -> None:
+        await database[PRICE_HISTORY_COLLECTION].create_index(
+            [("meta.commodity", 1), ("meta.state", 1), ("date", 1)]
+        )
+
+    server.ensure_price_history_collection = ensure_price_history_collection
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    values = sorted(latencies_ms)
+    return {
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+    }
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # No procfs (macOS): fall back to the peak, which is the best we have
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+class MemorySampler:
+    """Samples RSS in the background to report the peak during a run"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            self.peak_mb = max(self.peak_mb, rss_mb())
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> "MemorySampler":
+        self.start_mb = self.peak_mb = rss_mb()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        self.end_mb = rss_mb()
+        self.peak_mb = max(self.peak_mb, self.end_mb)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "rss_start_mb": round(self.start_mb, 1),
+            "rss_peak_mb": round(self.peak_mb, 1),
+            "rss_end_mb": round(self.end_mb, 1),
+        }
+
+
+def run_metadata(**settings: Any) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **settings,
+    }
+
+
+def write_results(name: str, results: Dict[str, Any], output: Optional[str] = None) -> Path:
+    if output:
+        path = Path(output)
+    else:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{name}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
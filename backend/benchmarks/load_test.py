@@ -0,0 +1,286 @@
+"""
+Concurrent load test for every /api route, run in-process.
+
+Each scenario is driven open-loop at a fixed request rate for a fixed time:
+requests start on schedule whether or not earlier ones have finished, and
+latency is measured from the scheduled start, so queueing inside the app shows
+up in the numbers instead of silently lowering the offered load. Payloads are
+realistic in size (multi-MB photos, base64 audio clips, batches of strings).
+
+    cd backend
+    python benchmarks/load_test.py                       # all scenarios, 20 rps for 5 s each
+    python benchmarks/load_test.py --rps 100 --duration 10 --only crop translate
+    python benchmarks/load_test.py --compare benchmarks/results/load_test-<before>.json
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017
+
+Results (p50/p95/p99 latency, throughput, errors and memory per scenario) are
+printed and saved as JSON under benchmarks/results/.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common import MemorySampler, latency_summary, load_server, run_metadata, write_results  # noqa: E402
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str
+    # Called with the request number; returns extra httpx.request kwargs
+    build: Optional[Callable[[int], Dict[str, Any]]] = None
+    # Routes that need features the in-memory MongoDB stand-in lacks
+    needs_real_mongo: bool = False
+
+
+def make_photo(megapixels: float) -> bytes:
+    """A JPEG about the size of a phone photo of that resolution"""
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    # Upscaled noise: textured like foliage, so it compresses like a real photo rather than a flat fill
+    texture = Image.frombytes("RGB", (width // 8, height // 8), os.urandom((width // 8) * (height // 8) * 3))
+    buffer = io.BytesIO()
+    texture.resize((width, height), Image.BILINEAR).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def build_scenarios(photo_megapixels: float, audio_seconds: float, unique_images: bool) -> List[Scenario]:
+    photo = make_photo(photo_megapixels)
+    photo_base64 = base64.b64encode(photo).decode("ascii")
+    # 16 kHz 16-bit mono, as a phone recorder would upload it
+    audio_base64 = base64.b64encode(os.urandom(int(audio_seconds * 32000))).decode("ascii")
+
+    def photo_for(i: int) -> bytes:
+        if not unique_images:
+            return photo
+        # Trailing bytes give every request its own SHA-256, so none is coalesced with another. The
+        # pixels (and so the perceptual hash) don't change; main() turns the vision cache off for that.
+        return photo + i.to_bytes(8, "big")
+
+    batch_texts = [f"Apply neem oil spray every {i} days" for i in range(50)]
+    scheme_text = "Pradhan Mantri Kisan Samman Nidhi provides income support of Rs 6000 per year to farmer families."
+
+    return [
+        Scenario("root", "GET", "/api/"),
+        Scenario("languages", "GET", "/api/languages"),
+        Scenario("i18n_bundle", "GET", "/api/i18n/hi"),
+        Scenario("government_schemes", "GET", "/api/government-schemes", lambda i: {"params": {"language": "hi"}}),
+        Scenario("farm_tasks", "GET", "/api/farm-tasks", lambda i: {"params": {"language": "hi"}}),
+        Scenario("market_prices_state", "GET", "/api/market-prices/Punjab", lambda i: {"params": {"language": "hi"}}),
+        Scenario("market_prices_crop", "GET", "/api/market-prices", lambda i: {"params": {"crop": "Wheat"}}),
+        Scenario("market_top_spreads", "GET", "/api/market-analytics/top-spreads", lambda i: {"params": {"n": 10}}),
+        Scenario("market_national", "GET", "/api/market-analytics/national"),
+        Scenario("market_trend", "GET", "/api/market-trends/Punjab/Wheat"),
+        Scenario(
+            "price_history", "GET", "/api/price-history",
+            lambda i: {"params": {"commodity": "Wheat", "interval": "week"}}, needs_real_mongo=True
+        ),
+        Scenario(
+            "crop_disease_multipart", "POST", "/api/analyze-crop-disease",
+            lambda i: {"files": {"image": ("crop.jpg", photo_for(i), "image/jpeg")}, "data": {"state": "Punjab"}}
+        ),
+        Scenario(
+            "crop_disease_base64", "POST", "/api/analyze-crop-disease",
+            # Older clients post the base64 string as a multipart form field
+            lambda i: {"files": {"image_base64": (None, photo_base64)}, "data": {"language": "hi"}}
+        ),
+        Scenario(
+            "crop_disease_raw", "POST", "/api/analyze-crop-disease/raw",
+            lambda i: {"content": photo_for(i), "headers": {"Content-Type": "image/jpeg"}}
+        ),
+        Scenario("crop_analyses", "GET", "/api/crop-analyses", lambda i: {"params": {"limit": 20}}),
+        Scenario("disease_outbreaks", "GET", "/api/disease-outbreaks"),
+        Scenario(
+            "translate", "POST", "/api/translate",
+            lambda i: {"json": {"text": f"Market Prices {i % 100}", "target_language": "hi"}}
+        ),
+        Scenario(
+            "translate_batch", "POST", "/api/translate/batch",
+            lambda i: {"json": {"texts": batch_texts, "target_language": "ta"}}
+        ),
+        Scenario(
+            "speech_to_text", "POST", "/api/voice/speech-to-text",
+            lambda i: {"json": {"audio_base64": audio_base64, "language": "hi"}}
+        ),
+        Scenario(
+            "voice_assistant", "POST", "/api/voice/assistant",
+            lambda i: {"json": {"audio_base64": audio_base64, "language": "hi"}}
+        ),
+        Scenario(
+            "text_to_speech", "POST", "/api/voice/text-to-speech",
+            lambda i: {"data": {"text": scheme_text, "language": "hi"}}
+        ),
+        Scenario(
+            "text_to_speech_range", "GET", "/api/voice/text-to-speech",
+            lambda i: {"params": {"text": scheme_text, "language": "hi"}, "headers": {"Range": "bytes=0-65535"}}
+        ),
+        Scenario("cache_stats", "GET", "/api/cache-stats"),
+        Scenario("batch_stats", "GET", "/api/batch-stats"),
+        Scenario("write_stats", "GET", "/api/write-stats"),
+        Scenario("metrics", "GET", "/api/metrics"),
+    ]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, rps: float, duration: float, max_in_flight: int
+) -> Dict[str, Any]:
+    total = max(1, int(rps * duration))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    request_bytes = 0
+    response_bytes = 0
+    in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def one(i: int, scheduled: float) -> None:
+        nonlocal request_bytes, response_bytes
+        kwargs = scenario.build(i) if scenario.build else {}
+        async with in_flight:
+            try:
+                request = client.build_request(scenario.method, scenario.path, **kwargs)
+                request_bytes += len(request.read())
+                response = await client.send(request)
+                response_bytes += len(response.content)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    async with MemorySampler() as memory:
+        started = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "method": scenario.method,
+        "path": scenario.path,
+        "requests": total,
+        "offered_rps": rps,
+        "throughput_rps": round(total / elapsed, 2),
+        "errors": errors,
+        "statuses": statuses,
+        "avg_request_bytes": round(request_bytes / total),
+        "avg_response_bytes": round(response_bytes / total),
+        **latency_summary(latencies),
+        **memory.summary(),
+    }
+
+
+def compare(results: Dict[str, Any], baseline_path: str, threshold: float) -> int:
+    """Print p95/p99 changes against a previous run; returns the number of regressions"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["scenarios"]
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (regression threshold {threshold:.0%}):")
+    print(f"{'scenario':28} {'p95 before':>11} {'p95 after':>10} {'p99 before':>11} {'p99 after':>10}")
+    for name, current in results["scenarios"].items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        flag = ""
+        if current["p95_ms"] > before["p95_ms"] * (1 + threshold) and current["p95_ms"] - before["p95_ms"] > 1:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{name:28} {before['p95_ms']:>11.2f} {current['p95_ms']:>10.2f} "
+            f"{before['p99_ms']:>11.2f} {current['p99_ms']:>10.2f}{flag}"
+        )
+    return regressions
+
+
+async def main_async(args) -> Dict[str, Any]:
+    server = load_server(args.mongo_url)
+    scenarios = build_scenarios(args.photo_megapixels, args.audio_seconds, args.unique_images)
+    if args.only:
+        scenarios = [s for s in scenarios if any(pattern in s.name for pattern in args.only)]
+    if args.mongo_url is None:
+        skipped = [s.name for s in scenarios if s.needs_real_mongo]
+        if skipped:
+            print(f"Skipping (need a real MongoDB, pass --mongo-url): {', '.join(skipped)}")
+        scenarios = [s for s in scenarios if not s.needs_real_mongo]
+
+    results: Dict[str, Any] = {
+        "meta": run_metadata(
+            rps=args.rps,
+            duration_s=args.duration,
+            max_in_flight=args.max_in_flight,
+            photo_megapixels=args.photo_megapixels,
+            audio_seconds=args.audio_seconds,
+            unique_images=args.unique_images,
+            mongo="real" if args.mongo_url else "mongomock",
+        ),
+        "scenarios": {},
+    }
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            for scenario in scenarios:
+                # One warm-up request so one-time work (cache fills, lazy workers) isn't measured
+                await client.request(scenario.method, scenario.path, **(scenario.build(0) if scenario.build else {}))
+                summary = await run_scenario(client, scenario, args.rps, args.duration, args.max_in_flight)
+                results["scenarios"][scenario.name] = summary
+                print(
+                    f"{scenario.name:28} p50 {summary['p50_ms']:8.2f}  p95 {summary['p95_ms']:8.2f}  "
+                    f"p99 {summary['p99_ms']:8.2f} ms  {summary['throughput_rps']:7.1f} rps  "
+                    f"errors {summary['errors']:3d}  rss {summary['rss_peak_mb']:7.1f} MB"
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kisan AI backend load test")
+    parser.add_argument("--rps", type=float, default=20, help="Offered requests per second per scenario")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per scenario")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Cap on concurrent requests")
+    parser.add_argument("--only", nargs="+", help="Run scenarios whose name contains any of these")
+    parser.add_argument("--photo-megapixels", type=float, default=8)
+    parser.add_argument("--audio-seconds", type=float, default=8)
+    parser.add_argument(
+        "--unique-images", action="store_true",
+        help="Send a distinct image on every request with the vision cache off, so each one runs the vision call"
+    )
+    parser.add_argument("--mongo-url", help="Benchmark against a real MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/load_test-<time>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare p95/p99 against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p95 increase that counts as a regression")
+    args = parser.parse_args()
+
+    # Configured before the app is imported, so its INFO-level basicConfig doesn't log every request
+    logging.basicConfig(level=logging.WARNING)
+    if args.unique_images:
+        # Read when the app is imported; neither the in-memory nor the persistent tier can answer
+        os.environ["VISION_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["VISION_CACHE_PERSIST"] = "false"
+    results = asyncio.run(main_async(args))
+    path = write_results("load_test", results, args.output)
+    print(f"\nResults written to {path}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
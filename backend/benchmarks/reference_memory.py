@@ -0,0 +1,168 @@
+"""
+Per-worker memory cost of reference data: a private copy in every worker vs one shared snapshot.
+
+Starts ``--workers`` processes holding a synthetic price table of ``--rows``
+(state, commodity) rows, in two modes:
+
+- ``copy``: every worker builds the state dict and ``PriceTable`` itself, as
+  each server worker did before snapshots;
+- ``shared``: the table is published once as a snapshot, and every worker maps
+  it with ``ReferenceStore``.
+
+All workers hold their data at the same time while memory is sampled from
+``/proc/self/smaps_rollup`` (Linux only). Reported per worker:
+
+- private MB: memory that is only this worker's;
+- PSS MB: shared pages split evenly between the processes mapping them.
+
+Both are measured relative to the worker's own baseline after imports. Load
+time and a national aggregate query are timed as well, to show that reading
+from the mapping doesn't slow queries down.
+
+    cd backend
+    python benchmarks/reference_memory.py
+    python benchmarks/reference_memory.py --rows 1000000 --workers 8
+"""
+
+import argparse
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import run_metadata, write_results  # noqa: E402
+from price_table import PriceTable  # noqa: E402
+from reference_snapshot import ReferenceStore  # noqa: E402
+
+STATES = 36
+
+
+def synthetic_state_data(rows: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Deterministic STATE_MSP_DATA-shaped data with about ``rows`` rows"""
+    per_state = max(1, rows // STATES)
+    return {
+        f"State {s}": [
+            {
+                "name": f"Commodity {c}",
+                "name_hi": f"वस्तु {c}",
+                "name_local": f"Local {s}-{c % 50}",
+                "msp": 1000 + (c * 37) % 9000,
+                "mandi": 950 + (c * 37 + s * 11) % 9200,
+            }
+            for c in range(per_state)
+        ]
+        for s in range(STATES)
+    }
+
+
+def memory_mb() -> Dict[str, float]:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+    }
+
+
+def worker(mode: str, rows: int, snapshot_path: str, barrier, results) -> None:
+    baseline = memory_mb()
+    started = time.perf_counter()
+    if mode == "copy":
+        state_data = synthetic_state_data(rows)
+        table = PriceTable.from_state_data(state_data)
+    else:
+        store = ReferenceStore(Path(snapshot_path))
+        store.refresh(force=True)
+        table = store.current().price_table
+    # Read every column once so the mapped pages are resident, as they are in a serving worker
+    float(np.nansum(table.msp) + np.nansum(table.mandi) + np.nansum(table.spread) + np.nansum(table.margin))
+    load_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(5):
+        query_started = time.perf_counter()
+        table.national_aggregates()
+        timings.append((time.perf_counter() - query_started) * 1000)
+
+    # Measure while every worker holds its data, so shared pages are counted as shared
+    barrier.wait()
+    held = memory_mb()
+    barrier.wait()
+    results.put({
+        "private_mb": held["private_mb"] - baseline["private_mb"],
+        "pss_mb": held["pss_mb"] - baseline["pss_mb"],
+        "load_ms": load_ms,
+        "national_aggregates_ms": statistics.median(timings),
+    })
+
+
+def run_mode(mode: str, rows: int, workers: int, snapshot_path: str) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, rows, snapshot_path, barrier, results)) for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    def mean(field: str) -> float:
+        return round(sum(sample[field] for sample in samples) / len(samples), 2)
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "private_mb_per_worker": mean("private_mb"),
+        "pss_mb_per_worker": mean("pss_mb"),
+        "pss_mb_total": round(sum(sample["pss_mb"] for sample in samples), 2),
+        "load_ms": mean("load_ms"),
+        "national_aggregates_ms": mean("national_aggregates_ms"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kisan AI reference data memory benchmark")
+    parser.add_argument("--rows", type=int, default=300_000, help="Price rows (state x commodity)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/reference_memory-<time>.json)")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"meta": run_metadata(rows=args.rows, workers=args.workers), "runs": []}
+    with tempfile.TemporaryDirectory(prefix="kisan-reference-") as scratch:
+        snapshot_path = str(Path(scratch) / "reference.snapshot")
+        store = ReferenceStore(Path(snapshot_path))
+        published = store.ensure(synthetic_state_data(args.rows), schemes=[])
+        results["meta"]["snapshot_bytes"] = published.snapshot.size
+        print(f"{len(published.price_table)} rows, snapshot {published.snapshot.size / 2 ** 20:.1f} MB")
+        del published, store
+
+        for mode in ("copy", "shared"):
+            run = run_mode(mode, args.rows, args.workers, snapshot_path)
+            results["runs"].append(run)
+            print(
+                f"{mode:7} x{run['workers']}  private {run['private_mb_per_worker']:7.1f} MB/worker  "
+                f"PSS {run['pss_mb_per_worker']:7.1f} MB/worker ({run['pss_mb_total']:7.1f} total)  "
+                f"load {run['load_ms']:8.1f} ms  national aggregates {run['national_aggregates_ms']:6.1f} ms"
+            )
+
+    path = write_results("reference_memory", results, args.output)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Before/after benchmark for response serialization on the hot read paths.
+
+"before" replays what these routes used to do on every request:
+- build the payload (``FarmTask`` models for /farm-tasks);
+- run it through FastAPI's ``jsonable_encoder``;
+- encode it with the stdlib ``json`` module, as ``JSONResponse`` does.
+
+"after" is what they do now: reuse bodies serialized once per language, or
+encode dynamic payloads straight to bytes with orjson.
+
+Both sides are checked to produce the same JSON before timing.
+
+    cd backend
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --seconds 2
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common import load_server, run_metadata, write_results  # noqa: E402
+
+
+class Case(NamedTuple):
+    name: str
+    before: Callable[[], bytes]
+    after: Callable[[], bytes]
+    # Fields that legitimately differ between the two (e.g. random ids in the old code)
+    ignore: tuple = ()
+
+
+def stdlib_json_response(payload: Any) -> bytes:
+    """What a dict return value used to cost: jsonable_encoder + JSONResponse.render"""
+    from fastapi.encoders import jsonable_encoder
+
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def build_cases(server) -> List[Case]:
+    from fastapi.responses import ORJSONResponse
+
+    def legacy_farm_tasks(language: str) -> Dict[str, Any]:
+        tasks = [
+            server.FarmTask(
+                task_name=task["task_name"],
+                task_name_local=server.localized(task, "task_name", language),
+                description=server.localized(task, "description", language),
+                description_local=server.localized(task, "description", language),
+                due_date=task["due_date"],
+                priority=task["priority"]
+            )
+            for task in server.MOCK_FARM_TASKS
+        ]
+        return {"success": True, "tasks": [task.model_dump() for task in tasks]}
+
+    def orjson_body(payload: Any) -> bytes:
+        return ORJSONResponse(payload).body
+
+    reference = server.reference_store.current()
+    price_table, version = reference.price_table, reference.version
+    scheme_body = server.encode_json(server.scheme_payload(reference.schemes, "hi"))
+    return [
+        Case(
+            "languages",
+            lambda: stdlib_json_response({"success": True, "languages": server.SUPPORTED_LANGUAGES}),
+            lambda: server.LANGUAGES_BODY.body
+        ),
+        Case(
+            "government_schemes_hi",
+            lambda: stdlib_json_response(server.scheme_payload(reference.schemes, "hi")),
+            # The body the catalog cache holds for a language after its first request
+            lambda: scheme_body
+        ),
+        Case(
+            "farm_tasks_hi",
+            lambda: stdlib_json_response(legacy_farm_tasks("hi")),
+            lambda: server.FARM_TASK_BODIES[server.normalize_language("hi")].body,
+            ignore=("id",)
+        ),
+        Case(
+            "market_prices_across_states",
+            lambda: stdlib_json_response({
+                "success": True, "crop": "Wheat", "prices": price_table.crop_across_states("Wheat"),
+                "data_version": version
+            }),
+            lambda: orjson_body({
+                "success": True, "crop": "Wheat", "prices": price_table.crop_across_states("Wheat"),
+                "data_version": version
+            })
+        ),
+        Case(
+            "market_analytics_national",
+            lambda: stdlib_json_response({
+                "success": True, "crops": price_table.national_aggregates(), "data_version": version
+            }),
+            lambda: orjson_body({
+                "success": True, "crops": price_table.national_aggregates(), "data_version": version
+            })
+        ),
+        Case(
+            "top_spreads_100",
+            lambda: stdlib_json_response({
+                "success": True, "by": "margin", "results": price_table.top_spreads(100, None, "margin"),
+                "data_version": version
+            }),
+            lambda: orjson_body({
+                "success": True, "by": "margin", "results": price_table.top_spreads(100, None, "margin"),
+                "data_version": version
+            })
+        ),
+    ]
+
+
+def _strip(value: Any, ignore: tuple) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip(v, ignore) for k, v in value.items() if k not in ignore}
+    if isinstance(value, list):
+        return [_strip(v, ignore) for v in value]
+    return value
+
+
+def time_per_call(fn: Callable[[], bytes], seconds: float) -> float:
+    """Mean microseconds per call, over batches until ``seconds`` have passed"""
+    calls = 0
+    batch = 1
+    started = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            fn()
+        calls += batch
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return elapsed / calls * 1e6
+        batch = min(batch * 2, 10_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kisan AI response serialization benchmark")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Timing budget per case and side")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/serialization-<time>.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    server = load_server()
+    results: Dict[str, Any] = {"meta": run_metadata(seconds=args.seconds), "cases": {}}
+    for case in build_cases(server):
+        before, after = json.loads(case.before()), json.loads(case.after())
+        if _strip(before, case.ignore) != _strip(after, case.ignore):
+            raise SystemExit(f"{case.name}: before and after payloads differ")
+
+        before_us = time_per_call(case.before, args.seconds)
+        after_us = time_per_call(case.after, args.seconds)
+        results["cases"][case.name] = {
+            "bytes": len(case.after()),
+            "before_us": round(before_us, 2),
+            "after_us": round(after_us, 3),
+            "speedup": round(before_us / after_us, 1),
+        }
+        print(f"{case.name:30} before {before_us:9.2f} us   after {after_us:8.3f} us   x{before_us / after_us:8.1f}")
+
+    path = write_results("serialization", results, args.output)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Disease outbreak rollups: analysis counts per (state, disease, day).
+
+Every batch of analyses written to ``crop_analyses`` is folded into the
+``disease_rollups`` collection with one ``$inc`` upsert per bucket, so the
+outbreak dashboard reads a few hundred small documents instead of aggregating
+the raw analyses. Daily buckets are combined into weeks on read. Backfills and
+repairs recompute the rollups from ``crop_analyses`` on the server:
+
+    python disease_rollups.py rebuild [--since 2024-01-01]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "disease_rollups"
+ROLLUP_INTERVALS = ("day", "week")
+UNKNOWN_STATE = "Unknown"
+
+
+def _day(timestamp: datetime) -> datetime:
+    """Start of the UTC day containing ``timestamp``, naive like the dates MongoDB returns"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _week(day: datetime) -> datetime:
+    # Weeks start on Monday
+    return day - timedelta(days=day.weekday())
+
+
+def rollup_id(state: str, disease: str, day: datetime) -> str:
+    return f"{day:%Y-%m-%d}|{state}|{disease}"
+
+
+async def ensure_rollup_indexes(collection: AsyncIOMotorCollection) -> None:
+    await collection.create_index([("day", 1), ("state", 1), ("disease", 1)])
+
+
+def rollup_operations(analyses: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """One upsert per (state, disease, day) bucket touched by ``analyses``"""
+    buckets: Dict[Tuple[str, str, datetime], Dict[str, Any]] = {}
+    for analysis in analyses:
+        key = (analysis.get("state") or UNKNOWN_STATE, analysis["disease_name"], _day(analysis["timestamp"]))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {"count": 0, "confidence_sum": 0.0, "last_seen": analysis["timestamp"]}
+        bucket["count"] += 1
+        bucket["confidence_sum"] += analysis["confidence"]
+        bucket["last_seen"] = max(bucket["last_seen"], analysis["timestamp"])
+
+    return [
+        UpdateOne(
+            {"_id": rollup_id(state, disease, day)},
+            {
+                "$setOnInsert": {"state": state, "disease": disease, "day": day},
+                "$inc": {"count": bucket["count"], "confidence_sum": bucket["confidence_sum"]},
+                "$max": {"last_seen": bucket["last_seen"]},
+            },
+            upsert=True
+        )
+        for (state, disease, day), bucket in buckets.items()
+    ]
+
+
+async def apply_rollups(collection: AsyncIOMotorCollection, analyses: List[Dict[str, Any]]) -> None:
+    """Fold newly written analyses into the rollups"""
+    operations = rollup_operations(analyses)
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+
+async def rebuild_rollups(db: AsyncIOMotorDatabase, since: Optional[datetime] = None) -> int:
+    """Recompute rollups from crop_analyses (all of it, or from ``since``); returns the bucket count"""
+    rollups = db[ROLLUP_COLLECTION]
+    match: Dict[str, Any] = {}
+    if since is not None:
+        since = _day(since)
+        match["timestamp"] = {"$gte": since}
+        await rollups.delete_many({"day": {"$gte": since}})
+    else:
+        await rollups.delete_many({})
+
+    state = {"$ifNull": ["$state", UNKNOWN_STATE]}
+    # The UTC day, as _day computes it for incremental updates
+    day = {"$dateFromParts": {
+        "year": {"$year": "$timestamp"}, "month": {"$month": "$timestamp"}, "day": {"$dayOfMonth": "$timestamp"},
+    }}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"state": state, "disease": "$disease_name", "day": day},
+            "count": {"$sum": 1},
+            "confidence_sum": {"$sum": "$confidence"},
+            "last_seen": {"$max": "$timestamp"},
+        }},
+        {"$project": {
+            "_id": {"$concat": [
+                {"$dateToString": {"date": "$_id.day", "format": "%Y-%m-%d"}}, "|", "$_id.state", "|", "$_id.disease",
+            ]},
+            "state": "$_id.state",
+            "disease": "$_id.disease",
+            "day": "$_id.day",
+            "count": 1,
+            "confidence_sum": 1,
+            "last_seen": 1,
+        }},
+        # Merge rather than insert: analyses written during the rebuild may have re-created buckets
+        {"$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    await db.crop_analyses.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    await ensure_rollup_indexes(rollups)
+    query = {"day": {"$gte": since}} if since is not None else {}
+    return await rollups.count_documents(query)
+
+
+async def query_outbreaks(
+    collection: AsyncIOMotorCollection,
+    start: datetime,
+    end: datetime,
+    interval: str = "week",
+    state: Optional[str] = None,
+    disease: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Counts and average confidence per (state, disease, period) from the rollups only"""
+    query: Dict[str, Any] = {"day": {"$gte": _day(start), "$lt": end}}
+    if state:
+        query["state"] = state
+    if disease:
+        query["disease"] = disease
+    projection = {"_id": 0, "state": 1, "disease": 1, "day": 1, "count": 1, "confidence_sum": 1, "last_seen": 1}
+
+    periods: Dict[Tuple[str, str, datetime], Dict[str, Any]] = {}
+    async for rollup in collection.find(query, projection):
+        period_start = _week(rollup["day"]) if interval == "week" else rollup["day"]
+        key = (rollup["state"], rollup["disease"], period_start)
+        period = periods.get(key)
+        if period is None:
+            period = periods[key] = {"count": 0, "confidence_sum": 0.0, "last_seen": rollup["last_seen"]}
+        period["count"] += rollup["count"]
+        period["confidence_sum"] += rollup["confidence_sum"]
+        period["last_seen"] = max(period["last_seen"], rollup["last_seen"])
+
+    rows = [
+        {
+            "state": state,
+            "disease": disease,
+            "period_start": period_start.date().isoformat(),
+            "count": period["count"],
+            "avg_confidence": round(period["confidence_sum"] / period["count"], 4),
+            "last_seen": period["last_seen"].isoformat(),
+        }
+        for (state, disease, period_start), period in periods.items()
+    ]
+    rows.sort(key=lambda row: (row["period_start"], -row["count"], row["state"], row["disease"]))
+    return rows
+
+
+async def _run_command(args) -> None:
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    try:
+        if args.command == "rebuild":
+            since = datetime.fromisoformat(args.since) if args.since else None
+            buckets = await rebuild_rollups(db, since)
+            print(f"Rebuilt {buckets} disease rollup buckets")
+    finally:
+        client.close()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Kisan AI disease outbreak rollups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Recompute rollups from crop_analyses")
+    rebuild.add_argument("--since", help="Only rebuild buckets from this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / ".env")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_command(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Conditional GET and pre-compressed response bodies.
+
+A ``CachedBody`` wraps a serialized payload with its ETag and Last-Modified
+time and keeps each compressed variant (gzip, and brotli when the ``brotli``
+package is installed) after the first time it is produced. ``cached_response``
+answers ``If-None-Match`` / ``If-Modified-Since`` with 304 and otherwise picks
+the encoding the client ranks highest. Each encoding is served with its own
+ETag (``"<hash>-gzip"``), since caches may only treat byte-identical responses
+as interchangeable. ``file_response`` streams an open file and serves single
+``Range`` requests with 206 Partial Content.
+"""
+
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip only
+    brotli = None
+
+MIN_COMPRESS_BYTES = 512
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Cache-Control policies per kind of payload
+CACHE_STATIC = "public, max-age=86400"
+CACHE_CATALOG = "public, max-age=3600"
+CACHE_PRICES = "public, max-age=300, must-revalidate"
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+class CachedBody:
+    """A serialized response body with validators and memoized compressed variants"""
+
+    __slots__ = ("body", "etag", "last_modified", "_encoded")
+
+    def __init__(self, body: bytes, last_modified: Optional[datetime] = None, etag: Optional[str] = None):
+        self.body = body
+        self.etag = etag or f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        last_modified = last_modified or datetime.now(timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        self.last_modified = last_modified.replace(microsecond=0)
+        self._encoded: Dict[str, bytes] = {}
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """ETag of one encoding of the body; each is a different representation, so each gets its own"""
+        if encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def encoded(self, encoding: str) -> bytes:
+        variant = self._encoded.get(encoding)
+        if variant is None:
+            variant = self._encoded[encoding] = _compress(self.body, encoding)
+        return variant
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def _negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The accepted encoding with the highest q-value; None to send the body uncompressed"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    # Identity only competes when the client ranks it; on a tie the smaller encoding wins
+    best, best_quality = None, accepted.get("identity", wildcard if "*" in accepted else 0.0)
+    for encoding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        quality = accepted.get(encoding, wildcard)
+        if quality > 0 and (quality > best_quality or (best is None and quality == best_quality)):
+            best, best_quality = encoding, quality
+    return best
+
+
+def cached_response(
+    request: Request,
+    cached: CachedBody,
+    cache_control: str,
+    media_type: str = "application/json"
+) -> Response:
+    """Serve ``cached`` honoring conditional request headers and Accept-Encoding"""
+    encoding = None
+    if len(cached.body) >= MIN_COMPRESS_BYTES:
+        encoding = _negotiate_encoding(request.headers.get("accept-encoding", ""))
+    etag = cached.etag_for(encoding)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(cached.last_modified, usegmt=True),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif "if-modified-since" in request.headers:
+        if _not_modified_since(request.headers["if-modified-since"], cached.last_modified):
+            return Response(status_code=304, headers=headers)
+
+    if encoding is None:
+        return Response(content=cached.body, media_type=media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=cached.encoded(encoding), media_type=media_type, headers=headers)
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single ``bytes=`` range; None means serve the whole file
+
+    Raises ValueError when the range can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # Other units and multipart ranges: fall back to the full body
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def _iter_file(f: BinaryIO, start: int, length: int) -> Iterator[bytes]:
+    # Sync generator: Starlette iterates it in the threadpool
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    file: BinaryIO,
+    etag: str,
+    cache_control: str,
+    media_type: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Stream an open file with byte-range support, so media can start playing while it downloads
+
+    Takes ownership of ``file``. Reading from the open handle keeps working if the file is
+    replaced or removed meanwhile (e.g. evicted from a cache by another process).
+    """
+    size = os.fstat(file.fileno()).st_size
+    headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        file.close()
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            file.close()
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_iter_file(file, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_file(file, start, end - start + 1), status_code=206, media_type=media_type, headers=headers
+    )
@@ -0,0 +1,185 @@
+"""
+Shared outbound HTTP connection pools for the provider APIs.
+
+Each upstream (Gemini, Translate, Vertex speech) gets one long-lived
+``httpx.AsyncClient`` with keep-alive connections. It is opened when the app
+starts and closed when it stops, so provider calls reuse warm TCP/TLS
+connections instead of paying a handshake per request. HTTP/2 is negotiated when
+the optional ``h2`` package is installed (``pip install httpx[http2]``); one
+HTTP/2 connection then multiplexes many concurrent calls.
+
+Pool limits come from ``UPSTREAM_<NAME>_<FIELD>`` environment overrides, e.g.
+``UPSTREAM_TRANSLATE_MAX_CONNECTIONS=64``.
+"""
+
+import importlib.util
+import logging
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+import httpcore
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class UpstreamConfig(NamedTuple):
+    base_url: str
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 90.0
+    connect_timeout: float = 5.0
+    http2: bool = True
+
+    @classmethod
+    def from_env(cls, name: str, **defaults: Any) -> "UpstreamConfig":
+        """Config with ``UPSTREAM_<NAME>_<FIELD>`` environment overrides applied to ``defaults``"""
+        config = cls(**defaults)
+        overrides = {}
+        for field, default in config._asdict().items():
+            raw = os.environ.get(f"UPSTREAM_{name.upper()}_{field.upper()}")
+            if raw is None:
+                continue
+            if isinstance(default, bool):
+                overrides[field] = raw.lower() in ("1", "true", "yes", "on")
+            elif isinstance(default, int):
+                overrides[field] = int(raw)
+            elif isinstance(default, float):
+                overrides[field] = float(raw)
+            else:
+                overrides[field] = raw
+        return config._replace(**overrides)
+
+
+class UpstreamClient:
+    """Keep-alive connection pool for one upstream, with utilization counters"""
+
+    def __init__(self, name: str, config: UpstreamConfig):
+        self.name = name
+        self.config = config
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self._pool: Optional[httpcore.AsyncConnectionPool] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.counters = {"requests": 0, "errors": 0, "peak_in_flight": 0, "total_ms": 0.0}
+
+    @property
+    def http2(self) -> bool:
+        return self.config.http2 and HTTP2_AVAILABLE
+
+    def start(self) -> None:
+        if self._client is not None:
+            return
+        limits = httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry
+        )
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=self.http2)
+        # httpx has no public pool introspection, so connection stats read the httpcore pool behind
+        # the transport (httpcore is pinned to 1.x in requirements). Say so once if that ever changes.
+        pool = getattr(self._transport, "_pool", None)
+        self._pool = pool if isinstance(pool, httpcore.AsyncConnectionPool) else None
+        if self._pool is None:
+            logger.warning(
+                f"Connection stats unavailable for {self.name}: httpx {httpx.__version__} transport "
+                f"has no httpcore connection pool"
+            )
+        self._client = httpx.AsyncClient(
+            base_url=self.config.base_url,
+            transport=self._transport,
+            # Only connecting is bounded here; the provider gateway owns the overall deadline
+            timeout=httpx.Timeout(None, connect=self.config.connect_timeout)
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError(f"HTTP client for {self.name} used before app startup")
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request over the pool; the body is read before returning"""
+        self.counters["requests"] += 1
+        self.in_flight += 1
+        self.counters["peak_in_flight"] = max(self.counters["peak_in_flight"], self.in_flight)
+        started = time.perf_counter()
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.counters["total_ms"] += (time.perf_counter() - started) * 1000
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._transport = None
+            self._pool = None
+
+    def connection_stats(self) -> Optional[Dict[str, int]]:
+        """Open/active/idle connections in the pool, or None if they can't be read"""
+        if self._client is not None and self._pool is None:
+            return None
+        connections = self._pool.connections if self._pool is not None else []
+        open_connections = [c for c in connections if not c.is_closed()]
+        idle = sum(1 for c in open_connections if c.is_idle())
+        return {
+            "open": len(open_connections),
+            "active": len(open_connections) - idle,
+            "idle": idle,
+            "http2": sum(1 for c in open_connections if "HTTP/2" in c.info()),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        connections = self.connection_stats()
+        requests = self.counters["requests"]
+        return {
+            "base_url": self.config.base_url,
+            "started": self._client is not None,
+            "http2": self.http2,
+            "requests": requests,
+            "errors": self.counters["errors"],
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.counters["peak_in_flight"],
+            "avg_ms": round(self.counters["total_ms"] / requests, 2) if requests else 0.0,
+            "connections": connections,
+            "max_connections": self.config.max_connections,
+            "utilization": round(connections["active"] / self.config.max_connections, 4)
+            if connections is not None else None,
+        }
+
+
+class HTTPClientPool:
+    """Named ``UpstreamClient``s, opened and closed with the app lifespan"""
+
+    def __init__(self, upstreams: Dict[str, Dict[str, Any]]):
+        self.upstreams: Dict[str, UpstreamClient] = {
+            name: UpstreamClient(name, UpstreamConfig.from_env(name, **defaults))
+            for name, defaults in upstreams.items()
+        }
+
+    def __getitem__(self, name: str) -> UpstreamClient:
+        return self.upstreams[name]
+
+    async def start(self) -> None:
+        if not HTTP2_AVAILABLE:
+            logger.info("h2 is not installed; outbound provider calls use HTTP/1.1 keep-alive")
+        for upstream in self.upstreams.values():
+            upstream.start()
+
+    async def aclose(self) -> None:
+        for upstream in self.upstreams.values():
+            try:
+                await upstream.aclose()
+            except Exception as e:
+                logger.warning(f"Closing HTTP client for {upstream.name} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: upstream.stats() for name, upstream in self.upstreams.items()}
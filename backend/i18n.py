@@ -0,0 +1,85 @@
+"""
+Per-language UI string bundles and localized field lookup.
+
+Bundles are compiled once at startup: each supported language gets every UI
+string, filled in through a fallback chain (e.g. mr -> hi -> en) where a
+translation is missing. The bundle is serialized once and tagged with a
+content-hash ETag, so clients can cache it and revalidate cheaply.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple
+
+DEFAULT_LANGUAGE = "en"
+
+# Closest language to fall back to before English when a string is missing
+LANGUAGE_FALLBACKS = {
+    "mr": ["hi"],
+    "ne": ["hi"],
+    "sa": ["hi"],
+    "ur": ["hi"],
+    "as": ["bn"],
+}
+
+UI_STRINGS_PATH = Path(__file__).parent / "locales" / "ui_strings.json"
+
+
+def fallback_chain(language: str) -> List[str]:
+    """Languages to try in order for ``language``, always ending with English"""
+    chain = [language] + LANGUAGE_FALLBACKS.get(language, [])
+    if DEFAULT_LANGUAGE not in chain:
+        chain.append(DEFAULT_LANGUAGE)
+    return chain
+
+
+def localized(record: Mapping[str, Any], field: str, language: str) -> Any:
+    """Value of ``field`` in ``language`` from a record with ``<field>_<code>`` variants
+
+    English lives in the bare field; other languages in suffixed fields such as
+    ``description_hi``. Missing translations follow the language's fallback chain.
+    """
+    for code in fallback_chain(language):
+        if code == DEFAULT_LANGUAGE:
+            break
+        value = record.get(f"{field}_{code}")
+        if value:
+            return value
+    return record[field]
+
+
+class StringBundle(NamedTuple):
+    language: str
+    strings: Mapping[str, str]
+    body: bytes
+    etag: str
+
+
+def load_ui_strings(path: Path = UI_STRINGS_PATH) -> Dict[str, Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compile_bundles(ui_strings: Dict[str, Dict[str, str]], languages: List[str]) -> Dict[str, StringBundle]:
+    """Build one immutable, pre-serialized bundle per language"""
+    keys = list(ui_strings[DEFAULT_LANGUAGE])
+    bundles = {}
+    for language in languages:
+        chain = fallback_chain(language)
+        strings = {}
+        for key in keys:
+            for code in chain:
+                value = ui_strings.get(code, {}).get(key)
+                if value:
+                    strings[key] = value
+                    break
+        body = json.dumps(
+            {"success": True, "language": language, "fallbacks": chain[1:], "strings": strings},
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        bundles[language] = StringBundle(language, MappingProxyType(strings), body, etag)
+    return bundles
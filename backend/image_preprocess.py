@@ -0,0 +1,209 @@
+"""
+Crop photo preprocessing, run in a process pool so it never blocks the event loop.
+
+Phone photos arrive at 4-12 MP. Before the vision call or the image store sees
+them, each upload is:
+
+- validated: readable, an accepted format, and within a pixel budget;
+- decoded (JPEG is DCT-scaled while decoding, straight to about the target size);
+- rotated upright from its EXIF orientation;
+- downscaled so the longest side is at most ``max_side``;
+- re-encoded as JPEG. EXIF, including GPS, is not carried over.
+
+The same pass produces both SHA-256 hashes and the perceptual hash the vision
+cache needs, so every upload is decoded exactly once.
+"""
+
+import asyncio
+import functools
+import hashlib
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, NamedTuple, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from vision_cache import dhash
+
+logger = logging.getLogger(__name__)
+
+# Pillow format names; MPO is the multi-picture JPEG many phone cameras write
+ACCEPTED_FORMATS = {"JPEG", "MPO", "PNG", "WEBP"}
+
+
+class ImageRejected(ValueError):
+    """The upload can't be used as a crop photo"""
+    status_code = 400
+
+
+class UnsupportedImageFormat(ImageRejected):
+    status_code = 415
+
+
+class ImageDimensionsTooLarge(ImageRejected):
+    status_code = 413
+
+
+class PreprocessedImage(NamedTuple):
+    data: bytes
+    content_type: str
+    sha256: str
+    original_sha256: str
+    phash: int
+    width: int
+    height: int
+    original_width: int
+    original_height: int
+    original_size: int
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB copy of ``img``, with any transparency composited onto white"""
+    if img.mode == "RGB":
+        return img
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def preprocess_image(
+    data: bytes, max_side: int = 1280, quality: int = 85, max_pixels: int = 50_000_000
+) -> PreprocessedImage:
+    """Validate, decode, orient, downscale and re-encode one upload (CPU bound)"""
+    try:
+        img = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        # Pillow's own limit, hit before ours when the header claims an enormous image
+        raise ImageDimensionsTooLarge(f"Image has more than {max_pixels} pixels")
+    except (UnidentifiedImageError, OSError):
+        raise ImageRejected("Upload is not a readable image")
+
+    with img:
+        if img.format not in ACCEPTED_FORMATS:
+            raise UnsupportedImageFormat(f"Unsupported image format: {img.format}")
+        original_width, original_height = img.size
+        # Checked before decoding, so a tiny file claiming huge dimensions costs nothing
+        if original_width * original_height > max_pixels:
+            raise ImageDimensionsTooLarge(
+                f"Image is {original_width}x{original_height}; at most {max_pixels} pixels are accepted"
+            )
+
+        # JPEG only: decode at 1/2, 1/4 or 1/8 scale while staying at or above the target size
+        img.draft("RGB", (max_side, max_side))
+        try:
+            img.load()
+            upright = ImageOps.exif_transpose(img)
+        except Exception:
+            raise ImageRejected("Image is corrupt or truncated")
+
+    rgb = _flatten(upright)
+    rgb.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=3.0)
+
+    buffer = io.BytesIO()
+    rgb.save(buffer, "JPEG", quality=quality, optimize=True)
+    output = buffer.getvalue()
+    return PreprocessedImage(
+        data=output,
+        content_type="image/jpeg",
+        sha256=hashlib.sha256(output).hexdigest(),
+        original_sha256=hashlib.sha256(data).hexdigest(),
+        phash=dhash(rgb),
+        width=rgb.width,
+        height=rgb.height,
+        original_width=original_width,
+        original_height=original_height,
+        original_size=len(data)
+    )
+
+
+def _warm_worker() -> None:
+    # Imports are done by now; this only makes sure the worker process exists
+    return None
+
+
+class ImagePreprocessor:
+    """Runs ``preprocess_image`` in a process pool (or a thread with ``workers=0``)"""
+
+    def __init__(self, workers: int = 2, max_side: int = 1280, quality: int = 85, max_pixels: int = 50_000_000):
+        self.workers = workers
+        self.max_side = max_side
+        self.quality = quality
+        self.max_pixels = max_pixels
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.counters = {"processed": 0, "rejected": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0, "total_ms": 0.0}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop; bounds uploads held in memory while queued
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, self.workers) * 2)
+        return self._semaphore
+
+    def _ensure_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and self.workers > 0:
+            # spawn, not fork: the server process has MongoDB and executor threads that must not be forked
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def start(self) -> None:
+        """Start the worker processes now, so the first upload doesn't wait for them"""
+        executor = self._ensure_executor()
+        if executor is not None:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[loop.run_in_executor(executor, _warm_worker) for _ in range(self.workers)])
+
+    async def process(self, data: bytes) -> PreprocessedImage:
+        call = functools.partial(preprocess_image, data, self.max_side, self.quality, self.max_pixels)
+        started = time.perf_counter()
+        async with self.semaphore:
+            executor = self._ensure_executor()
+            try:
+                if executor is None:
+                    image = await asyncio.to_thread(call)
+                else:
+                    image = await asyncio.get_running_loop().run_in_executor(executor, call)
+            except ImageRejected:
+                self.counters["rejected"] += 1
+                raise
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool for the next upload
+                self.counters["failed"] += 1
+                logger.error("Image preprocessing pool broke; restarting it")
+                if self._executor is executor:
+                    self._executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            except Exception:
+                self.counters["failed"] += 1
+                raise
+
+        self.counters["processed"] += 1
+        self.counters["bytes_in"] += image.original_size
+        self.counters["bytes_out"] += len(image.data)
+        self.counters["total_ms"] += (time.perf_counter() - started) * 1000
+        return image
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        processed = self.counters["processed"]
+        return {
+            **self.counters,
+            "workers": self.workers,
+            "mode": "process" if self.workers > 0 else "thread",
+            "max_side": self.max_side,
+            "avg_ms": round(self.counters["total_ms"] / processed, 2) if processed else 0.0,
+            "size_ratio": round(self.counters["bytes_out"] / self.counters["bytes_in"], 4)
+            if self.counters["bytes_in"] else 0.0,
+        }
@@ -0,0 +1,207 @@
+"""
+Content-addressed storage for crop images.
+
+Images are stored once, keyed by the SHA-256 of their bytes, either in MongoDB
+GridFS or in a local blob directory. Analysis documents only keep the hash.
+
+Migration of older documents that embed ``image_base64``:
+
+    python image_store.py migrate [--batch-size 200]
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def image_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def guess_image_content_type(data: bytes) -> str:
+    """Sniff the image format from its magic bytes"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class GridFSImageStore:
+    """Images in GridFS, deduplicated through an ``images`` index collection keyed by SHA-256"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, bucket_name: str = "images"):
+        self.db = db
+        self.index = db[f"{bucket_name}.index"]
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+
+    async def exists(self, sha256: str) -> bool:
+        return await self.index.find_one({"_id": sha256}, {"_id": 1}) is not None
+
+    async def put(self, data: bytes, content_type: Optional[str] = None) -> str:
+        sha256 = image_sha256(data)
+        if await self.exists(sha256):
+            return sha256
+
+        content_type = content_type or guess_image_content_type(data)
+        gridfs_id = await self.bucket.upload_from_stream(
+            sha256, data, metadata={"sha256": sha256, "content_type": content_type}
+        )
+        try:
+            await self.index.insert_one({
+                "_id": sha256,
+                "gridfs_id": gridfs_id,
+                "size": len(data),
+                "content_type": content_type,
+            })
+        except DuplicateKeyError:
+            # A concurrent upload of the same image won the race; drop our copy
+            await self.bucket.delete(gridfs_id)
+        return sha256
+
+    async def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        entry = await self.index.find_one({"_id": sha256})
+        if entry is None:
+            return None
+        stream = await self.bucket.open_download_stream(entry["gridfs_id"])
+        return {"data": await stream.read(), "content_type": entry["content_type"]}
+
+
+class LocalImageStore:
+    """Images as files named by SHA-256 under a local blob directory"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    async def exists(self, sha256: str) -> bool:
+        return await asyncio.to_thread(self._path(sha256).exists)
+
+    def _write(self, path: Path, data: bytes) -> None:
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def put(self, data: bytes, content_type: Optional[str] = None) -> str:
+        sha256 = image_sha256(data)
+        await asyncio.to_thread(self._write, self._path(sha256), data)
+        return sha256
+
+    async def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        path = self._path(sha256)
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return None
+        return {"data": data, "content_type": guess_image_content_type(data)}
+
+
+def create_image_store(db: AsyncIOMotorDatabase):
+    """Pick the image store backend from IMAGE_STORE_BACKEND (gridfs or local)"""
+    backend = os.environ.get("IMAGE_STORE_BACKEND", "gridfs")
+    if backend == "local":
+        default_dir = Path(__file__).parent / "data" / "images"
+        return LocalImageStore(Path(os.environ.get("IMAGE_STORE_DIR", default_dir)))
+    if backend == "gridfs":
+        return GridFSImageStore(db)
+    raise ValueError(f"Unknown IMAGE_STORE_BACKEND: {backend}")
+
+
+async def migrate_embedded_images(db: AsyncIOMotorDatabase, store, batch_size: int = 200) -> int:
+    """Move ``image_base64`` out of crop_analyses documents into the image store"""
+    migrated = 0
+    while True:
+        cursor = db.crop_analyses.find(
+            {"image_base64": {"$exists": True}, "image_migration_error": {"$exists": False}},
+            {"_id": 1, "image_base64": 1},
+        ).limit(batch_size)
+        docs = await cursor.to_list(length=batch_size)
+        if not docs:
+            break
+
+        for doc in docs:
+            try:
+                image_bytes = base64.b64decode(doc["image_base64"])
+            except (binascii.Error, ValueError) as e:
+                # Leave the payload in place but skip it on the next pass
+                logger.warning(f"Skipping crop analysis {doc['_id']}: {e}")
+                await db.crop_analyses.update_one(
+                    {"_id": doc["_id"]}, {"$set": {"image_migration_error": str(e)}}
+                )
+                continue
+            sha256 = await store.put(image_bytes)
+            await db.crop_analyses.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "image_sha256": sha256,
+                        "image_size": len(image_bytes),
+                        "image_content_type": guess_image_content_type(image_bytes),
+                    },
+                    "$unset": {"image_base64": ""},
+                },
+            )
+            migrated += 1
+        logger.info(f"Migrated {migrated} crop analysis images")
+    return migrated
+
+
+async def _run_command(args) -> None:
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    try:
+        if args.command == "migrate":
+            count = await migrate_embedded_images(db, create_image_store(db), args.batch_size)
+            print(f"Migrated {count} documents")
+    finally:
+        client.close()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Kisan AI image store maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Move embedded image_base64 fields into the image store")
+    migrate.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / ".env")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_command(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Metrics and tracing.
+
+A small in-process registry of counters, histograms and callback gauges,
+rendered in the Prometheus text format for ``/metrics``, plus lightweight spans:
+
+- ``MetricsMiddleware`` records per-route latency, request/response sizes and
+  error counts, and opens the root span of each request.
+- ``traced`` wraps provider calls (coroutines and async generators) in spans.
+- ``MongoCommandListener`` times every MongoDB command.
+
+Span durations feed the ``kisan_span_duration_seconds`` histogram. When a
+``TraceExporter`` is installed (TRACE_EXPORT_PATH), finished spans are also
+appended to a local JSON-lines file with trace and parent ids.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge whose values are read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning(f"Gauge {self.name} failed: {e}")
+            return lines
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str], callback) -> CallbackGauge:
+        return self._register(CallbackGauge(name, help_text, label_names, callback))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "kisan_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_errors = registry.counter(
+    "kisan_http_request_errors_total", "HTTP requests that failed with a 5xx or an exception", ("method", "route")
+)
+http_latency = registry.histogram(
+    "kisan_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_request_size = registry.histogram(
+    "kisan_http_request_size_bytes", "HTTP request body size by route", ("route",), SIZE_BUCKETS
+)
+http_response_size = registry.histogram(
+    "kisan_http_response_size_bytes", "HTTP response body size by route", ("route",), SIZE_BUCKETS
+)
+span_latency = registry.histogram(
+    "kisan_span_duration_seconds", "Duration of provider calls and MongoDB commands", ("kind", "name")
+)
+span_errors = registry.counter(
+    "kisan_span_errors_total", "Failed provider calls and MongoDB commands", ("kind", "name")
+)
+
+
+class TraceExporter:
+    """Appends finished spans as JSON lines to a local file from a background thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Dict[str, Any]) -> None:
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    return
+                f.write(json.dumps(span, default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+_exporter: Optional[TraceExporter] = None
+
+
+def configure_trace_export(path: Optional[str]) -> Optional[TraceExporter]:
+    """Start exporting spans to ``path`` (JSON lines); None disables export"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = TraceExporter(path) if path else None
+    return _exporter
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "kind", "name", "attributes", "started", "start_time")
+
+    def __init__(self, kind: str, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.start_time = time.time()
+
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+
+def _finish(current: Span, duration: float, error: Optional[BaseException], record: bool = True) -> None:
+    if record:
+        span_latency.observe(duration, current.kind, current.name)
+        if error is not None:
+            span_errors.inc(current.kind, current.name)
+    if _exporter is not None:
+        _exporter.export({
+            "trace_id": current.trace_id,
+            "span_id": current.span_id,
+            "parent_id": current.parent_id,
+            "kind": current.kind,
+            "name": current.name,
+            "start_time": current.start_time,
+            "duration_ms": round(duration * 1000, 3),
+            "status": "error" if error is not None else "ok",
+            "error": repr(error) if error is not None else None,
+            **({"attributes": current.attributes} if current.attributes else {}),
+        })
+
+
+@contextmanager
+def span(kind: str, name: str, record: bool = True, **attributes: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span"""
+    current = Span(kind, name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(current, time.perf_counter() - current.started, error, record)
+
+
+def traced(kind: str, name: str):
+    """Decorator: run each call of an async function (or async generator) in a span"""
+    def decorator(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def generator_wrapper(*args, **kwargs):
+                # One span for the whole stream, but only current while the generator itself runs:
+                # holding it across yields would leak it into the consumer, and the consumer may
+                # close the stream from another context, where the contextvar can't be reset
+                current = Span(kind, name, _current_span.get(), {})
+                generator = fn(*args, **kwargs)
+                error = None
+                try:
+                    while True:
+                        token = _current_span.set(current)
+                        try:
+                            item = await generator.__anext__()
+                        except StopAsyncIteration:
+                            return
+                        finally:
+                            _current_span.reset(token)
+                        yield item
+                except GeneratorExit:
+                    # The consumer stopped early; not a failure
+                    raise
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    await generator.aclose()
+                    _finish(current, time.perf_counter() - current.started, error)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(kind, name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records every MongoDB command as a ``mongodb`` span, named "<command> <collection>"
+
+    Motor runs commands on executor threads, so these spans carry no parent.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event) -> None:
+        target = event.command.get(event.command_name)
+        name = f"{event.command_name} {target}" if isinstance(target, str) else event.command_name
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = name
+
+    def _complete(self, event, error: Optional[BaseException]) -> None:
+        with self._lock:
+            name = self._pending.pop((event.connection_id, event.request_id), event.command_name)
+        duration = event.duration_micros / 1e6
+        span_latency.observe(duration, "mongodb", name)
+        if error is not None:
+            span_errors.inc("mongodb", name)
+        if _exporter is not None:
+            current = Span("mongodb", name, None, {"database": getattr(event, "database_name", None)})
+            current.start_time -= duration
+            _finish(current, duration, error, record=False)
+
+    def succeeded(self, event) -> None:
+        self._complete(event, None)
+
+    def failed(self, event) -> None:
+        self._complete(event, RuntimeError(str(event.failure.get("errmsg", "command failed"))))
+
+
+class MetricsMiddleware:
+    """Per-route latency, size and error metrics; opens the root span of each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route(self, scope) -> str:
+        # Label by route template, not the raw path, to keep label cardinality bounded
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            app = scope.get("app")
+            for route in getattr(app, "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            path = self._route_paths[endpoint] = path or "unmatched"
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        error = None
+        with span("http", method, record=False) as root:
+            try:
+                await self.app(scope, counting_receive, counting_send)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                route = self._route(scope)
+                root.name = f"{method} {route}"
+                root.attributes["status"] = status["code"]
+                duration = time.perf_counter() - started
+                http_requests.inc(method, route, str(status["code"]))
+                http_latency.observe(duration, method, route)
+                http_request_size.observe(sizes["request"], route)
+                http_response_size.observe(sizes["response"], route)
+                if error is not None or status["code"] >= 500:
+                    http_errors.inc(method, route)
@@ -0,0 +1,299 @@
+"""
+Historical mandi prices in a MongoDB time-series collection.
+
+The bulk loader streams Agmarknet-style CSV or Parquet dumps in fixed-size
+chunks (so multi-GB files load in constant memory) and writes each chunk with
+``insert_many``. Range queries are downsampled on the server into daily,
+weekly or monthly buckets.
+
+Requires MongoDB 5.0 or newer, for time-series collections and ``$dateTrunc``.
+On older servers ``ensure_price_history_collection`` raises
+``PriceHistoryUnavailable``, and the API runs without price history.
+
+    python price_history.py load prices.csv [--chunk-size 50000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+PRICE_HISTORY_COLLECTION = "mandi_prices"
+DOWNSAMPLE_INTERVALS = ("day", "week", "month")
+
+# Agmarknet exports use several spellings for the same columns
+COLUMN_ALIASES = {
+    "state": "state",
+    "district": "district",
+    "district_name": "district",
+    "market": "market",
+    "market_name": "market",
+    "commodity": "commodity",
+    "variety": "variety",
+    "arrival_date": "date",
+    "price_date": "date",
+    "reported_date": "date",
+    "date": "date",
+    "min_price": "min_price",
+    "min_x0020_price": "min_price",
+    "min_price_(rs./quintal)": "min_price",
+    "max_price": "max_price",
+    "max_x0020_price": "max_price",
+    "max_price_(rs./quintal)": "max_price",
+    "modal_price": "modal_price",
+    "modal_x0020_price": "modal_price",
+    "modal_price_(rs./quintal)": "modal_price",
+}
+META_FIELDS = ("state", "district", "market", "commodity", "variety")
+PRICE_FIELDS = ("min_price", "max_price", "modal_price")
+REQUIRED_FIELDS = ("state", "commodity", "date", "modal_price")
+
+
+class PriceHistoryUnavailable(RuntimeError):
+    """The MongoDB server has no time-series collections (older than 5.0)"""
+
+
+async def ensure_price_history_collection(db: AsyncIOMotorDatabase) -> None:
+    """Create the time-series collection and its query index if they don't exist
+
+    Raises ``PriceHistoryUnavailable`` when the server can't create time-series collections.
+    """
+    if PRICE_HISTORY_COLLECTION not in await db.list_collection_names():
+        try:
+            await db.create_collection(
+                PRICE_HISTORY_COLLECTION,
+                timeseries={"timeField": "date", "metaField": "meta", "granularity": "hours"}
+            )
+        except CollectionInvalid:
+            pass  # Created concurrently by another worker
+        except OperationFailure as e:
+            # Queries need $dateTrunc too, so a regular collection on an older server isn't a fallback
+            raise PriceHistoryUnavailable(f"Price history requires MongoDB 5.0 or newer: {e}") from e
+    await db[PRICE_HISTORY_COLLECTION].create_index(
+        [("meta.commodity", 1), ("meta.state", 1), ("date", 1)]
+    )
+    await db[PRICE_HISTORY_COLLECTION].create_index(
+        [("meta.state", 1), ("meta.market", 1), ("date", 1)]
+    )
+
+
+def _normalize_column(name: str) -> str:
+    return name.strip().lower().replace(" ", "_")
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parse ISO dates as such and anything else (Agmarknet's DD/MM/YYYY, DD-Mon-YYYY) day first, as naive UTC"""
+    # dayfirst on ISO input would turn 2024-03-05 into 3 May
+    dates = pd.to_datetime(values, format="ISO8601", errors="coerce", utc=True)
+    rest = dates.isna() & values.astype(str).str.strip().ne("")
+    if rest.any():
+        dates[rest] = pd.to_datetime(values[rest], format="mixed", dayfirst=True, errors="coerce", utc=True)
+    return dates.dt.tz_localize(None)
+
+
+def _read_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Loading Parquet files requires pyarrow")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+
+def iter_price_documents(path: Path, chunk_size: int = 50000) -> Iterator[List[Dict[str, Any]]]:
+    """Parse a price dump into lists of time-series documents, one list per chunk"""
+    for frame in _read_chunks(path, chunk_size):
+        frame = frame.rename(columns=lambda c: COLUMN_ALIASES.get(_normalize_column(str(c)), c))
+        missing = [field for field in REQUIRED_FIELDS if field not in frame.columns]
+        if missing:
+            raise ValueError(f"{path.name} is missing required columns: {', '.join(missing)}")
+
+        frame["date"] = parse_dates(frame["date"])
+        for field in PRICE_FIELDS:
+            if field in frame.columns:
+                frame[field] = pd.to_numeric(frame[field], errors="coerce")
+            else:
+                frame[field] = float("nan")
+        for field in META_FIELDS:
+            if field not in frame.columns:
+                frame[field] = ""
+        frame = frame.dropna(subset=["date", "modal_price"])
+
+        dates = frame["date"].dt.to_pydatetime()
+        columns = [frame[field].fillna("").astype(str).str.strip().tolist() for field in META_FIELDS]
+        prices = [frame[field].astype(float).tolist() for field in PRICE_FIELDS]
+        documents = []
+        for i, date in enumerate(dates):
+            document = {
+                "date": date,
+                "meta": {field: column[i] for field, column in zip(META_FIELDS, columns)},
+                "modal_price": prices[2][i],
+            }
+            # Leave out missing min/max rather than storing NaN
+            if prices[0][i] == prices[0][i]:
+                document["min_price"] = prices[0][i]
+            if prices[1][i] == prices[1][i]:
+                document["max_price"] = prices[1][i]
+            documents.append(document)
+        yield documents
+
+
+async def load_price_file(db: AsyncIOMotorDatabase, path: Path, chunk_size: int = 50000) -> Dict[str, Any]:
+    """Stream a price dump into the time-series collection, one insert_many per chunk"""
+    await ensure_price_history_collection(db)
+    collection = db[PRICE_HISTORY_COLLECTION]
+    chunks = iter_price_documents(Path(path), chunk_size)
+    started = time.perf_counter()
+    inserted = 0
+    failed = 0
+
+    def next_chunk() -> Optional[List[Dict[str, Any]]]:
+        return next(chunks, None)
+
+    # Parse the next chunk in a thread while the current one is being written
+    pending = asyncio.create_task(asyncio.to_thread(next_chunk))
+    while True:
+        documents = await pending
+        if documents is None:
+            break
+        pending = asyncio.create_task(asyncio.to_thread(next_chunk))
+        if not documents:
+            continue
+        try:
+            result = await collection.insert_many(documents, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            inserted += e.details.get("nInserted", 0)
+            failed += len(e.details.get("writeErrors", []))
+        elapsed = time.perf_counter() - started
+        logger.info(f"Loaded {inserted} rows ({inserted / elapsed:.0f} rows/sec)")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "file": str(path),
+        "inserted": inserted,
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(inserted / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def query_price_history(
+    db: AsyncIOMotorDatabase,
+    commodity: str,
+    start: datetime,
+    end: datetime,
+    interval: str = "day",
+    state: Optional[str] = None,
+    market: Optional[str] = None,
+    max_points: int = 1000
+) -> Dict[str, Any]:
+    """Downsample prices in [start, end) into day, week or month buckets on the server
+
+    Returns the newest ``max_points`` buckets, oldest first, and whether older ones were left out.
+    """
+    match: Dict[str, Any] = {"meta.commodity": commodity, "date": {"$gte": start, "$lt": end}}
+    if state:
+        match["meta.state"] = state
+    if market:
+        match["meta.market"] = market
+
+    date_trunc: Dict[str, Any] = {"date": "$date", "unit": interval}
+    if interval == "week":
+        date_trunc["startOfWeek"] = "monday"
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"$dateTrunc": date_trunc},
+            "avg_modal_price": {"$avg": "$modal_price"},
+            "min_price": {"$min": {"$ifNull": ["$min_price", "$modal_price"]}},
+            "max_price": {"$max": {"$ifNull": ["$max_price", "$modal_price"]}},
+            "samples": {"$sum": 1},
+        }},
+        # Newest first so the limit drops the oldest buckets; one extra tells us whether it dropped any
+        {"$sort": {"_id": -1}},
+        {"$limit": max_points + 1},
+    ]
+    buckets = await db[PRICE_HISTORY_COLLECTION].aggregate(pipeline).to_list(length=max_points + 1)
+    truncated = len(buckets) > max_points
+    return {
+        "truncated": truncated,
+        "buckets": [
+            {
+                "period_start": bucket["_id"].isoformat(),
+                "avg_modal_price": round(bucket["avg_modal_price"], 2),
+                "min_price": bucket["min_price"],
+                "max_price": bucket["max_price"],
+                "samples": bucket["samples"],
+            }
+            for bucket in buckets[:max_points][::-1]
+        ],
+    }
+
+
+async def load_daily_series(db: AsyncIOMotorDatabase, since: datetime) -> pd.DataFrame:
+    """Daily average modal price per (state, commodity) since ``since``, for trend rebuilds"""
+    pipeline = [
+        {"$match": {"date": {"$gte": since}}},
+        {"$group": {
+            "_id": {
+                "state": "$meta.state",
+                "crop": "$meta.commodity",
+                "date": {"$dateTrunc": {"date": "$date", "unit": "day"}},
+            },
+            "price": {"$avg": "$modal_price"},
+        }},
+    ]
+    rows = []
+    async for bucket in db[PRICE_HISTORY_COLLECTION].aggregate(pipeline, allowDiskUse=True):
+        rows.append((bucket["_id"]["state"], bucket["_id"]["crop"], bucket["_id"]["date"], bucket["price"]))
+    return pd.DataFrame(rows, columns=["state", "crop", "date", "price"])
+
+
+async def _run_command(args) -> None:
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    try:
+        if args.command == "load":
+            for path in args.files:
+                summary = await load_price_file(db, Path(path), args.chunk_size)
+                print(
+                    f"{summary['file']}: {summary['inserted']} rows in {summary['seconds']}s "
+                    f"({summary['rows_per_sec']} rows/sec, {summary['failed']} failed)"
+                )
+    finally:
+        client.close()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Kisan AI mandi price history")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    load = subparsers.add_parser("load", help="Bulk load Agmarknet CSV/Parquet price dumps")
+    load.add_argument("files", nargs="+")
+    load.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / ".env")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_command(args))
+
+
+if __name__ == "__main__":
+    main()
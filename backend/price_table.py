@@ -0,0 +1,250 @@
+"""
+Columnar, NumPy-backed table of MSP and mandi prices.
+
+Built from ``STATE_MSP_DATA`` (dict of state -> list of crop dicts) into flat
+arrays, one row per (state, crop), grouped by state. States, crops and local
+crop names are dictionary-encoded as integer codes so cross-state queries and
+national aggregates are vectorized array operations rather than Python loops
+over dicts. ``columns()`` / ``from_columns()`` expose that layout as plain
+arrays, so a table can also be read straight out of a memory-mapped snapshot.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _number(value: np.float64):
+    # Prices are stored as float64; whole numbers go back out as ints, as they came in
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _margin(value: np.float64) -> Optional[float]:
+    # NaN where there is no MSP to compare against
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+class PriceTable:
+    """Array-backed price table with precomputed spreads and margins"""
+
+    def __init__(
+        self,
+        state_names: List[str],
+        crop_names: List[str],
+        crop_names_hi: List[str],
+        local_names: List[str],
+        state_codes: np.ndarray,
+        crop_codes: np.ndarray,
+        local_codes: np.ndarray,
+        msp: np.ndarray,
+        mandi: np.ndarray,
+        spread: Optional[np.ndarray] = None,
+        margin: Optional[np.ndarray] = None
+    ):
+        self.state_names = state_names
+        self.crop_names = crop_names
+        self.crop_names_hi = crop_names_hi
+        self.local_names = local_names
+        self.state_codes = state_codes
+        self.crop_codes = crop_codes
+        self.local_codes = local_codes
+        self.msp = msp
+        self.mandi = mandi
+        self.spread = mandi - msp if spread is None else spread
+        if margin is None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                margin = np.where(msp > 0, self.spread / msp * 100, np.nan)
+        self.margin = margin
+        self._crop_index = {name.lower(): code for code, name in enumerate(crop_names)}
+        # Row range of each state; rows are grouped by state
+        self.state_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(state_codes, minlength=len(state_names))))
+        ).astype(np.int64)
+        self._state_index = {name: code for code, name in enumerate(state_names)}
+
+    @classmethod
+    def from_state_data(cls, state_data: Dict[str, List[Dict[str, Any]]]) -> "PriceTable":
+        state_names = list(state_data)
+        crop_index: Dict[str, int] = {}
+        crop_names: List[str] = []
+        crop_names_hi: List[str] = []
+        local_index: Dict[str, int] = {}
+        state_codes, crop_codes, local_codes, msp, mandi = [], [], [], [], []
+
+        for state_code, state in enumerate(state_names):
+            for crop in state_data[state]:
+                code = crop_index.get(crop["name"])
+                if code is None:
+                    code = crop_index[crop["name"]] = len(crop_names)
+                    crop_names.append(crop["name"])
+                    crop_names_hi.append(crop.get("name_hi", crop["name"]))
+                state_codes.append(state_code)
+                crop_codes.append(code)
+                local_codes.append(local_index.setdefault(crop.get("name_local", crop["name"]), len(local_index)))
+                msp.append(crop["msp"])
+                mandi.append(crop["mandi"])
+
+        return cls(
+            state_names,
+            crop_names,
+            crop_names_hi,
+            list(local_index),
+            np.asarray(state_codes, dtype=np.int32),
+            np.asarray(crop_codes, dtype=np.int32),
+            np.asarray(local_codes, dtype=np.int32),
+            np.asarray(msp, dtype=np.float64),
+            np.asarray(mandi, dtype=np.float64),
+        )
+
+    def columns(self) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+        """The table as per-row arrays and the name lists their codes index into"""
+        arrays = {
+            "state_codes": self.state_codes,
+            "crop_codes": self.crop_codes,
+            "local_codes": self.local_codes,
+            "msp": self.msp,
+            "mandi": self.mandi,
+            "spread": self.spread,
+            "margin": self.margin,
+        }
+        names = {
+            "states": self.state_names,
+            "crops": self.crop_names,
+            "crops_hi": self.crop_names_hi,
+            "local_names": self.local_names,
+        }
+        return arrays, names
+
+    @classmethod
+    def from_columns(cls, arrays: Dict[str, np.ndarray], names: Dict[str, List[str]]) -> "PriceTable":
+        """Inverse of ``columns()``; the arrays are used as given, not copied"""
+        return cls(
+            names["states"],
+            names["crops"],
+            names["crops_hi"],
+            names["local_names"],
+            arrays["state_codes"],
+            arrays["crop_codes"],
+            arrays["local_codes"],
+            arrays["msp"],
+            arrays["mandi"],
+            spread=arrays["spread"],
+            margin=arrays["margin"],
+        )
+
+    def __len__(self) -> int:
+        return len(self.msp)
+
+    def crop_code(self, crop: str) -> Optional[int]:
+        return self._crop_index.get(crop.strip().lower())
+
+    def has_state(self, state: str) -> bool:
+        code = self._state_index.get(state)
+        return code is not None and self.state_offsets[code + 1] > self.state_offsets[code]
+
+    def state_crops(self, state: str) -> Optional[List[Dict[str, Any]]]:
+        """One state's crops in the ``STATE_MSP_DATA`` entry shape; None if the state has none"""
+        code = self._state_index.get(state)
+        if code is None:
+            return None
+        start, end = int(self.state_offsets[code]), int(self.state_offsets[code + 1])
+        if start == end:
+            return None
+        return [
+            {
+                "name": self.crop_names[self.crop_codes[i]],
+                "name_hi": self.crop_names_hi[self.crop_codes[i]],
+                "name_local": self.local_names[self.local_codes[i]],
+                "msp": _number(self.msp[i]),
+                "mandi": _number(self.mandi[i]),
+            }
+            for i in range(start, end)
+        ]
+
+    def state_data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """The whole table back in ``STATE_MSP_DATA`` shape"""
+        return {state: self.state_crops(state) for state in self.state_names if self.has_state(state)}
+
+    def _rows(self, indices: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {
+                "state": self.state_names[self.state_codes[i]],
+                "crop_name": self.crop_names[self.crop_codes[i]],
+                "crop_name_hi": self.crop_names_hi[self.crop_codes[i]],
+                "crop_name_local": self.local_names[self.local_codes[i]],
+                "msp_price": float(self.msp[i]),
+                "mandi_price": float(self.mandi[i]),
+                "spread": float(self.spread[i]),
+                "profit_margin": _margin(self.margin[i]),
+            }
+            for i in indices.tolist()
+        ]
+
+    def crop_across_states(self, crop: str) -> Optional[List[Dict[str, Any]]]:
+        """All states growing ``crop``, best mandi-vs-MSP margin first; None if the crop is unknown"""
+        code = self.crop_code(crop)
+        if code is None:
+            return None
+        indices = np.flatnonzero(self.crop_codes == code)
+        return self._rows(indices[np.argsort(-self.margin[indices], kind="stable")])
+
+    def top_spreads(self, n: int = 10, crop: Optional[str] = None, by: str = "margin") -> Optional[List[Dict[str, Any]]]:
+        """Top ``n`` (state, crop) rows by percentage margin or absolute spread"""
+        values = self.margin if by == "margin" else self.spread
+        indices = np.arange(len(self))
+        if crop is not None:
+            code = self.crop_code(crop)
+            if code is None:
+                return None
+            indices = np.flatnonzero(self.crop_codes == code)
+
+        n = min(n, len(indices))
+        if n <= 0:
+            return []
+        scores = values[indices]
+        # Partial selection first, then sort only the selected n rows
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return self._rows(indices[top])
+
+    def national_aggregates(self) -> List[Dict[str, Any]]:
+        """Per-crop national statistics across all states"""
+        if len(self) == 0:
+            return []
+        n_crops = len(self.crop_names)
+        counts = np.bincount(self.crop_codes, minlength=n_crops)
+        msp_sum = np.bincount(self.crop_codes, weights=self.msp, minlength=n_crops)
+        mandi_sum = np.bincount(self.crop_codes, weights=self.mandi, minlength=n_crops)
+        has_margin = ~np.isnan(self.margin)
+        margin_counts = np.bincount(self.crop_codes, weights=has_margin, minlength=n_crops)
+        margin_sum = np.bincount(self.crop_codes, weights=np.where(has_margin, self.margin, 0.0), minlength=n_crops)
+
+        mandi_min = np.full(n_crops, np.inf)
+        mandi_max = np.full(n_crops, -np.inf)
+        np.minimum.at(mandi_min, self.crop_codes, self.mandi)
+        np.maximum.at(mandi_max, self.crop_codes, self.mandi)
+
+        # State with the best margin per crop: sort by (crop, -margin) and take each group's first row
+        order = np.lexsort((-np.nan_to_num(self.margin, nan=-np.inf), self.crop_codes))
+        first_of_group = order[np.r_[0, np.flatnonzero(np.diff(self.crop_codes[order])) + 1]]
+        best_state = np.empty(n_crops, dtype=np.int32)
+        best_state[self.crop_codes[first_of_group]] = self.state_codes[first_of_group]
+
+        aggregates = []
+        for code in np.flatnonzero(counts).tolist():
+            count = int(counts[code])
+            aggregates.append({
+                "crop_name": self.crop_names[code],
+                "crop_name_hi": self.crop_names_hi[code],
+                "states": count,
+                "avg_msp_price": round(float(msp_sum[code] / count), 2),
+                "avg_mandi_price": round(float(mandi_sum[code] / count), 2),
+                "min_mandi_price": float(mandi_min[code]),
+                "max_mandi_price": float(mandi_max[code]),
+                # Over the states that have an MSP for the crop
+                "avg_profit_margin": round(float(margin_sum[code] / margin_counts[code]), 2)
+                if margin_counts[code] else None,
+                "best_state": self.state_names[best_state[code]],
+            })
+        return aggregates
@@ -0,0 +1,421 @@
+"""
+Gateway for external provider calls (vision, LLM, translation, speech).
+
+Every call goes through a per-provider ``ProviderClient`` that enforces:
+
+- a deadline for the whole call, including time spent waiting for a slot;
+- bounded concurrency, so an outage can't pile up unbounded coroutines;
+- hedging: when a call runs past the provider's recent latency percentile, a
+  duplicate is started and whichever finishes first wins (idempotent calls
+  only, and only while the provider has spare concurrency);
+- a circuit breaker that opens after consecutive failures and fails fast with
+  ``ProviderUnavailable`` until a probe call succeeds, so callers can fall back
+  to a cached or degraded answer immediately.
+
+Streaming calls hold a concurrency slot and run the per-item deadline only while
+the provider owes the caller an item. Arguments wrapped in ``CallerInput`` (e.g.
+audio arriving from a client socket) pause both while the provider waits on
+them, so a slow or idle uploader neither trips the breaker nor starves other
+calls.
+
+For local testing, ``PROVIDER_<NAME>_FAULTS`` injects latency spikes and errors,
+e.g. ``latency=2.0,latency_rate=0.1,error_rate=0.05``.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    """A provider call failed, timed out or was rejected by its circuit breaker"""
+
+
+class ProviderTimeout(ProviderError):
+    pass
+
+
+class ProviderUnavailable(ProviderError):
+    """The circuit breaker is open; the call was not attempted"""
+
+
+class ProviderPolicy(NamedTuple):
+    timeout: float = 10.0
+    # Streaming calls: longest wait for the next item
+    stream_timeout: float = 30.0
+    max_concurrency: int = 16
+    # Hedge once a call exceeds this percentile of recent latencies. Off by default: every provider
+    # here bills per call, so a hedge is paid for twice. Opt in per provider, e.g. 95
+    hedge_percentile: Optional[float] = None
+    hedge_min_delay: float = 0.05
+    hedge_min_samples: int = 20
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls, name: str, **defaults: Any) -> "ProviderPolicy":
+        """Policy with ``PROVIDER_<NAME>_<FIELD>`` environment overrides applied to ``defaults``"""
+        policy = cls(**defaults)
+        overrides = {}
+        for field, default in policy._asdict().items():
+            raw = os.environ.get(f"PROVIDER_{name.upper()}_{field.upper()}")
+            if raw is None:
+                continue
+            if field == "hedge_percentile" and raw.lower() in ("", "none", "off"):
+                overrides[field] = None
+            elif isinstance(default, int) and not isinstance(default, bool):
+                overrides[field] = int(raw)
+            else:
+                overrides[field] = float(raw)
+        return policy._replace(**overrides)
+
+
+class FaultSpec(NamedTuple):
+    latency: float = 0.0
+    latency_rate: float = 0.0
+    error_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "FaultSpec":
+        values = {}
+        for part in spec.split(","):
+            key, _, value = part.strip().partition("=")
+            if key:
+                values[key] = float(value)
+        return cls(**values)
+
+    async def apply(self, name: str) -> None:
+        if self.latency_rate and random.random() < self.latency_rate:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError(f"Injected fault in {name}")
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; lets one probe through after ``reset_timeout``"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """The allowed call ended without an outcome (e.g. cancelled by the client)"""
+        self._probe_in_flight = False
+
+
+class CallerInput:
+    """Marks a streaming call's argument as input the caller produces at its own pace"""
+
+    def __init__(self, iterator: AsyncIterator[Any]):
+        self.iterator = iterator
+
+
+class _StreamSession:
+    """Deadline and concurrency slot of one streaming call, held only while the provider is working"""
+
+    def __init__(self, client: "ProviderClient"):
+        self.client = client
+        self.task = asyncio.current_task()
+        self.expired = False
+        self.caller_error: Optional[BaseException] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._holding = False
+
+    def _expire(self) -> None:
+        self.expired = True
+        self.task.cancel()
+
+    async def hold(self) -> None:
+        # The clock starts before the slot is taken: waiting for a slot counts, as it does for call()
+        self._handle = asyncio.get_running_loop().call_later(self.client.policy.stream_timeout, self._expire)
+        await self.client.semaphore.acquire()
+        self._holding = True
+        self.client.in_flight += 1
+
+    def release(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._holding:
+            self._holding = False
+            self.client.in_flight -= 1
+            self.client.semaphore.release()
+
+    async def step(self, awaitable: Awaitable[Any]) -> Any:
+        """Await one unit of provider work under the deadline; raises asyncio.TimeoutError on a stall"""
+        # Not wait_for: that would step the generator in another task, breaking its context variables
+        try:
+            await self.hold()
+            return await awaitable
+        except asyncio.CancelledError:
+            if not self.expired:
+                raise
+            self.expired = False
+            if hasattr(self.task, "uncancel"):
+                self.task.uncancel()
+            raise asyncio.TimeoutError from None
+        finally:
+            self.release()
+            # An awaitable that never ran (cancelled while waiting for a slot) must not warn
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+
+    async def paced(self, iterator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Caller input as the provider sees it: deadline and slot are released while waiting for each item"""
+        iterator = iterator.__aiter__()
+        while True:
+            self.release()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                await self.hold()
+                return
+            except Exception as e:
+                # The caller's failure, not the provider's
+                self.caller_error = e
+                raise
+            await self.hold()
+            yield item
+
+
+class ProviderClient:
+    """Deadline, concurrency limit, hedging and circuit breaker for one provider"""
+
+    def __init__(self, name: str, policy: ProviderPolicy, faults: Optional[FaultSpec] = None):
+        self.name = name
+        self.policy = policy
+        self.faults = faults
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._latencies: "deque[float]" = deque(maxlen=256)
+        self._hedge_delay: Optional[float] = None
+        self._samples_since_update = 0
+        self.in_flight = 0
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "short_circuited": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+        }
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.policy.max_concurrency)
+        return self._semaphore
+
+    def _record_latency(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+        self._samples_since_update += 1
+        if self._samples_since_update >= 16 or self._hedge_delay is None:
+            self._samples_since_update = 0
+            self._hedge_delay = None
+            if self.policy.hedge_percentile is not None and len(self._latencies) >= self.policy.hedge_min_samples:
+                ordered = sorted(self._latencies)
+                index = min(len(ordered) - 1, int(len(ordered) * self.policy.hedge_percentile / 100))
+                self._hedge_delay = max(ordered[index], self.policy.hedge_min_delay)
+
+    def _percentile_ms(self, pct: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000, 2)
+
+    def _admit(self) -> None:
+        self.counters["calls"] += 1
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise ProviderUnavailable(f"{self.name} is unavailable (circuit open)")
+
+    async def _attempt(self, fn: Callable[..., Awaitable[Any]], args, kwargs) -> Any:
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                if self.faults is not None:
+                    await self.faults.apply(self.name)
+                return await fn(*args, **kwargs)
+            finally:
+                self.in_flight -= 1
+
+    async def _hedged(self, fn: Callable[..., Awaitable[Any]], args, kwargs, hedge: bool) -> Any:
+        primary = asyncio.create_task(self._attempt(fn, args, kwargs))
+        attempts = [primary]
+        try:
+            delay = self._hedge_delay if hedge else None
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                # Don't add load to a provider that is already at its concurrency limit
+                if not done and not self.semaphore.locked():
+                    self.counters["hedges"] += 1
+                    attempts.append(asyncio.create_task(self._attempt(fn, args, kwargs)))
+
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not primary:
+                            self.counters["hedge_wins"] += 1
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, hedge: bool = True, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` under this provider's policy; raises ProviderError on failure"""
+        self._admit()
+        started = time.perf_counter()
+        outcome = False
+        try:
+            result = await asyncio.wait_for(self._hedged(fn, args, kwargs, hedge), self.policy.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            self.breaker.record_failure()
+            outcome = True
+            raise ProviderTimeout(f"{self.name} timed out after {self.policy.timeout}s")
+        except Exception as e:
+            self.counters["errors"] += 1
+            self.breaker.record_failure()
+            outcome = True
+            raise ProviderError(f"{self.name} failed: {e}") from e
+        finally:
+            if not outcome:
+                self.breaker.release()
+
+        self.counters["successes"] += 1
+        self.breaker.record_success()
+        self._record_latency(time.perf_counter() - started)
+        return result
+
+    async def stream(self, fn: Callable[..., AsyncIterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        """Like ``call`` for streaming providers; the deadline applies to each item, without hedging
+
+        Wrap arguments the caller feeds at its own pace in ``CallerInput``; time spent waiting on them
+        counts neither against the deadline nor against the provider's concurrency limit.
+        """
+        self._admit()
+        session = _StreamSession(self)
+        args = tuple(session.paced(arg.iterator) if isinstance(arg, CallerInput) else arg for arg in args)
+        outcome = False
+        try:
+            if self.faults is not None:
+                await session.step(self.faults.apply(self.name))
+            iterator = fn(*args, **kwargs).__aiter__()
+            try:
+                while True:
+                    try:
+                        item = await session.step(iterator.__anext__())
+                    except StopAsyncIteration:
+                        break
+                    # The consumer handles each item without holding a slot or the provider's deadline
+                    yield item
+            finally:
+                # Close the provider session now rather than when the generator is collected
+                if hasattr(iterator, "aclose"):
+                    await iterator.aclose()
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            self.breaker.record_failure()
+            outcome = True
+            raise ProviderTimeout(f"{self.name} stalled for more than {self.policy.stream_timeout}s")
+        except Exception as e:
+            if e is session.caller_error:
+                raise
+            self.counters["errors"] += 1
+            self.breaker.record_failure()
+            outcome = True
+            raise ProviderError(f"{self.name} failed: {e}") from e
+        finally:
+            # The provider may pull caller input while closing; don't leave its slot or clock behind
+            session.release()
+            if not outcome:
+                self.breaker.release()
+
+        # Stream durations depend on the caller, so they stay out of the hedging percentile
+        self.counters["successes"] += 1
+        self.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.policy.max_concurrency,
+            "timeout_s": self.policy.timeout,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "hedge_delay_ms": round(self._hedge_delay * 1000, 2) if self._hedge_delay is not None else None,
+            "p50_ms": self._percentile_ms(50),
+            "p99_ms": self._percentile_ms(99),
+            "faults": self.faults._asdict() if self.faults is not None else None,
+        }
+
+
+class ProviderGateway:
+    """Named ``ProviderClient``s, configured from policies plus environment overrides"""
+
+    def __init__(self, policies: Dict[str, Dict[str, Any]]):
+        self.providers: Dict[str, ProviderClient] = {}
+        for name, defaults in policies.items():
+            faults = os.environ.get(f"PROVIDER_{name.upper()}_FAULTS")
+            if faults:
+                logger.warning(f"Injecting faults into provider {name}: {faults}")
+            self.providers[name] = ProviderClient(
+                name, ProviderPolicy.from_env(name, **defaults), FaultSpec.parse(faults) if faults else None
+            )
+
+    def __getitem__(self, name: str) -> ProviderClient:
+        return self.providers[name]
+
+    async def call(self, name: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        return await self.providers[name].call(fn, *args, **kwargs)
+
+    def stream(self, name: str, fn: Callable[..., AsyncIterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        return self.providers[name].stream(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: provider.stats() for name, provider in self.providers.items()}
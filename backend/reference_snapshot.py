@@ -0,0 +1,299 @@
+"""
+Read-only reference data shared by every server worker through one memory-mapped file.
+
+The reference data is the MSP/mandi price table and the government scheme
+catalog. It is published as a single snapshot file:
+
+- a fixed header: magic, format, data version, publish time, and where the
+  directory is;
+- the sections, 8-byte aligned;
+- a JSON directory of the sections, at the end.
+
+Price columns are raw little-endian arrays that ``np.frombuffer`` reads straight
+out of the mapping. All workers therefore share the same page-cache pages
+instead of each holding its own copy. Names and schemes are small, deduplicated
+JSON documents.
+
+Publishing writes a temporary file next to the snapshot and ``os.replace``s it
+into place under a lock file, so a reader sees the old snapshot or the new one,
+never a partial write. A worker notices the new file (a new inode, checked at
+most every ``check_interval`` seconds) and maps it; a worker that still holds
+the old mapping keeps serving from it until then. Nothing restarts.
+"""
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import orjson
+
+from price_table import PriceTable
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"KISANREF"
+FORMAT_VERSION = 1
+# magic, format, data version, published_at (unix seconds), directory offset and length
+_HEADER = struct.Struct("<8sIQdQI")
+_ALIGN = 8
+
+StateData = Dict[str, List[Dict[str, Any]]]
+Listener = Callable[[Optional["ReferenceData"], "ReferenceData"], None]
+
+
+class SnapshotError(ValueError):
+    """The file isn't a readable reference snapshot"""
+
+
+def seed_digest(state_data: StateData, schemes: List[Dict[str, Any]]) -> str:
+    """Fingerprint of the data a snapshot line started from, to detect a changed seed on deploy"""
+    payload = orjson.dumps({"prices": state_data, "schemes": schemes}, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def write_snapshot(
+    path: Path,
+    version: int,
+    arrays: Dict[str, np.ndarray],
+    documents: Dict[str, Any],
+    meta: Optional[Dict[str, Any]] = None
+) -> int:
+    """Atomically replace ``path`` with a new snapshot; returns its size in bytes"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    sections: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+                sections[name] = _write_section(f, "array", array.tobytes(), array.dtype.str)
+            for name, document in documents.items():
+                sections[name] = _write_section(f, "json", orjson.dumps(document))
+            directory = orjson.dumps({"sections": sections, "meta": meta or {}})
+            directory_offset = f.tell()
+            f.write(directory)
+            size = f.tell()
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, version, time.time(), directory_offset, len(directory)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return size
+
+
+def _write_section(f, kind: str, blob: bytes, dtype: Optional[str] = None) -> Dict[str, Any]:
+    # Aligned so frombuffer views never straddle an element boundary
+    padding = -f.tell() % _ALIGN
+    f.write(b"\0" * padding)
+    section = {"kind": kind, "dtype": dtype, "offset": f.tell(), "length": len(blob)}
+    f.write(blob)
+    return section
+
+
+class Snapshot:
+    """One mapped snapshot file; arrays are read-only views into the mapping"""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < _HEADER.size:
+                raise SnapshotError(f"{path} is too small to be a snapshot")
+            # The mapping stays valid after the file is replaced or closed
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.inode = stat.st_ino
+        self.size = stat.st_size
+
+        magic, fmt, self.version, self.published_at, offset, length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise SnapshotError(f"{path} is not a format {FORMAT_VERSION} reference snapshot")
+        directory = orjson.loads(self._map[offset:offset + length])
+        self.sections: Dict[str, Dict[str, Any]] = directory["sections"]
+        self.meta: Dict[str, Any] = directory["meta"]
+
+    def array(self, name: str) -> np.ndarray:
+        section = self.sections[name]
+        dtype = np.dtype(section["dtype"])
+        return np.frombuffer(
+            self._map, dtype=dtype, count=section["length"] // dtype.itemsize, offset=section["offset"]
+        )
+
+    def document(self, name: str) -> Any:
+        section = self.sections[name]
+        return orjson.loads(self._map[section["offset"]:section["offset"] + section["length"]])
+
+
+PRICE_COLUMNS = ("state_codes", "crop_codes", "local_codes", "msp", "mandi", "spread", "margin")
+
+
+class ReferenceData:
+    """Reference data of one snapshot version, backed by its mapping"""
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self.version = snapshot.version
+        self.published_at = snapshot.published_at
+        self.seed_digest = snapshot.meta.get("seed_digest")
+        arrays = {name: snapshot.array(name) for name in PRICE_COLUMNS}
+        self.price_table = PriceTable.from_columns(arrays, snapshot.document("price_names"))
+        self.schemes: List[Dict[str, Any]] = snapshot.document("schemes")
+
+    @property
+    def states(self) -> List[str]:
+        return [state for state in self.price_table.state_names if self.price_table.has_state(state)]
+
+    def has_state(self, state: str) -> bool:
+        return self.price_table.has_state(state)
+
+    def state_crops(self, state: str) -> Optional[List[Dict[str, Any]]]:
+        return self.price_table.state_crops(state)
+
+    def state_data(self) -> StateData:
+        return self.price_table.state_data()
+
+
+class ReferenceStore:
+    """Publishes reference snapshots and keeps this process on the latest one"""
+
+    def __init__(self, path: Path, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.check_interval = check_interval
+        self._data: Optional[ReferenceData] = None
+        self._checked_at = 0.0
+        self._listeners: List[Listener] = []
+        self.counters = {"checks": 0, "reloads": 0, "publishes": 0, "errors": 0}
+
+    def on_change(self, listener: Listener) -> None:
+        """Call ``listener(old, new)`` whenever this process switches to another version"""
+        self._listeners.append(listener)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Serializes publishers across worker processes; readers never take it
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> Optional[ReferenceData]:
+        try:
+            return ReferenceData(Snapshot(self.path))
+        except FileNotFoundError:
+            return None
+
+    def _publish_locked(
+        self, state_data: StateData, schemes: List[Dict[str, Any]], digest: str, previous: Optional[ReferenceData]
+    ) -> int:
+        table = PriceTable.from_state_data(state_data)
+        arrays, names = table.columns()
+        version = previous.version + 1 if previous is not None else 1
+        size = write_snapshot(
+            self.path,
+            version,
+            arrays,
+            {"price_names": names, "schemes": schemes},
+            meta={"seed_digest": digest, "rows": len(table)}
+        )
+        self.counters["publishes"] += 1
+        logger.info(f"Published reference data v{version} ({len(table)} price rows, {size} bytes)")
+        return version
+
+    def ensure(self, state_data: StateData, schemes: List[Dict[str, Any]]) -> ReferenceData:
+        """Attach to the published snapshot, publishing ``state_data``/``schemes`` if it's missing or from another seed
+
+        Updates published since the seed are kept across worker restarts; a changed seed
+        (e.g. edited data in a deploy) replaces them.
+        """
+        digest = seed_digest(state_data, schemes)
+        with self._locked():
+            try:
+                current = self._read()
+            except ValueError as e:
+                logger.warning(f"Ignoring unreadable reference snapshot {self.path}: {e}")
+                current = None
+            if current is None or current.seed_digest != digest:
+                self._publish_locked(state_data, schemes, digest, current)
+        self.refresh(force=True)
+        return self._data
+
+    def publish(self, mutate: Callable[[StateData, List[Dict[str, Any]]], None]) -> int:
+        """Publish a new version with ``mutate(state_data, schemes)`` applied to the latest one; returns its version
+
+        Blocks on the lock, the write and fsync, and doesn't switch this process to the new
+        version: async callers run it in a thread, then ``refresh(force=True)``.
+        """
+        with self._locked():
+            # Re-read under the lock so concurrent updates from other workers aren't lost
+            latest = self._read()
+            if latest is None:
+                raise RuntimeError(f"No reference snapshot at {self.path} to update")
+            state_data, schemes = latest.state_data(), latest.schemes
+            mutate(state_data, schemes)
+            return self._publish_locked(state_data, schemes, latest.seed_digest, latest)
+
+    def update(self, mutate: Callable[[StateData, List[Dict[str, Any]]], None]) -> ReferenceData:
+        """``publish``, then switch this process to the new version"""
+        self.publish(mutate)
+        self.refresh(force=True)
+        return self._data
+
+    def refresh(self, force: bool = False) -> bool:
+        """Map a newly published snapshot, if any; True when this process switched to it"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        self.counters["checks"] += 1
+        try:
+            inode = os.stat(self.path).st_ino
+            if self._data is not None and inode == self._data.snapshot.inode:
+                return False
+            data = self._read()
+        except Exception as e:
+            # Keep serving the mapped version; a bad publish shouldn't take workers down
+            self.counters["errors"] += 1
+            logger.error(f"Reloading reference snapshot {self.path} failed: {e}")
+            return False
+        if data is None:
+            return False
+
+        old, self._data = self._data, data
+        self.counters["reloads"] += 1
+        for listener in self._listeners:
+            listener(old, data)
+        return True
+
+    def current(self) -> ReferenceData:
+        """The latest published reference data (checked for updates at most every ``check_interval``)"""
+        self.refresh()
+        if self._data is None:
+            raise RuntimeError(f"Reference data used before a snapshot was published to {self.path}")
+        return self._data
+
+    def stats(self) -> Dict[str, Any]:
+        data = self._data
+        return {
+            **self.counters,
+            "path": str(self.path),
+            "version": data.version if data else None,
+            "published_at": data.published_at if data else None,
+            "age_seconds": round(time.time() - data.published_at, 1) if data else None,
+            "mapped_bytes": data.snapshot.size if data else 0,
+            "price_rows": len(data.price_table) if data else 0,
+            "schemes": len(data.schemes) if data else 0,
+            "pid": os.getpid(),
+        }
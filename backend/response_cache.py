@@ -0,0 +1,87 @@
+"""
+Precomputed, serialized API responses invalidated by a data version number.
+
+Each key (e.g. ``(state, language)``) is built once per data version, encoded to
+JSON bytes once (as a ``CachedBody`` carrying its ETag, Last-Modified time and
+compressed variants), and then served straight from memory. Bumping the version
+drops every cached body; the next request for a key rebuilds it. Concurrent
+requests for a key that is being built wait on the same build.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+
+from http_cache import CachedBody
+
+# The options FastAPI's ORJSONResponse uses, so pre-serialized and live bodies encode identically
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def encode_json(payload: Any) -> bytes:
+    return orjson.dumps(payload, option=JSON_OPTIONS)
+
+
+class VersionedResponseCache:
+    """Serialized response bodies keyed by request parameters and a data version"""
+
+    def __init__(self, name: str, version: int = 1):
+        self.name = name
+        self.version = version
+        self.updated_at = datetime.now(timezone.utc)
+        self._bodies: Dict[Hashable, CachedBody] = {}
+        self._building: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def bump_version(self) -> int:
+        """Invalidate every cached body; call whenever the underlying data changes"""
+        self.version += 1
+        self.updated_at = datetime.now(timezone.utc)
+        self._bodies.clear()
+        self.counters["invalidations"] += 1
+        return self.version
+
+    async def get_or_build(self, key: Hashable, builder: Callable[[int], Awaitable[Any]]) -> CachedBody:
+        """Return the cached body for ``key``, building it with ``builder(version)`` on a miss"""
+        body = self._bodies.get(key)
+        if body is not None:
+            self.counters["hits"] += 1
+            return body
+
+        build_key = (self.version, key)
+        task = self._building.get(build_key)
+        if task is None:
+            self.counters["misses"] += 1
+            # Build in its own task so a disconnecting client doesn't cancel it for other waiters
+            task = asyncio.create_task(self._build(build_key, builder))
+            self._building[build_key] = task
+        else:
+            self.counters["hits"] += 1
+        return await asyncio.shield(task)
+
+    async def _build(self, build_key: Tuple[int, Hashable], builder: Callable[[int], Awaitable[Any]]) -> CachedBody:
+        version, key = build_key
+        try:
+            payload = await builder(version)
+            body = CachedBody(encode_json(payload), self.updated_at)
+            # Don't cache a body built from data that changed mid-build, or from fallback provider answers
+            if version == self.version and not (isinstance(payload, dict) and payload.get("degraded")):
+                self._bodies[key] = body
+            return body
+        finally:
+            self._building.pop(build_key, None)
+
+    def peek(self, key: Hashable) -> Optional[CachedBody]:
+        return self._bodies.get(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "version": self.version,
+            "entries": len(self._bodies),
+            "bytes": sum(len(cached.body) for cached in self._bodies.values()),
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
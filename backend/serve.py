@@ -0,0 +1,62 @@
+"""
+Multi-worker launcher for the API.
+
+    cd backend
+    python serve.py --workers 4 --port 8001
+
+Runs ``--workers`` uvicorn worker processes for ``server:app``. They share the
+reference data (prices, government schemes) through one memory-mapped snapshot
+at ``REFERENCE_SNAPSHOT_PATH``. The first worker to start publishes it and the
+rest map the same file. An update published by any worker reaches the others
+within ``REFERENCE_SNAPSHOT_CHECK_SECONDS``, without a restart.
+
+Market trends are shared the same way: ``/api/market-trends/rebuild`` runs in
+one worker and publishes the rebuilt series to ``trends.snapshot`` next to the
+reference snapshot, which the other workers load within the same interval.
+
+Each worker gets an image preprocessing pool sized so that all workers together
+don't start more processes than there are cores. Everything else (response
+caches, metrics, provider circuit breakers) is per worker.
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+
+
+def main():
+    from dotenv import load_dotenv
+
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Kisan AI multi-worker API server")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", cpus)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / ".env")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    # Workers inherit the environment; explicit settings in it win over these defaults
+    os.environ.setdefault("REFERENCE_SNAPSHOT_PATH", str(Path(__file__).parent / "data" / "reference.snapshot"))
+    os.environ.setdefault("IMAGE_PREPROCESS_WORKERS", str(max(1, cpus // args.workers)))
+    logging.getLogger(__name__).info(
+        f"Starting {args.workers} workers; reference data at {os.environ['REFERENCE_SNAPSHOT_PATH']}"
+    )
+
+    import uvicorn
+
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        app_dir=str(Path(__file__).parent)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,82 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import (
+    FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Request, Response, Query, Header, Depends,
+    WebSocket, WebSocketDisconnect
+)
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 from starlette.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.responses import PlainTextResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import base64
+import binascii
+import hmac
+import io
 import json
 import asyncio
+import time
+import wave
+
+from image_store import create_image_store
+from image_preprocess import ImagePreprocessor, ImageRejected
+from vision_cache import VisionResultCache
+from batching import MicroBatcher
+from response_cache import VersionedResponseCache, encode_json
+from http_cache import CACHE_CATALOG, CACHE_PRICES, CACHE_STATIC, CachedBody, cached_response, file_response
+from singleflight import SingleFlightCache, normalize_prompt
+from reference_snapshot import ReferenceData, ReferenceStore
+from price_history import (
+    DOWNSAMPLE_INTERVALS, PriceHistoryUnavailable, ensure_price_history_collection, load_daily_series,
+    query_price_history
+)
+from trends import TrendEngine, TrendStore
+from translation_memory import TranslationMemory
+from i18n import DEFAULT_LANGUAGE, compile_bundles, load_ui_strings, localized
+from tts_cache import TTSAudioCache
+from voice_pipeline import speak_as_generated
+from write_behind import WriteBehindQueue
+from analysis_history import ensure_history_indexes, list_history
+from observability import (
+    MetricsMiddleware, MongoCommandListener, configure_trace_export, registry as metrics_registry, traced
+)
+from disease_rollups import (
+    ROLLUP_COLLECTION, ROLLUP_INTERVALS, apply_rollups, ensure_rollup_indexes, query_outbreaks
+)
+from provider_gateway import CallerInput, ProviderError, ProviderGateway
+from http_pool import HTTPClientPool
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Every MongoDB command is timed for /metrics
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandListener()])
 db = client[os.environ['DB_NAME']]
 
-# Create the main app without a prefix
-app = FastAPI()
+# Content-addressed image storage (GridFS or local blob directory)
+image_store = create_image_store(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """App startup and shutdown (see ``startup`` and ``shutdown`` at the end of this module)"""
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+# Create the main app without a prefix; responses are serialized with orjson
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Whether MongoDB supports the price history collection; set at startup by create_indexes
+app.state.price_history = False
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -33,14 +87,54 @@ GEMINI_VISION_API_KEY = os.environ.get('GEMINI_VISION_API_KEY', 'YOUR_GEMINI_VIS
 VERTEX_AI_API_KEY = os.environ.get('VERTEX_AI_API_KEY', 'YOUR_VERTEX_AI_KEY_HERE')
 GOOGLE_TRANSLATE_API_KEY = os.environ.get('GOOGLE_TRANSLATE_API_KEY', 'YOUR_TRANSLATE_KEY_HERE')
 
+# Bearer token for routes that change shared data; unset disables them
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN', '')
+
+# Upload limits for crop images (raw bytes, after base64 decoding)
+MAX_IMAGE_UPLOAD_BYTES = int(os.environ.get('MAX_IMAGE_UPLOAD_BYTES', 10 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Streaming speech-to-text limits
+MAX_AUDIO_STREAM_BYTES = int(os.environ.get('MAX_AUDIO_STREAM_BYTES', 5 * 1024 * 1024))
+AUDIO_STREAM_QUEUE_SIZE = 32
+
+# Synthesized speech cached on disk by (text, language, voice)
+tts_cache = TTSAudioCache(
+    Path(os.environ.get('TTS_CACHE_DIR', ROOT_DIR / 'data' / 'tts')),
+    max_bytes=int(os.environ.get('TTS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+)
+DEFAULT_TTS_VOICE = "standard"
+
+# Crop analysis records are written in the background, batched with insert_many
+crop_analysis_writer = WriteBehindQueue(
+    db.crop_analyses,
+    max_batch_size=int(os.environ.get('CROP_ANALYSIS_WRITE_BATCH_SIZE', 100)),
+    flush_interval_ms=float(os.environ.get('CROP_ANALYSIS_WRITE_INTERVAL_MS', 50)),
+    max_queue_size=int(os.environ.get('CROP_ANALYSIS_WRITE_QUEUE_SIZE', 10000)),
+    name="crop_analyses",
+    # Keep outbreak rollups current with every batch that is written
+    after_write=lambda analyses: apply_rollups(db[ROLLUP_COLLECTION], analyses)
+)
+
+# Vision result cache (exact + perceptual image hash)
+vision_cache = VisionResultCache(
+    max_entries=int(os.environ.get('VISION_CACHE_MAX_ENTRIES', 2048)),
+    ttl_seconds=int(os.environ.get('VISION_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+    max_distance=int(os.environ.get('VISION_CACHE_MAX_DISTANCE', 4)),
+    collection=db.vision_cache if os.environ.get('VISION_CACHE_PERSIST', 'true').lower() == 'true' else None
+)
+
 # Define Models
 class CropDiseaseAnalysis(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    image_base64: str
+    image_sha256: str  # Key into the image store
+    image_size: int
+    image_content_type: str
     disease_name: str
     confidence: float
     treatment: str
     treatment_hi: str  # Hindi translation
+    state: Optional[str] = None  # Region, for outbreak rollups
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 class MarketPrice(BaseModel):
@@ -48,7 +142,7 @@ class MarketPrice(BaseModel):
     crop_name_local: str
     msp_price: float
     mandi_price: float
-    profit_margin: float
+    profit_margin: Optional[float]
     recommendation: str
     recommendation_local: str
 
@@ -76,13 +170,28 @@ class TranslationRequest(BaseModel):
     text: str
     target_language: str
 
+class BatchTranslationRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=500)
+    target_language: str
+
 class VoiceRequest(BaseModel):
     audio_base64: str
     language: str
 
+class CropPriceUpdate(BaseModel):
+    name: str
+    name_hi: Optional[str] = None
+    name_local: Optional[str] = None
+    msp: float = Field(..., gt=0)
+    mandi: float = Field(..., ge=0)
+
+class StatePricesUpdate(BaseModel):
+    crops: List[CropPriceUpdate] = Field(..., min_length=1)
+
 # MOCK API FUNCTIONS (Replace these when you add your API keys)
 
-async def mock_gemini_vision_analysis(image_base64: str) -> Dict[str, Any]:
+@traced("provider", "gemini_vision")
+async def mock_gemini_vision_analysis(image_bytes: bytes) -> Dict[str, Any]:
     """Mock function for Gemini Vision API - Replace with actual API call"""
     # Simulated crop disease analysis
     diseases = [
@@ -102,6 +211,12 @@ async def mock_gemini_vision_analysis(image_base64: str) -> Dict[str, Any]:
         "treatment_hi": selected_disease["treatment_hi"]
     }
 
+@traced("provider", "gemini_vision_batch")
+async def mock_gemini_vision_batch_analysis(images: List[bytes]) -> List[Dict[str, Any]]:
+    """Mock batched Gemini Vision call - Replace with one multi-image API request"""
+    return [await mock_gemini_vision_analysis(image_bytes) for image_bytes in images]
+
+@traced("provider", "gemini_pro")
 async def mock_gemini_pro_recommendation(prompt: str, language: str = "en") -> str:
     """Mock function for Gemini Pro API - Replace with actual API call"""
     recommendations = {
@@ -116,31 +231,47 @@ async def mock_gemini_pro_recommendation(prompt: str, language: str = "en") -> s
     else:
         return recommendations["farming_hi"] if language == "hi" else recommendations["farming"]
 
+@traced("provider", "gemini_pro_stream")
+async def mock_gemini_pro_recommendation_stream(prompt: str, language: str = "en") -> AsyncIterator[str]:
+    """Mock streaming Gemini Pro API - Replace with a streamGenerateContent call"""
+    text = await mock_gemini_pro_recommendation(prompt, language)
+    # Stream the answer a few words at a time, like generated tokens
+    words = text.split(" ")
+    for i in range(0, len(words), 3):
+        yield " ".join(words[i:i + 3]) + (" " if i + 3 < len(words) else "")
+
+# Sample translations for common farming terms
+MOCK_TRANSLATIONS = {
+    "hi": {
+        "Crop Disease Detection": "फसल रोग का पता लगाना",
+        "Market Prices": "बाजार की कीमतें",
+        "Government Schemes": "सरकारी योजनाएं",
+        "My Farm": "मेरा खेत",
+        "Upload Image": "चित्र अपलोड करें",
+        "Capture Photo": "फोटो लें",
+        "Healthy": "स्वस्थ",
+        "Treatment": "उपचार",
+        "Recommendation": "सिफारिश"
+    },
+    "ta": {
+        "Crop Disease Detection": "பயிர் நோய் கண்டறிதல்",
+        "Market Prices": "சந்தை விலைகள்",
+        "Government Schemes": "அரசு திட்டங்கள்",
+        "My Farm": "என் பண்ணை"
+    }
+}
+
+@traced("provider", "translate")
 async def mock_translate_text(text: str, target_language: str) -> str:
     """Mock function for Google Translate API - Replace with actual API call"""
-    # Sample translations for common farming terms
-    translations = {
-        "hi": {
-            "Crop Disease Detection": "फसल रोग का पता लगाना",
-            "Market Prices": "बाजार की कीमतें",
-            "Government Schemes": "सरकारी योजनाएं",
-            "My Farm": "मेरा खेत",
-            "Upload Image": "चित्र अपलोड करें",
-            "Capture Photo": "फोटो लें",
-            "Healthy": "स्वस्थ",
-            "Treatment": "उपचार",
-            "Recommendation": "सिफारिश"
-        },
-        "ta": {
-            "Crop Disease Detection": "பயிர் நோய் கண்டறிதல்",
-            "Market Prices": "சந்தை விலைகள்",
-            "Government Schemes": "அரசு திட்டங்கள்",
-            "My Farm": "என் பண்ணை"
-        }
-    }
-    
-    return translations.get(target_language, {}).get(text, f"[Translated: {text}]")
+    return MOCK_TRANSLATIONS.get(target_language, {}).get(text, f"[Translated: {text}]")
 
+@traced("provider", "translate_batch")
+async def mock_translate_batch(texts: List[str], target_language: str) -> List[str]:
+    """Mock bulk Google Translate call - Replace with one API request carrying all strings"""
+    return [await mock_translate_text(text, target_language) for text in texts]
+
+@traced("provider", "speech_to_text")
 async def mock_speech_to_text(audio_base64: str, language: str) -> str:
     """Mock function for Vertex AI STT - Replace with actual API call"""
     mock_responses = {
@@ -150,10 +281,173 @@ async def mock_speech_to_text(audio_base64: str, language: str) -> str:
     }
     return mock_responses.get(language, "Audio transcription not available")
 
-async def mock_text_to_speech(text: str, language: str) -> str:
+@traced("provider", "speech_to_text_stream")
+async def mock_streaming_speech_to_text(
+    audio_chunks: AsyncIterator[bytes], language: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """Mock streaming Vertex AI STT - Replace with a streaming_recognize session
+
+    Yields interim results while audio arrives and one final result after the
+    audio stream ends. The fake recognizer reveals one word per few KB of audio.
+    """
+    words = (await mock_speech_to_text("", language)).split()
+    bytes_per_word = 4096
+    received = 0
+    revealed = 0
+    async for chunk in audio_chunks:
+        received += len(chunk)
+        available = min(len(words), received // bytes_per_word)
+        if available > revealed:
+            revealed = available
+            yield {"is_final": False, "transcript": " ".join(words[:revealed])}
+    yield {"is_final": True, "transcript": " ".join(words)}
+
+@traced("provider", "text_to_speech")
+async def mock_text_to_speech(text: str, language: str, voice: Optional[str] = None) -> str:
     """Mock function for Vertex AI TTS - Replace with actual API call"""
-    # Return base64 encoded audio placeholder
-    return "UklGRjIAAABXQVZFZm10IBIAAAABAAEAQB8AAEAfAAABAAgAZGF0YQ4AAAC"  # Placeholder audio
+    # Return base64 encoded audio placeholder: silence, about 60 ms per character
+    sample_rate = 16000
+    frames = sample_rate * min(len(text), 1000) * 60 // 1000
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * frames)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+# Shared keep-alive connection pools for the provider APIs, opened and closed with the app
+http_clients = HTTPClientPool({
+    "gemini": {"base_url": "https://generativelanguage.googleapis.com", "max_connections": 32},
+    "translate": {
+        "base_url": "https://translation.googleapis.com", "max_connections": 32, "max_keepalive_connections": 32
+    },
+    "vertex_speech": {"base_url": "https://speech.googleapis.com"},
+    "vertex_tts": {"base_url": "https://texttospeech.googleapis.com"},
+})
+
+# Every provider call goes through the gateway: deadlines, bounded concurrency,
+# circuit breakers and, where enabled, hedged retries past a latency percentile.
+# Each policy field can be overridden with PROVIDER_<NAME>_<FIELD>; hedging is off
+# unless PROVIDER_<NAME>_HEDGE_PERCENTILE is set, since every provider bills per call.
+providers = ProviderGateway({
+    # A batch of images is too expensive to send twice, so vision is never hedged
+    "gemini_vision": {"timeout": 20.0, "max_concurrency": 8, "hedge_percentile": None},
+    "gemini_pro": {"timeout": 15.0, "max_concurrency": 16},
+    "translate": {"timeout": 5.0, "max_concurrency": 32},
+    "speech_to_text": {"timeout": 10.0, "max_concurrency": 16},
+    "text_to_speech": {"timeout": 10.0, "max_concurrency": 16},
+})
+
+FALLBACK_RECOMMENDATIONS = {
+    "en": "Advice is temporarily unavailable. Compare the MSP with your local mandi price before selling",
+    "hi": "सलाह अभी उपलब्ध नहीं है। बेचने से पहले MSP और अपनी स्थानीय मंडी की कीमत की तुलना करें"
+}
+
+def fallback_recommendation(language: str) -> str:
+    return FALLBACK_RECOMMENDATIONS.get(language, FALLBACK_RECOMMENDATIONS["en"])
+
+async def analyze_images(images: List[bytes]) -> List[Dict[str, Any]]:
+    # Mock vision - Replace with actual Gemini Vision API (over http_clients["gemini"])
+    return await providers.call("gemini_vision", mock_gemini_vision_batch_analysis, images)
+
+async def transcribe_speech(audio_base64: str, language: str) -> str:
+    # Mock STT - Replace with actual Vertex AI STT API (over http_clients["vertex_speech"])
+    return await providers.call("speech_to_text", mock_speech_to_text, audio_base64, language)
+
+async def translate_strings(texts: List[str], target_language: str) -> List[str]:
+    # Mock translation - Replace with actual Google Translate API (over http_clients["translate"])
+    return await providers.call("translate", mock_translate_batch, texts, target_language)
+
+async def synthesize_speech(text: str, language: str, voice: str) -> bytes:
+    # Mock TTS - Replace with actual Vertex AI TTS API (over http_clients["vertex_tts"])
+    return base64.b64decode(await providers.call("text_to_speech", mock_text_to_speech, text, language, voice))
+
+# Upload preprocessing runs in worker processes (IMAGE_PREPROCESS_WORKERS=0 runs it in a thread instead)
+image_preprocessor = ImagePreprocessor(
+    workers=int(os.environ.get('IMAGE_PREPROCESS_WORKERS', min(4, os.cpu_count() or 1))),
+    max_side=int(os.environ.get('IMAGE_MAX_SIDE', 1280)),
+    quality=int(os.environ.get('IMAGE_JPEG_QUALITY', 85)),
+    max_pixels=int(os.environ.get('IMAGE_MAX_PIXELS', 50_000_000))
+)
+
+# Concurrent vision requests are grouped into one provider call
+vision_batcher = MicroBatcher(
+    analyze_images,
+    max_batch_size=int(os.environ.get('VISION_BATCH_MAX_SIZE', 8)),
+    max_wait_ms=float(os.environ.get('VISION_BATCH_MAX_WAIT_MS', 25)),
+    name="vision"
+)
+
+# Shared LLM recommendation layer: identical prompts share one call, results kept with a TTL
+recommendation_cache = SingleFlightCache(
+    "recommendations",
+    ttl_seconds=float(os.environ.get('RECOMMENDATION_CACHE_TTL_SECONDS', 6 * 3600)),
+    max_entries=int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', 4096)),
+    max_concurrency=int(os.environ.get('RECOMMENDATION_MAX_CONCURRENCY', 8))
+)
+
+async def get_recommendation(prompt: str, language: str = "en") -> str:
+    """Cached, single-flight wrapper around the Gemini Pro recommendation call
+
+    If the provider fails, an expired cached answer is served instead; with none
+    available the ProviderError propagates.
+    """
+    key = (normalize_prompt(prompt), language)
+    try:
+        return await recommendation_cache.get(
+            key, lambda: providers.call("gemini_pro", mock_gemini_pro_recommendation, prompt, language)
+        )
+    except ProviderError:
+        stale = recommendation_cache.peek(key, allow_stale=True)
+        if stale is None:
+            raise
+        return stale
+
+async def get_recommendations(prompts: List[str], language: str = "en") -> List[str]:
+    """Fan out recommendation calls concurrently, bounded by the cache's concurrency limit"""
+    return list(await asyncio.gather(*[get_recommendation(prompt, language) for prompt in prompts]))
+
+# Translation memory: in-process LRU backed by the translation_memory collection.
+# Change TRANSLATION_PROVIDER when replacing the mock so its placeholder output stops being served
+translation_memory = TranslationMemory(
+    collection=db.translation_memory,
+    max_entries=int(os.environ.get('TRANSLATION_MEMORY_MAX_ENTRIES', 20000)),
+    ttl_seconds=int(os.environ.get('TRANSLATION_MEMORY_TTL_SECONDS', 30 * 24 * 3600)),
+    provider=os.environ.get('TRANSLATION_PROVIDER', 'mock')
+)
+
+SUPPORTED_LANGUAGES = [
+    {"code": "en", "name": "English", "native_name": "English"},
+    {"code": "hi", "name": "Hindi", "native_name": "हिंदी"},
+    {"code": "mr", "name": "Marathi", "native_name": "मराठी"},
+    {"code": "bn", "name": "Bengali", "native_name": "বাংলা"},
+    {"code": "gu", "name": "Gujarati", "native_name": "ગુજરાતી"},
+    {"code": "ta", "name": "Tamil", "native_name": "தமிழ்"},
+    {"code": "te", "name": "Telugu", "native_name": "తెలుగు"},
+    {"code": "kn", "name": "Kannada", "native_name": "ಕನ್ನಡ"},
+    {"code": "ml", "name": "Malayalam", "native_name": "മലയാളം"},
+    {"code": "pa", "name": "Punjabi", "native_name": "ਪੰਜਾਬੀ"},
+    {"code": "as", "name": "Assamese", "native_name": "অসমীয়া"},
+    {"code": "or", "name": "Odia", "native_name": "ଓଡ଼ିଆ"},
+    {"code": "ur", "name": "Urdu", "native_name": "اردو"},
+    {"code": "sa", "name": "Sanskrit", "native_name": "संस्कृत"},
+    {"code": "ne", "name": "Nepali", "native_name": "नेपाली"},
+    {"code": "mni", "name": "Manipuri", "native_name": "ꯃꯤꯇꯩꯂꯣꯟ"}
+]
+
+# Precompiled UI string bundles, one per supported language
+STRING_BUNDLES = compile_bundles(load_ui_strings(), [lang["code"] for lang in SUPPORTED_LANGUAGES])
+
+def normalize_language(language: str) -> str:
+    """Map unsupported language codes to the default so they share cache entries"""
+    return language if language in STRING_BUNDLES else DEFAULT_LANGUAGE
+
+# Static catalog bodies, serialized once and compressed on first use
+LANGUAGES_BODY = CachedBody(encode_json({"success": True, "languages": SUPPORTED_LANGUAGES}))
+STRING_BUNDLE_BODIES = {
+    code: CachedBody(bundle.body, etag=bundle.etag) for code, bundle in STRING_BUNDLES.items()
+}
 
 # STATE-WISE MSP DATA - Complete Indian Agricultural States
 STATE_MSP_DATA = {
@@ -256,6 +550,34 @@ STATE_MSP_DATA = {
     ]
 }
 
+# Serialized /market-prices responses per (state, language); bump on any price change
+market_price_cache = VersionedResponseCache("market_prices")
+
+# Rolling per-(state, crop) price statistics driving sell/hold advice
+trend_engine = TrendEngine()
+
+async def update_state_prices(state: str, crops: List[Dict[str, Any]]) -> int:
+    """Replace the crop prices for a state and publish them to every worker; returns the new data version"""
+    def replace(state_data: Dict[str, List[Dict[str, Any]]], schemes: List[Dict[str, Any]]) -> None:
+        state_data[state] = crops
+    # The publish lock, write and fsync stay off the event loop; the change listeners then run on it
+    version = await asyncio.to_thread(reference_store.publish, replace)
+    reference_store.refresh(force=True)
+    return version
+
+async def rebuild_trends(days: int = 180) -> int:
+    """Recompute all trend series from stored price history, e.g. after a bulk load"""
+    if not app.state.price_history:
+        raise PriceHistoryUnavailable("Trend rebuilds need price history, which requires MongoDB 5.0 or newer")
+    prices = await load_daily_series(db, datetime.utcnow() - timedelta(days=days))
+    if prices.empty:
+        return 0
+    series = await asyncio.to_thread(trend_engine.rebuild, prices)
+    # The other workers load the rebuilt series from the published file
+    await asyncio.to_thread(trend_store.publish, trend_engine.export())
+    market_price_cache.bump_version()
+    return series
+
 GOVERNMENT_SCHEMES = [
     {
         "name": "PM-KISAN",
@@ -277,6 +599,202 @@ GOVERNMENT_SCHEMES = [
     }
 ]
 
+# Mock farm tasks - can be personalized based on user's crop and location
+MOCK_FARM_TASKS = [
+    {
+        "task_name": "Apply Fertilizer",
+        "task_name_hi": "उर्वरक डालें",
+        "description": "Apply NPK fertilizer to wheat crop",
+        "description_hi": "गेहूं की फसल में NPK उर्वरक डालें",
+        "due_date": "2025-01-20",
+        "priority": "high"
+    },
+    {
+        "task_name": "Irrigation",
+        "task_name_hi": "सिंचाई",
+        "description": "Water the crops in the morning",
+        "description_hi": "सुबह के समय फसलों की सिंचाई करें",
+        "due_date": "2025-01-18",
+        "priority": "medium"
+    }
+]
+
+def scheme_payload(schemes: List[Dict[str, Any]], language: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "schemes": [
+            {
+                "name": scheme["name"],
+                "name_local": localized(scheme, "name", language),
+                "description": localized(scheme, "description", language),
+                "eligibility": localized(scheme, "eligibility", language),
+                "link": scheme["link"]
+            }
+            for scheme in schemes
+        ]
+    }
+
+def farm_task_payload(language: str) -> Dict[str, Any]:
+    # Same fields as FarmTask, built as plain dicts; ids derive from the task so they stay stable
+    return {
+        "success": True,
+        "tasks": [
+            {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"kisan-ai/farm-task/{task['task_name']}")),
+                "task_name": task["task_name"],
+                "task_name_local": localized(task, "task_name", language),
+                "description": localized(task, "description", language),
+                "description_local": localized(task, "description", language),
+                "due_date": task["due_date"],
+                "priority": task["priority"],
+                "completed": False
+            }
+            for task in MOCK_FARM_TASKS
+        ]
+    }
+
+# Static bodies per language, serialized once at import and compressed on first use
+FARM_TASK_BODIES = {code: CachedBody(encode_json(farm_task_payload(code))) for code in STRING_BUNDLES}
+
+# Prices and schemes as served: one memory-mapped snapshot shared read-only by every worker process.
+# STATE_MSP_DATA and GOVERNMENT_SCHEMES only seed it; update_state_prices publishes new versions.
+reference_store = ReferenceStore(
+    Path(os.environ.get('REFERENCE_SNAPSHOT_PATH', ROOT_DIR / 'data' / 'reference.snapshot')),
+    check_interval=float(os.environ.get('REFERENCE_SNAPSHOT_CHECK_SECONDS', 1.0))
+)
+
+# Serialized /government-schemes responses per language; bumped with each reference data version
+catalog_cache = VersionedResponseCache("catalog")
+
+def apply_reference_update(old: Optional[ReferenceData], new: ReferenceData) -> None:
+    """Feed changed mandi prices to the trend engine and drop responses built from the old version"""
+    for state in new.states:
+        previous = {crop["name"]: crop["mandi"] for crop in (old.state_crops(state) or [])} if old else {}
+        for crop in new.state_crops(state):
+            if previous.get(crop["name"]) != crop["mandi"]:
+                trend_engine.observe(state, crop["name"], crop["mandi"])
+    if old is not None:
+        market_price_cache.bump_version()
+        catalog_cache.bump_version()
+
+reference_store.on_change(apply_reference_update)
+reference_store.ensure(STATE_MSP_DATA, GOVERNMENT_SCHEMES)
+
+# Trend rebuilds are published next to the reference snapshot and loaded by every worker
+trend_store = TrendStore(
+    trend_engine, reference_store.path.with_name('trends.snapshot'), check_interval=reference_store.check_interval
+)
+trend_store.on_load(market_price_cache.bump_version)
+
+# IMAGE UPLOAD HELPERS
+
+def _image_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Image exceeds maximum upload size of {MAX_IMAGE_UPLOAD_BYTES} bytes"
+    )
+
+def _check_content_length(request: Request, limit: int) -> None:
+    """Reject oversized uploads up front when the client declares a Content-Length"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise _image_too_large()
+
+def decode_image_base64(image_base64: str) -> bytes:
+    """Decode a base64 image form field, accepting an optional data URL prefix"""
+    if image_base64.startswith("data:") and "," in image_base64:
+        image_base64 = image_base64.split(",", 1)[1]
+    # Decoded size is ~3/4 of the encoded size; check before allocating the bytes
+    if len(image_base64) * 3 // 4 > MAX_IMAGE_UPLOAD_BYTES:
+        raise _image_too_large()
+    try:
+        return base64.b64decode(image_base64, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="image_base64 is not valid base64")
+
+async def read_upload_file(upload: UploadFile, limit: Optional[int] = None) -> bytes:
+    """Read a multipart file part in chunks, enforcing the size limit"""
+    limit = limit or MAX_IMAGE_UPLOAD_BYTES
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > limit:
+            raise _image_too_large()
+    return bytes(buffer)
+
+async def read_request_stream(request: Request, limit: Optional[int] = None) -> bytes:
+    """Read a raw request body as it streams in, enforcing the size limit"""
+    limit = limit or MAX_IMAGE_UPLOAD_BYTES
+    _check_content_length(request, limit)
+    buffer = bytearray()
+    async for chunk in request.stream():
+        buffer.extend(chunk)
+        if len(buffer) > limit:
+            raise _image_too_large()
+    return bytes(buffer)
+
+async def run_crop_disease_analysis(image_bytes: bytes, language: str, state: Optional[str] = None) -> Dict[str, Any]:
+    """Run the vision analysis on raw image bytes and persist the result"""
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty image upload")
+
+    # Validate, orient, downscale and re-encode in the worker pool; the hashes come from the same pass
+    try:
+        image = await image_preprocessor.process(image_bytes)
+    except ImageRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    # Re-uploads (same original bytes) and near-identical shots are answered from the cache
+    analysis = await vision_cache.get(image.original_sha256, image.phash)
+    if analysis is None:
+        # Mock analysis (batched) - Replace with actual Gemini Vision API call
+        try:
+            analysis = await vision_batcher.submit(image.data)
+        except ProviderError as e:
+            logger.warning(f"Vision analysis unavailable: {e}")
+            raise HTTPException(status_code=503, detail="Crop analysis is temporarily unavailable, please retry")
+        await vision_cache.put(image.original_sha256, image.phash, analysis)
+
+    # Store the downscaled image once by hash; the analysis document only references it
+    await image_store.put(image.data, image.content_type)
+
+    # Save to database
+    disease_record = CropDiseaseAnalysis(
+        image_sha256=image.sha256,
+        image_size=len(image.data),
+        image_content_type=image.content_type,
+        disease_name=analysis["disease_name"],
+        confidence=analysis["confidence"],
+        treatment=analysis["treatment"],
+        treatment_hi=analysis["treatment_hi"],
+        state=state.strip() if state and state.strip() else None
+    )
+
+    # Persisted by the write-behind queue; the response doesn't wait for MongoDB
+    await crop_analysis_writer.enqueue(disease_record.dict())
+
+    return {
+        "success": True,
+        "image_sha256": image.sha256,
+        "image": {
+            "width": image.width,
+            "height": image.height,
+            "size": len(image.data),
+            "original_width": image.original_width,
+            "original_height": image.original_height,
+            "original_size": image.original_size
+        },
+        "analysis": {
+            "disease_name": analysis["disease_name"],
+            "confidence": analysis["confidence"],
+            "treatment": analysis["treatment"],
+            "treatment_local": localized(analysis, "treatment", language)
+        }
+    }
+
 # API Routes
 
 @api_router.get("/")
@@ -285,126 +803,323 @@ async def root():
 
 @api_router.post("/analyze-crop-disease")
 async def analyze_crop_disease(
-    image_base64: str = Form(...),
-    language: str = Form(default="en")
+    image: Optional[UploadFile] = File(default=None),
+    image_base64: Optional[str] = Form(default=None),
+    language: str = Form(default="en"),
+    state: Optional[str] = Form(default=None)
 ):
-    """Analyze crop disease from uploaded image using Gemini Vision"""
+    """Analyze crop disease from uploaded image using Gemini Vision
+
+    Accepts either a binary multipart file part (``image``) or, for older
+    clients, the base64 encoded ``image_base64`` form field.
+    """
     try:
-        # Mock analysis - Replace with actual Gemini Vision API call
-        analysis = await mock_gemini_vision_analysis(image_base64)
-        
-        # Save to database
-        disease_record = CropDiseaseAnalysis(
-            image_base64=image_base64,
-            disease_name=analysis["disease_name"],
-            confidence=analysis["confidence"],
-            treatment=analysis["treatment"],
-            treatment_hi=analysis["treatment_hi"]
-        )
-        
-        await db.crop_analyses.insert_one(disease_record.dict())
-        
-        return {
-            "success": True,
-            "analysis": {
-                "disease_name": analysis["disease_name"],
-                "confidence": analysis["confidence"],
-                "treatment": analysis["treatment"],
-                "treatment_local": analysis["treatment_hi"] if language == "hi" else analysis["treatment"]
-            }
-        }
+        if image is not None:
+            image_bytes = await read_upload_file(image)
+        elif image_base64:
+            image_bytes = decode_image_base64(image_base64)
+        else:
+            raise HTTPException(status_code=400, detail="Provide an image file or image_base64")
+
+        return await run_crop_disease_analysis(image_bytes, language, state)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@api_router.post("/analyze-crop-disease/raw")
+async def analyze_crop_disease_raw(request: Request, language: str = "en", state: Optional[str] = None):
+    """Analyze crop disease from a raw binary image body (application/octet-stream or image/*)"""
+    try:
+        content_type = request.headers.get("content-type", "application/octet-stream")
+        if not (content_type.startswith("application/octet-stream") or content_type.startswith("image/")):
+            raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+
+        image_bytes = await read_request_stream(request)
+        return await run_crop_disease_analysis(image_bytes, language, state)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@api_router.get("/images/{image_sha256}")
+async def get_image(image_sha256: str):
+    """Serve a stored crop image by its SHA-256 hash"""
+    if len(image_sha256) != 64 or any(c not in "0123456789abcdef" for c in image_sha256):
+        raise HTTPException(status_code=400, detail="Invalid image hash")
+
+    image = await image_store.get(image_sha256)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    # Content-addressed, so the bytes behind a hash never change
+    return Response(
+        content=image["data"],
+        media_type=image["content_type"],
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{image_sha256}"'}
+    )
+
+@api_router.get("/crop-analyses")
+async def get_analysis_history(
+    disease: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    include_image: bool = False
+):
+    """Past crop disease analyses, newest first, paged with ``next_cursor``"""
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    try:
+        page = await list_history(db.crop_analyses, limit, cursor, disease, start, end, include_image)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get analysis history: {str(e)}")
+
+    for item in page["items"]:
+        if item.get("image_sha256"):
+            item["image_url"] = f"/api/images/{item['image_sha256']}"
+    return ORJSONResponse({"success": True, **page})
+
+@api_router.get("/disease-outbreaks")
+async def get_disease_outbreaks(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: str = "week",
+    state: Optional[str] = None,
+    disease: Optional[str] = None
+):
+    """Disease counts and average confidence per state and period, read from the rollups"""
+    if interval not in ROLLUP_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(ROLLUP_INTERVALS)}")
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(weeks=12)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    try:
+        periods = await query_outbreaks(db[ROLLUP_COLLECTION], start, end, interval, state, disease)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get disease outbreaks: {str(e)}")
+
+    totals: Dict[str, int] = {}
+    for period in periods:
+        totals[period["disease"]] = totals.get(period["disease"], 0) + period["count"]
+    return ORJSONResponse({
+        "success": True,
+        "interval": interval,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "totals": dict(sorted(totals.items(), key=lambda item: -item[1])),
+        "periods": periods
+    })
+
+async def build_market_prices(state: str, language: str, reference: ReferenceData) -> Dict[str, Any]:
+    """Build the full /market-prices response for one state and language"""
+    crops_data = reference.state_crops(state)
+
+    # Advice comes from the trend engine; the LLM is only asked for crops without enough history
+    recommendations = [trend_engine.recommendation(state, crop["name"], language) for crop in crops_data]
+    missing = [i for i, recommendation in enumerate(recommendations) if recommendation is None]
+    degraded = False
+    if missing:
+        try:
+            generated = await get_recommendations(
+                [f"market price for {crops_data[i]['name']}" for i in missing], language
+            )
+        except ProviderError as e:
+            # Prices are still worth serving; the fallback advice keeps this response out of the cache
+            logger.warning(f"Market recommendations unavailable for {state}: {e}")
+            generated = [fallback_recommendation(language)] * len(missing)
+            degraded = True
+        for i, recommendation in zip(missing, generated):
+            recommendations[i] = recommendation
+
+    market_prices = []
+    for crop, recommendation in zip(crops_data, recommendations):
+        # No margin without an MSP, as in PriceTable
+        profit_margin = ((crop["mandi"] - crop["msp"]) / crop["msp"]) * 100 if crop["msp"] > 0 else None
+        trend = trend_engine.get(state, crop["name"])
+        market_prices.append({
+            "crop_name": crop["name"],
+            "crop_name_local": crop.get("name_hi", crop["name"]),
+            "msp_price": crop["msp"],
+            "mandi_price": crop["mandi"],
+            "profit_margin": round(profit_margin, 2) if profit_margin is not None else None,
+            "recommendation": recommendation,
+            "trend": trend.to_dict() if trend else None
+        })
+
+    response = {"success": True, "state": state, "prices": market_prices, "data_version": reference.version}
+    if degraded:
+        response["degraded"] = True
+    return response
+
+async def warm_market_price_cache(languages: List[str]) -> None:
+    reference = reference_store.current()
+    for state in reference.states:
+        for language in languages:
+            await market_price_cache.get_or_build(
+                (state, language), lambda version: build_market_prices(state, language, reference)
+            )
+
 @api_router.get("/market-prices/{state}")
-async def get_market_prices(state: str, language: str = "en"):
+async def get_market_prices(state: str, request: Request, language: str = "en"):
     """Get MSP and mandi prices for crops by state"""
     try:
-        crops_data = STATE_MSP_DATA.get(state, [])
-        if not crops_data:
+        reference = reference_store.current()
+        if not reference.has_state(state):
             raise HTTPException(status_code=404, detail="State not found")
-        
-        market_prices = []
-        for crop in crops_data:
-            profit_margin = ((crop["mandi"] - crop["msp"]) / crop["msp"]) * 100
-            recommendation = await mock_gemini_pro_recommendation(f"market price for {crop['name']}", language)
-            
-            market_prices.append({
-                "crop_name": crop["name"],
-                "crop_name_local": crop.get("name_hi", crop["name"]),
-                "msp_price": crop["msp"],
-                "mandi_price": crop["mandi"],
-                "profit_margin": round(profit_margin, 2),
-                "recommendation": recommendation
-            })
-        
-        return {"success": True, "state": state, "prices": market_prices}
+
+        trend_store.refresh()
+        language = normalize_language(language)
+        cached = await market_price_cache.get_or_build(
+            (state, language), lambda version: build_market_prices(state, language, reference)
+        )
+        return cached_response(request, cached, CACHE_PRICES)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get market prices: {str(e)}")
 
-@api_router.get("/government-schemes")
-async def get_government_schemes(language: str = "en"):
-    """Get list of government schemes for farmers"""
+def require_admin(authorization: Optional[str] = Header(default=None)) -> None:
+    """Dependency for routes that change shared data: requires an "Authorization: Bearer <ADMIN_API_TOKEN>" header"""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin routes are disabled; set ADMIN_API_TOKEN to enable them")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+@api_router.put("/market-prices/{state}", dependencies=[Depends(require_admin)])
+async def put_market_prices(state: str, request: StatePricesUpdate):
+    """Replace the crop prices of a known state; every worker serves them within the snapshot check interval"""
     try:
-        schemes = []
-        for scheme in GOVERNMENT_SCHEMES:
-            schemes.append({
-                "name": scheme["name"],
-                "name_local": scheme["name_hi"] if language == "hi" else scheme["name"],
-                "description": scheme["description_hi"] if language == "hi" else scheme["description"],
-                "eligibility": scheme["eligibility_hi"] if language == "hi" else scheme["eligibility"],
-                "link": scheme["link"]
-            })
-        
-        return {"success": True, "schemes": schemes}
+        if not reference_store.current().has_state(state):
+            raise HTTPException(status_code=404, detail="State not found")
+        crops = [crop.model_dump(exclude_none=True) for crop in request.crops]
+        version = await update_state_prices(state, crops)
+        return {"success": True, "state": state, "crops": len(crops), "data_version": version}
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get schemes: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to update market prices: {str(e)}")
+
+@api_router.get("/market-prices")
+async def get_crop_prices_across_states(crop: str = Query(..., min_length=1)):
+    """Get MSP and mandi prices for one crop across all states"""
+    reference = reference_store.current()
+    rows = reference.price_table.crop_across_states(crop)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Crop not found")
+    return ORJSONResponse({"success": True, "crop": crop, "prices": rows, "data_version": reference.version})
+
+@api_router.get("/market-analytics/top-spreads")
+async def get_top_price_spreads(
+    n: int = Query(default=10, ge=1, le=500),
+    crop: Optional[str] = None,
+    by: str = Query(default="margin", pattern="^(margin|spread)$")
+):
+    """Top state/crop pairs by mandi-over-MSP margin (percent) or absolute spread"""
+    reference = reference_store.current()
+    rows = reference.price_table.top_spreads(n, crop, by)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Crop not found")
+    return ORJSONResponse({"success": True, "by": by, "results": rows, "data_version": reference.version})
+
+@api_router.get("/market-analytics/national")
+async def get_national_price_aggregates():
+    """National per-crop price aggregates across all states"""
+    reference = reference_store.current()
+    return ORJSONResponse({
+        "success": True,
+        "crops": reference.price_table.national_aggregates(),
+        "data_version": reference.version
+    })
+
+@api_router.get("/price-history")
+async def get_price_history(
+    commodity: str = Query(..., min_length=1),
+    state: Optional[str] = None,
+    market: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: str = "day"
+):
+    """Historical mandi prices for a commodity, downsampled on the server"""
+    if interval not in DOWNSAMPLE_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(DOWNSAMPLE_INTERVALS)}")
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=90)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if not app.state.price_history:
+        raise HTTPException(status_code=503, detail="Price history requires MongoDB 5.0 or newer")
 
-@api_router.get("/farm-tasks")
-async def get_farm_tasks(language: str = "en"):
-    """Get personalized farm tasks and calendar"""
     try:
-        # Mock farm tasks - can be personalized based on user's crop and location
-        mock_tasks = [
-            {
-                "task_name": "Apply Fertilizer",
-                "task_name_hi": "उर्वरक डालें",
-                "description": "Apply NPK fertilizer to wheat crop",
-                "description_hi": "गेहूं की फसल में NPK उर्वरक डालें",
-                "due_date": "2025-01-20",
-                "priority": "high"
-            },
-            {
-                "task_name": "Irrigation",
-                "task_name_hi": "सिंचाई",
-                "description": "Water the crops in the morning",
-                "description_hi": "सुबह के समय फसलों की सिंचाई करें",
-                "due_date": "2025-01-18",
-                "priority": "medium"
-            }
-        ]
-        
-        tasks = []
-        for task in mock_tasks:
-            tasks.append(FarmTask(
-                task_name=task["task_name"],
-                task_name_local=task["task_name_hi"] if language == "hi" else task["task_name"],
-                description=task["description_hi"] if language == "hi" else task["description"],
-                description_local=task["description_hi"] if language == "hi" else task["description"],
-                due_date=task["due_date"],
-                priority=task["priority"]
-            ))
-        
-        return {"success": True, "tasks": [task.dict() for task in tasks]}
+        history = await query_price_history(db, commodity, start, end, interval, state, market)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get farm tasks: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get price history: {str(e)}")
+
+    return ORJSONResponse({
+        "success": True,
+        "commodity": commodity,
+        "state": state,
+        "market": market,
+        "interval": interval,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "truncated": history["truncated"],
+        "buckets": history["buckets"]
+    })
+
+@api_router.get("/market-trends/{state}/{crop}")
+async def get_market_trend(state: str, crop: str):
+    """Rolling price statistics and sell/hold signal for one crop in one state"""
+    trend_store.refresh()
+    trend = trend_engine.get(state, crop)
+    if trend is None:
+        raise HTTPException(status_code=404, detail="No price history for this state and crop")
+    return ORJSONResponse({"success": True, "state": state, "crop": crop, "trend": trend.to_dict()})
+
+@api_router.post("/market-trends/rebuild")
+async def rebuild_market_trends(days: int = Query(default=180, ge=1, le=3650)):
+    """Recompute all trend series from price history after a bulk load"""
+    try:
+        series = await rebuild_trends(days)
+    except PriceHistoryUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Trend rebuild failed: {str(e)}")
+    return {"success": True, "series": series, "trends": trend_engine.stats(), "shared": trend_store.stats()}
+
+async def build_scheme_catalog(reference: ReferenceData, language: str) -> Dict[str, Any]:
+    return scheme_payload(reference.schemes, language)
+
+@api_router.get("/government-schemes")
+async def get_government_schemes(request: Request, language: str = "en"):
+    """Get list of government schemes for farmers"""
+    language = normalize_language(language)
+    reference = reference_store.current()
+    cached = await catalog_cache.get_or_build(
+        ("schemes", language), lambda version: build_scheme_catalog(reference, language)
+    )
+    return cached_response(request, cached, CACHE_CATALOG)
+
+@api_router.get("/farm-tasks")
+async def get_farm_tasks(request: Request, language: str = "en"):
+    """Get personalized farm tasks and calendar"""
+    return cached_response(request, FARM_TASK_BODIES[normalize_language(language)], CACHE_CATALOG)
 
 @api_router.post("/translate")
 async def translate_text(request: TranslationRequest):
     """Translate text to target language"""
     try:
-        # Mock translation - Replace with actual Google Translate API
-        translated = await mock_translate_text(request.text, request.target_language)
+        # Mock translation (via translation memory) - Replace with actual Google Translate API
+        translated = await translation_memory.translate(
+            request.text, request.target_language, translate_strings
+        )
         
         return {
             "success": True,
@@ -412,62 +1127,356 @@ async def translate_text(request: TranslationRequest):
             "translated_text": translated,
             "target_language": request.target_language
         }
+    except ProviderError as e:
+        # Untranslated text beats no text; nothing is written to the translation memory
+        logger.warning(f"Translation unavailable: {e}")
+        return {
+            "success": True,
+            "original_text": request.text,
+            "translated_text": request.text,
+            "target_language": request.target_language,
+            "degraded": True
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
 
+@api_router.post("/translate/batch")
+async def translate_batch(request: BatchTranslationRequest):
+    """Translate many strings to one target language in a single call"""
+    try:
+        translations = await translation_memory.translate_many(
+            request.texts, request.target_language, translate_strings
+        )
+
+        return {
+            "success": True,
+            "target_language": request.target_language,
+            "translations": [
+                {"original_text": text, "translated_text": translated}
+                for text, translated in zip(request.texts, translations)
+            ]
+        }
+    except ProviderError as e:
+        logger.warning(f"Batch translation unavailable: {e}")
+        return {
+            "success": True,
+            "target_language": request.target_language,
+            "translations": [{"original_text": text, "translated_text": text} for text in request.texts],
+            "degraded": True
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch translation failed: {str(e)}")
+
 @api_router.post("/voice/speech-to-text")
 async def speech_to_text(request: VoiceRequest):
     """Convert speech to text using Vertex AI STT"""
     try:
-        # Mock STT - Replace with actual Vertex AI STT API
-        transcription = await mock_speech_to_text(request.audio_base64, request.language)
+        transcription = await transcribe_speech(request.audio_base64, request.language)
         
         return {
             "success": True,
             "transcription": transcription,
             "language": request.language
         }
+    except ProviderError as e:
+        raise HTTPException(status_code=503, detail=f"Speech to text is temporarily unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Speech to text failed: {str(e)}")
 
-@api_router.post("/voice/text-to-speech")
-async def text_to_speech(text: str = Form(...), language: str = Form(default="en")):
-    """Convert text to speech using Vertex AI TTS"""
+async def stream_answer(prompt: str, language: str) -> AsyncIterator[str]:
+    """Stream an answer, replaying it from the recommendation cache when we have it"""
+    key = (normalize_prompt(prompt), language)
+    cached = recommendation_cache.peek(key)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
     try:
-        # Mock TTS - Replace with actual Vertex AI TTS API
-        audio_base64 = await mock_text_to_speech(text, language)
-        
-        return {
-            "success": True,
-            "audio_base64": audio_base64,
-            "language": language
-        }
+        async for chunk in providers.stream("gemini_pro", mock_gemini_pro_recommendation_stream, prompt, language):
+            parts.append(chunk)
+            yield chunk
+    except ProviderError as e:
+        # Half an answer can't be patched up; before the first chunk, fall back to a stale or canned one
+        if parts:
+            raise
+        logger.warning(f"Answer generation unavailable: {e}")
+        yield recommendation_cache.peek(key, allow_stale=True) or fallback_recommendation(language)
+        return
+    recommendation_cache.put(key, "".join(parts))
+
+async def synthesize_sentence(sentence: str, language: str) -> Dict[str, Any]:
+    try:
+        key, clip, cached = await tts_cache.open_clip(sentence, language, DEFAULT_TTS_VOICE, synthesize_speech)
+    except ProviderError as e:
+        # The text still goes out; the client can speak it with on-device TTS
+        logger.warning(f"Speech synthesis unavailable: {e}")
+        return {"audio_id": None, "audio_base64": None, "cached": False, "degraded": True}
+    with clip:
+        audio = await asyncio.to_thread(clip.read)
+    return {"audio_id": key, "audio_base64": base64.b64encode(audio).decode("ascii"), "cached": cached}
+
+@api_router.post("/voice/assistant")
+async def voice_assistant(request: VoiceRequest):
+    """Speech in, spoken answer out, in one streamed round trip
+
+    Streams newline-delimited JSON events: ``transcript``, then one ``sentence``
+    per answer sentence with its audio (the first arrives while the answer is
+    still being generated), then ``done`` with the full answer and per-stage timings.
+    """
+    started = time.perf_counter()
+    try:
+        transcription = await transcribe_speech(request.audio_base64, request.language)
+    except ProviderError as e:
+        raise HTTPException(status_code=503, detail=f"Speech to text is temporarily unavailable: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Speech to text failed: {str(e)}")
+    timings = {"stt_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    async def events() -> AsyncIterator[bytes]:
+        yield encode_json({"type": "transcript", "transcription": transcription, "language": request.language}) + b"\n"
+        answer = []
+        try:
+            async for index, sentence, speech in speak_as_generated(
+                stream_answer(transcription, request.language),
+                lambda text: synthesize_sentence(text, request.language),
+                timings,
+                started
+            ):
+                answer.append(sentence)
+                timings.setdefault("first_audio_ms", round((time.perf_counter() - started) * 1000, 1))
+                yield encode_json({
+                    "type": "sentence",
+                    "index": index,
+                    "text": sentence,
+                    "audio_content_type": tts_cache.media_type,
+                    **speech
+                }) + b"\n"
+        except Exception as e:
+            logger.error(f"Voice assistant pipeline failed: {e}")
+            yield encode_json({"type": "error", "detail": f"Voice assistant failed: {str(e)}"}) + b"\n"
+            return
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        yield encode_json({"type": "done", "answer": " ".join(answer), "timings": timings}) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@api_router.websocket("/voice/stream")
+async def stream_speech_to_text(websocket: WebSocket, language: str = "en"):
+    """Stream audio chunks in, get interim and final transcripts back
+
+    Client sends binary frames of audio as it records, then a text frame
+    ``{"event": "end"}``. Server sends ``{"type": "partial" | "final", ...}``.
+    """
+    await websocket.accept()
+    queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=AUDIO_STREAM_QUEUE_SIZE)
+    started = asyncio.get_running_loop().time()
+
+    async def audio_chunks() -> AsyncIterator[bytes]:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def receive_audio() -> None:
+        received = 0
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    received += len(message["bytes"])
+                    if received > MAX_AUDIO_STREAM_BYTES:
+                        await websocket.send_json({"type": "error", "detail": "Audio stream too large"})
+                        break
+                    # Bounded queue: a slow recognizer applies backpressure to the socket
+                    await queue.put(message["bytes"])
+                elif message.get("text"):
+                    try:
+                        event = json.loads(message["text"]).get("event")
+                    except (ValueError, AttributeError):
+                        event = None
+                    if event == "end":
+                        break
+        finally:
+            await queue.put(None)
+
+    receiver = asyncio.create_task(receive_audio())
+    try:
+        # Mock streaming STT - Replace with actual Vertex AI streaming recognition
+        # Waiting on the client's audio is the client's pace, not a provider stall
+        async for result in providers.stream(
+            "speech_to_text", mock_streaming_speech_to_text, CallerInput(audio_chunks()), language
+        ):
+            await websocket.send_json({
+                "type": "final" if result["is_final"] else "partial",
+                "transcript": result["transcript"],
+                "language": language,
+                "elapsed_ms": round((asyncio.get_running_loop().time() - started) * 1000, 1)
+            })
+        await websocket.close()
+    except ProviderError as e:
+        try:
+            await websocket.send_json({"type": "error", "detail": f"Speech recognition unavailable: {str(e)}"})
+            await websocket.close()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away mid-stream
+        pass
+    finally:
+        receiver.cancel()
+
+async def text_to_speech_response(request: Request, text: str, language: str, voice: Optional[str]) -> Response:
+    """Stream cached (or freshly synthesized) speech for ``text`` as binary audio"""
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Text is required")
+    voice = voice or DEFAULT_TTS_VOICE
+    try:
+        # An open file: another worker evicting the clip can't cut the response short
+        key, clip, cached = await tts_cache.open_clip(text, language, voice, synthesize_speech)
+    except ProviderError as e:
+        raise HTTPException(status_code=503, detail=f"Text to speech is temporarily unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Text to speech failed: {str(e)}")
 
+    # The key hashes text, language and voice, so the audio behind it never changes
+    return file_response(
+        request, clip, f'"{key}"', "public, max-age=31536000, immutable", tts_cache.media_type,
+        headers={"X-TTS-Cache": "hit" if cached else "miss", "Content-Language": language}
+    )
+
+@api_router.get("/voice/text-to-speech")
+async def stream_text_to_speech(
+    request: Request,
+    text: str = Query(..., max_length=5000),
+    language: str = Query(default="en"),
+    voice: Optional[str] = Query(default=None)
+):
+    """Speech audio for a text, usable directly as an <audio> source (supports Range)"""
+    return await text_to_speech_response(request, text, language, voice)
+
+@api_router.post("/voice/text-to-speech")
+async def text_to_speech(
+    request: Request,
+    text: str = Form(..., max_length=5000),
+    language: str = Form(default="en"),
+    voice: Optional[str] = Form(default=None)
+):
+    """Convert text to speech using Vertex AI TTS"""
+    return await text_to_speech_response(request, text, language, voice)
+
+@api_router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters for the server-side caches"""
+    return {
+        "success": True,
+        "caches": {
+            "vision": vision_cache.stats(),
+            "market_prices": market_price_cache.stats(),
+            "catalog": catalog_cache.stats(),
+            "recommendations": recommendation_cache.stats(),
+            "translation_memory": translation_memory.stats(),
+            "tts_audio": tts_cache.stats()
+        }
+    }
+
+@api_router.get("/batch-stats")
+async def get_batch_stats():
+    """Batch fill and latency metrics for batched provider calls"""
+    return {
+        "success": True,
+        "batchers": {"vision": vision_batcher.stats()},
+        "image_preprocessing": image_preprocessor.stats()
+    }
+
+@api_router.get("/provider-stats")
+async def get_provider_stats():
+    """Latency, hedging and circuit breaker state per external provider, plus outbound pool usage"""
+    return {"success": True, "providers": providers.stats(), "connection_pools": http_clients.stats()}
+
+@api_router.get("/reference-stats")
+async def get_reference_stats():
+    """Version and size of the shared reference data snapshot this worker is serving"""
+    reference_store.refresh()
+    return {"success": True, "reference_data": reference_store.stats()}
+
+@api_router.get("/write-stats")
+async def get_write_stats():
+    """Queue depth and flush latency for write-behind persistence"""
+    return {"success": True, "writers": {"crop_analyses": crop_analysis_writer.stats()}}
+
+@api_router.get("/i18n/{language}")
+async def get_string_bundle(language: str, request: Request):
+    """All UI strings for a language in one cacheable bundle, with fallbacks filled in"""
+    cached = STRING_BUNDLE_BODIES.get(language)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Language not supported")
+    return cached_response(request, cached, CACHE_STATIC)
+
 @api_router.get("/languages")
-async def get_supported_languages():
+async def get_supported_languages(request: Request):
     """Get list of supported languages"""
-    languages = [
-        {"code": "en", "name": "English", "native_name": "English"},
-        {"code": "hi", "name": "Hindi", "native_name": "हिंदी"},
-        {"code": "mr", "name": "Marathi", "native_name": "मराठी"},
-        {"code": "bn", "name": "Bengali", "native_name": "বাংলা"},
-        {"code": "gu", "name": "Gujarati", "native_name": "ગુજરાતી"},
-        {"code": "ta", "name": "Tamil", "native_name": "தமிழ்"},
-        {"code": "te", "name": "Telugu", "native_name": "తెలుగు"},
-        {"code": "kn", "name": "Kannada", "native_name": "ಕನ್ನಡ"},
-        {"code": "ml", "name": "Malayalam", "native_name": "മലയാളം"},
-        {"code": "pa", "name": "Punjabi", "native_name": "ਪੰਜਾਬੀ"},
-        {"code": "as", "name": "Assamese", "native_name": "অসমীয়া"},
-        {"code": "or", "name": "Odia", "native_name": "ଓଡ଼ିଆ"},
-        {"code": "ur", "name": "Urdu", "native_name": "اردو"},
-        {"code": "sa", "name": "Sanskrit", "native_name": "संस्कृत"},
-        {"code": "ne", "name": "Nepali", "native_name": "नेपाली"},
-        {"code": "mni", "name": "Manipuri", "native_name": "ꯃꯤꯇꯩꯂꯣꯟ"}
-    ]
-    
-    return {"success": True, "languages": languages}
+    return cached_response(request, LANGUAGES_BODY, CACHE_STATIC)
+
+def cache_gauges() -> Dict[tuple, float]:
+    return {
+        ("vision",): vision_cache.stats()["hit_rate"],
+        ("recommendations",): recommendation_cache.stats()["hit_rate"],
+        ("translation_memory",): translation_memory.stats()["hit_rate"],
+        ("tts_audio",): tts_cache.stats()["hit_rate"],
+    }
+
+metrics_registry.gauge("kisan_cache_hit_rate", "Hit rate of server-side caches", ("cache",), cache_gauges)
+metrics_registry.gauge(
+    "kisan_queue_depth", "Items waiting in background queues", ("queue",),
+    lambda: {
+        ("vision_batch",): vision_batcher.stats()["queued"],
+        ("crop_analyses_write",): crop_analysis_writer.stats()["queue_depth"],
+    }
+)
+metrics_registry.gauge(
+    "kisan_write_flush_last_seconds", "Duration of the latest write-behind flush", ("queue",),
+    lambda: {("crop_analyses_write",): crop_analysis_writer.stats()["last_flush_ms"] / 1000}
+)
+
+metrics_registry.gauge(
+    "kisan_provider_circuit_open", "1 while a provider's circuit breaker is rejecting calls", ("provider",),
+    lambda: {(name,): float(stats["circuit"] != "closed") for name, stats in providers.stats().items()}
+)
+metrics_registry.gauge(
+    "kisan_provider_in_flight", "Provider calls currently running", ("provider",),
+    lambda: {(name,): stats["in_flight"] for name, stats in providers.stats().items()}
+)
+metrics_registry.gauge(
+    "kisan_http_pool_connections", "Outbound keep-alive connections per upstream", ("upstream", "state"),
+    lambda: {
+        (name, state): count
+        for name, stats in http_clients.stats().items()
+        if stats["connections"] is not None
+        for state, count in stats["connections"].items()
+        if state in ("active", "idle")
+    }
+)
+metrics_registry.gauge(
+    "kisan_http_pool_utilization", "Active outbound connections as a fraction of the pool limit", ("upstream",),
+    lambda: {
+        (name,): stats["utilization"]
+        for name, stats in http_clients.stats().items()
+        if stats["utilization"] is not None
+    }
+)
+metrics_registry.gauge(
+    "kisan_reference_data_version", "Reference data snapshot version this worker serves", ("pid",),
+    lambda: {(str(os.getpid()),): reference_store.stats()["version"] or 0}
+)
+
+@app.get("/metrics", include_in_schema=False)
+@api_router.get("/metrics", include_in_schema=False)  # The ingress only forwards /api to the backend
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -480,6 +1489,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes CORS handling
+app.add_middleware(MetricsMiddleware)
+
+# Optional local trace export: one JSON line per finished span
+configure_trace_export(os.environ.get('TRACE_EXPORT_PATH'))
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -487,6 +1502,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
+async def create_indexes():
+    await vision_cache.ensure_indexes()
+    await translation_memory.ensure_indexes()
+    await ensure_history_indexes(db.crop_analyses)
+    await ensure_rollup_indexes(db[ROLLUP_COLLECTION])
+    try:
+        await ensure_price_history_collection(db)
+        app.state.price_history = True
+    except PriceHistoryUnavailable as e:
+        # Optional: everything else still works on an older MongoDB
+        app.state.price_history = False
+        logger.warning(f"{e}; /api/price-history and trend rebuilds are disabled")
+
+async def warm_startup_caches():
+    try:
+        # Series another worker (or an earlier run) published; only rebuild without them
+        if not trend_store.refresh(force=True) and app.state.price_history:
+            await rebuild_trends()
+    except Exception as e:
+        logger.warning(f"Trend rebuild from price history failed: {e}")
+    await warm_market_price_cache(["en", "hi"])
+
+async def startup():
+    await create_indexes()
+    await http_clients.start()
+    await image_preprocessor.start()
+    # Build the common market price responses in the background
+    app.state.warm_task = asyncio.create_task(warm_startup_caches())
+
+async def shutdown():
+    warm_task = getattr(app.state, "warm_task", None)
+    if warm_task is not None:
+        warm_task.cancel()
+    # Drain work that may still call providers or MongoDB before closing their clients
+    await vision_batcher.stop()
+    await image_preprocessor.stop()
+    await crop_analysis_writer.stop()
+    await http_clients.aclose()
     client.close()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Single-flight TTL cache for expensive provider calls.
+
+Concurrent callers asking for the same key share one in-flight call; results
+are kept for ``ttl_seconds`` in a bounded LRU; and the number of provider calls
+running at once is capped by a semaphore so request fan-out cannot flood the
+provider quota.
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt for cache keys"""
+    return _WHITESPACE.sub(" ", prompt).strip().lower()
+
+
+class SingleFlightCache:
+    """TTL + LRU result cache that coalesces concurrent identical calls"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float = 3600,
+        max_entries: int = 4096,
+        max_concurrency: int = 8
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_concurrency = max_concurrency
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "calls": 0, "errors": 0, "evictions": 0}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def peek(self, key: Hashable, allow_stale: bool = False) -> Optional[Any]:
+        """Cached value for ``key``; expired values are kept (until evicted) for ``allow_stale`` fallbacks"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic() and not allow_stale:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, calling ``loader`` at most once concurrently"""
+        value = self.peek(key)
+        if value is not None:
+            self.counters["hits"] += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.counters["misses"] += 1
+            # Run the call as its own task so one caller disconnecting doesn't cancel it for the rest
+            task = asyncio.create_task(self._load(key, loader))
+            self._inflight[key] = task
+        else:
+            self.counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            async with self.semaphore:
+                self.counters["calls"] += 1
+                value = await loader()
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        else:
+            self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "hit_rate": round((lookups - self.counters["misses"]) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,147 @@
+"""
+Translation memory in front of the translation provider.
+
+Strings are deduplicated, then looked up in an in-process LRU and in a
+MongoDB-backed memory. Only the remaining misses go to the provider, in a
+single bulk call, and its results are written back to both tiers.
+
+Stored translations expire ``ttl_seconds`` after they were written, and each
+records the provider that produced it: entries from another provider (e.g. the
+mock's placeholders after switching to a real one) are treated as misses and
+overwritten.
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+def memory_key(text: str, target_language: str) -> str:
+    return f"{target_language}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+class TranslationMemory:
+    """Two-tier (LRU + MongoDB) translation memory with bulk provider fallback"""
+
+    def __init__(self, collection=None, max_entries: int = 20000, ttl_seconds: int = 30 * 24 * 3600,
+                 provider: str = "default"):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.provider = provider
+        self._lru: "OrderedDict[str, str]" = OrderedDict()
+        self.counters = {"lookups": 0, "lru_hits": 0, "db_hits": 0, "provider_calls": 0, "provider_strings": 0}
+
+    async def ensure_indexes(self) -> None:
+        if self.collection is None:
+            return
+        await self.collection.create_index("updated_at", expireAfterSeconds=self.ttl_seconds)
+
+    def _remember(self, key: str, translation: str) -> None:
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def translate_many(
+        self,
+        texts: List[str],
+        target_language: str,
+        provider: Callable[[List[str], str], Awaitable[List[str]]]
+    ) -> List[str]:
+        """Translate ``texts`` in order, calling ``provider`` once for whatever isn't in memory"""
+        unique = list(dict.fromkeys(texts))
+        self.counters["lookups"] += len(unique)
+        found: Dict[str, str] = {}
+
+        pending: List[Tuple[str, str]] = []
+        for text in unique:
+            key = memory_key(text, target_language)
+            translation = self._lru.get(key)
+            if translation is not None:
+                self._lru.move_to_end(key)
+                found[text] = translation
+            else:
+                pending.append((key, text))
+        self.counters["lru_hits"] += len(unique) - len(pending)
+
+        if pending and self.collection is not None:
+            try:
+                cursor = self.collection.find(
+                    {"_id": {"$in": [key for key, _ in pending]}, "provider": self.provider}, {"translation": 1}
+                )
+                stored = {doc["_id"]: doc["translation"] async for doc in cursor}
+            except Exception as e:
+                logger.warning(f"Translation memory lookup failed: {e}")
+                stored = {}
+            still_pending = []
+            for key, text in pending:
+                if key in stored:
+                    found[text] = stored[key]
+                    self._remember(key, stored[key])
+                else:
+                    still_pending.append((key, text))
+            self.counters["db_hits"] += len(pending) - len(still_pending)
+            pending = still_pending
+
+        if pending:
+            self.counters["provider_calls"] += 1
+            self.counters["provider_strings"] += len(pending)
+            translations = await provider([text for _, text in pending], target_language)
+            if len(translations) != len(pending):
+                raise RuntimeError(
+                    f"Translation provider returned {len(translations)} translations for {len(pending)} strings"
+                )
+            for (key, text), translation in zip(pending, translations):
+                found[text] = translation
+                self._remember(key, translation)
+            await self._store(pending, translations, target_language)
+
+        return [found[text] for text in texts]
+
+    async def _store(self, pending: List[Tuple[str, str]], translations: List[str], target_language: str) -> None:
+        if self.collection is None:
+            return
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": key},
+                {"$set": {
+                    "text": text,
+                    "target_language": target_language,
+                    "translation": translation,
+                    "provider": self.provider,
+                    "updated_at": now,
+                }},
+                upsert=True
+            )
+            for (key, text), translation in zip(pending, translations)
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Translation memory write failed: {e}")
+
+    async def translate(
+        self,
+        text: str,
+        target_language: str,
+        provider: Callable[[List[str], str], Awaitable[List[str]]]
+    ) -> str:
+        return (await self.translate_many([text], target_language, provider))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["lookups"]
+        hits = self.counters["lru_hits"] + self.counters["db_hits"]
+        return {
+            **self.counters,
+            "entries": len(self._lru),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "persistent": self.collection is not None,
+        }
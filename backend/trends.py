@@ -0,0 +1,292 @@
+"""
+Incremental price-trend engine for sell/hold advice.
+
+Keeps exponentially weighted statistics per (state, crop): a fast and a slow
+moving average, momentum (fast vs slow), and volatility of price returns.
+Each new price updates a series in O(1) without touching its history. After a
+bulk load, ``rebuild`` recomputes every series at once from a DataFrame using
+pandas' grouped EWM kernels.
+
+A rebuild only happens in the worker that ran it; ``TrendStore`` publishes the
+result as a snapshot file (the same format as the reference data) that every
+worker loads in place of its own series, and that outlives restarts.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from reference_snapshot import Snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+FAST_SPAN = 7
+SLOW_SPAN = 30
+MIN_OBSERVATIONS = 5
+MOMENTUM_THRESHOLD = 0.02  # 2% gap between fast and slow averages
+HIGH_VOLATILITY = 0.05     # 5% typical move between observations
+
+
+def _alpha(span: int) -> float:
+    return 2 / (span + 1)
+
+
+def _key(state: str, crop: str) -> Tuple[str, str]:
+    return state.strip().lower(), crop.strip().lower()
+
+
+class TrendStats:
+    """Rolling statistics for one (state, crop) price series"""
+
+    __slots__ = ("count", "last_price", "last_observed", "ema_fast", "ema_slow", "return_mean", "return_var")
+
+    def __init__(self):
+        self.count = 0
+        self.last_price = 0.0
+        self.last_observed: Optional[datetime] = None
+        self.ema_fast = 0.0
+        self.ema_slow = 0.0
+        self.return_mean = 0.0
+        self.return_var = 0.0
+
+    def update(self, price: float, observed_at: Optional[datetime] = None) -> None:
+        if self.count == 0:
+            self.ema_fast = self.ema_slow = price
+        else:
+            fast, slow = _alpha(FAST_SPAN), _alpha(SLOW_SPAN)
+            self.ema_fast += fast * (price - self.ema_fast)
+            self.ema_slow += slow * (price - self.ema_slow)
+            if self.last_price > 0:
+                ret = price / self.last_price - 1
+                if self.count == 1:
+                    self.return_mean, self.return_var = ret, 0.0
+                else:
+                    # West's incremental exponentially weighted mean/variance
+                    diff = ret - self.return_mean
+                    increment = slow * diff
+                    self.return_mean += increment
+                    self.return_var = (1 - slow) * (self.return_var + diff * increment)
+        self.count += 1
+        self.last_price = price
+        self.last_observed = observed_at or datetime.utcnow()
+
+    @property
+    def momentum(self) -> float:
+        return (self.ema_fast - self.ema_slow) / self.ema_slow if self.ema_slow else 0.0
+
+    @property
+    def volatility(self) -> float:
+        return math.sqrt(max(self.return_var, 0.0))
+
+    @property
+    def signal(self) -> str:
+        if self.count < MIN_OBSERVATIONS:
+            return "insufficient_data"
+        if self.momentum >= MOMENTUM_THRESHOLD:
+            return "hold"
+        if self.momentum <= -MOMENTUM_THRESHOLD:
+            return "sell"
+        return "neutral"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "signal": self.signal,
+            "observations": self.count,
+            "last_price": round(self.last_price, 2),
+            "moving_average_fast": round(self.ema_fast, 2),
+            "moving_average_slow": round(self.ema_slow, 2),
+            "momentum_pct": round(self.momentum * 100, 2),
+            "volatility_pct": round(self.volatility * 100, 2),
+            "last_observed": self.last_observed.isoformat() if self.last_observed else None,
+        }
+
+
+RECOMMENDATION_TEMPLATES = {
+    "hold": {
+        "en": "Prices are rising ({momentum:+.1f}% above the 30-day average trend). Consider waiting a few days before selling.",
+        "hi": "कीमतें बढ़ रही हैं (30-दिन के औसत रुझान से {momentum:+.1f}%)। बेचने से पहले कुछ दिन प्रतीक्षा करने पर विचार करें।",
+    },
+    "sell": {
+        "en": "Prices are falling ({momentum:+.1f}% against the 30-day average trend). Consider selling soon.",
+        "hi": "कीमतें गिर रही हैं (30-दिन के औसत रुझान से {momentum:+.1f}%)। जल्द बेचने पर विचार करें।",
+    },
+    "neutral": {
+        "en": "Prices are stable around the 30-day average. Sell as per your needs.",
+        "hi": "कीमतें 30-दिन के औसत के आसपास स्थिर हैं। अपनी जरूरत के अनुसार बेचें।",
+    },
+    "volatile": {
+        "en": " Prices are volatile (about {volatility:.1f}% daily swings); check your local mandi before deciding.",
+        "hi": " कीमतों में उतार-चढ़ाव अधिक है (लगभग {volatility:.1f}% दैनिक); निर्णय से पहले स्थानीय मंडी देखें।",
+    },
+}
+
+
+class TrendEngine:
+    """Per-(state, crop) trend statistics with O(1) updates and a vectorized rebuild"""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], TrendStats] = {}
+        self.version = 0
+
+    def observe(self, state: str, crop: str, price: float, observed_at: Optional[datetime] = None) -> TrendStats:
+        key = _key(state, crop)
+        stats = self._series.get(key)
+        if stats is None:
+            stats = self._series[key] = TrendStats()
+        stats.update(float(price), observed_at)
+        self.version += 1
+        return stats
+
+    def get(self, state: str, crop: str) -> Optional[TrendStats]:
+        return self._series.get(_key(state, crop))
+
+    def recommendation(self, state: str, crop: str, language: str = "en") -> Optional[str]:
+        """Sell/hold advice from the series' statistics, or None if there isn't enough data"""
+        stats = self.get(state, crop)
+        if stats is None or stats.signal == "insufficient_data":
+            return None
+        language = language if language == "hi" else "en"
+        text = RECOMMENDATION_TEMPLATES[stats.signal][language].format(momentum=stats.momentum * 100)
+        if stats.volatility >= HIGH_VOLATILITY:
+            text += RECOMMENDATION_TEMPLATES["volatile"][language].format(volatility=stats.volatility * 100)
+        return text
+
+    def rebuild(self, prices: pd.DataFrame) -> int:
+        """Recompute every series from a (state, crop, date, price) frame; returns the series count"""
+        if prices.empty:
+            return 0
+        frame = prices[["state", "crop", "date", "price"]].copy()
+        frame["state_key"] = frame["state"].str.strip().str.lower()
+        frame["crop_key"] = frame["crop"].str.strip().str.lower()
+        frame = frame.sort_values(["state_key", "crop_key", "date"], kind="stable").reset_index(drop=True)
+        keys = ["state_key", "crop_key"]
+        groups = frame.groupby(keys, sort=False)
+
+        def grouped_ewm(column: str, span: int):
+            # Grouped EWM runs all series in one pass; drop the group levels to realign rows
+            return frame.groupby(keys, sort=False)[column].ewm(span=span, adjust=False)
+
+        frame["ema_fast"] = grouped_ewm("price", FAST_SPAN).mean().reset_index(level=keys, drop=True)
+        frame["ema_slow"] = grouped_ewm("price", SLOW_SPAN).mean().reset_index(level=keys, drop=True)
+        frame["ret"] = groups["price"].pct_change()
+        frame["return_mean"] = grouped_ewm("ret", SLOW_SPAN).mean().reset_index(level=keys, drop=True)
+        frame["return_var"] = grouped_ewm("ret", SLOW_SPAN).var(bias=True).reset_index(level=keys, drop=True)
+        last = frame.groupby(keys, sort=False).tail(1)
+        counts = groups.size()
+
+        series: Dict[Tuple[str, str], TrendStats] = {}
+        for row in last.itertuples(index=False):
+            stats = TrendStats()
+            stats.count = int(counts[(row.state_key, row.crop_key)])
+            stats.last_price = float(row.price)
+            stats.last_observed = pd.Timestamp(row.date).to_pydatetime()
+            stats.ema_fast = float(row.ema_fast)
+            stats.ema_slow = float(row.ema_slow)
+            stats.return_mean = 0.0 if pd.isna(row.return_mean) else float(row.return_mean)
+            stats.return_var = 0.0 if pd.isna(row.return_var) else float(row.return_var)
+            series[(row.state_key, row.crop_key)] = stats
+
+        self._series = series
+        self.version += 1
+        return len(series)
+
+    def export(self) -> List[List[Any]]:
+        """Every series as plain rows, for ``load`` in another process"""
+        return [
+            [
+                state, crop, stats.count, stats.last_price,
+                stats.last_observed.isoformat() if stats.last_observed else None,
+                stats.ema_fast, stats.ema_slow, stats.return_mean, stats.return_var
+            ]
+            for (state, crop), stats in self._series.items()
+        ]
+
+    def load(self, rows: List[List[Any]]) -> int:
+        """Replace every series with rows from ``export``; returns the series count"""
+        series: Dict[Tuple[str, str], TrendStats] = {}
+        for state, crop, count, last_price, last_observed, ema_fast, ema_slow, return_mean, return_var in rows:
+            stats = TrendStats()
+            stats.count = count
+            stats.last_price = last_price
+            stats.last_observed = datetime.fromisoformat(last_observed) if last_observed else None
+            stats.ema_fast, stats.ema_slow = ema_fast, ema_slow
+            stats.return_mean, stats.return_var = return_mean, return_var
+            series[(state, crop)] = stats
+        self._series = series
+        self.version += 1
+        return len(series)
+
+    def stats(self) -> Dict[str, Any]:
+        signals: Dict[str, int] = {}
+        for stats in self._series.values():
+            signals[stats.signal] = signals.get(stats.signal, 0) + 1
+        return {"series": len(self._series), "version": self.version, "signals": signals}
+
+
+class TrendStore:
+    """Shares rebuilt trend series with every worker process through a snapshot file"""
+
+    def __init__(self, engine: TrendEngine, path: Path, check_interval: float = 1.0):
+        self.engine = engine
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._inode: Optional[int] = None
+        self._checked_at = 0.0
+        self._listeners: List[Callable[[], None]] = []
+        # write_snapshot's temporary file is per process
+        self._publish_lock = threading.Lock()
+        self.counters = {"publishes": 0, "loads": 0, "errors": 0}
+
+    def on_load(self, listener: Callable[[], None]) -> None:
+        """Call ``listener()`` after this process loads series another process published"""
+        self._listeners.append(listener)
+
+    def publish(self, rows: List[List[Any]]) -> None:
+        """Publish ``rows`` from ``TrendEngine.export`` to every worker (blocking: run it in a thread)"""
+        with self._publish_lock:
+            try:
+                version = Snapshot(self.path).version + 1
+            except (FileNotFoundError, ValueError):
+                version = 1
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_snapshot(self.path, version, {}, {"series": rows})
+            # This process already has these series
+            self._inode = os.stat(self.path).st_ino
+            self.counters["publishes"] += 1
+        logger.info(f"Published trends v{version} ({len(rows)} series)")
+
+    def refresh(self, force: bool = False) -> bool:
+        """Load series published since the last check, if any; True when this process switched to them"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        try:
+            if os.stat(self.path).st_ino == self._inode:
+                return False
+            snapshot = Snapshot(self.path)
+            rows = snapshot.document("series")
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            # Keep the series we have
+            self.counters["errors"] += 1
+            logger.error(f"Loading trends from {self.path} failed: {e}")
+            return False
+
+        self._inode = snapshot.inode
+        self.engine.load(rows)
+        self.counters["loads"] += 1
+        for listener in self._listeners:
+            listener()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "path": str(self.path), "pid": os.getpid()}
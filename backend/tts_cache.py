@@ -0,0 +1,215 @@
+"""
+Disk cache for synthesized speech.
+
+Each clip is stored once under the SHA-256 of (text, language, voice), so
+texts that repeat across users (scheme descriptions, standard treatments)
+only reach the TTS provider the first time. The cache is bounded by total
+size and evicts the least recently used clips first. Concurrent requests for
+the same clip share one synthesis.
+
+The index lives in the cache directory itself, so every worker process shares
+one budget and one LRU order:
+
+- a hit touches the clip's mtime, which is its recency;
+- a small ``index`` file holds the running total of bytes and clips, updated
+  under a lock file with each write;
+- once the total passes ``max_bytes``, the writing worker rescans the
+  directory and removes the least recently used clips down to
+  ``EVICT_TO`` of the budget.
+
+Any worker may remove a clip another one just looked up, so clips are served
+from open files (``open_clip``): an unlinked file stays readable through its
+handle, and a clip gone before it could be opened is a miss.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Eviction frees this much of the budget, so the directory isn't rescanned on every write
+EVICT_TO = 0.9
+
+
+def tts_cache_key(text: str, language: str, voice: str) -> str:
+    return hashlib.sha256(f"{language}\x00{voice}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """Size-bounded LRU of audio files named by cache key, shared by every process using ``root``"""
+
+    def __init__(self, root: Path, max_bytes: int, media_type: str = "audio/wav", extension: str = ".wav"):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.media_type = media_type
+        self.extension = extension
+        self.index_path = self.root / "index"
+        self.lock_path = self.root / ".lock"
+        # Totals as of this process's last write or scan
+        self._bytes = 0
+        self._entries = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"hits": 0, "misses": 0, "syntheses": 0, "evictions": 0, "scans": 0}
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            index = self._read_index()
+            if index is None:
+                # First start on this directory (or an index from before it existed): count what's there
+                self._rescan_locked(keep=None)
+            else:
+                self._bytes, self._entries = index
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Serializes index updates and eviction across worker processes; lookups never take it
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self) -> Optional[Tuple[int, int]]:
+        try:
+            total, entries = self.index_path.read_text().split()
+            return int(total), int(entries)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_index(self, total: int, entries: int) -> None:
+        self._write(self.index_path, f"{total} {entries}\n".encode("ascii"))
+        self._bytes, self._entries = total, entries
+
+    def _rescan_locked(self, keep: Optional[Path]) -> List[Path]:
+        """Recount the directory and remove least recently used clips until under budget"""
+        self.counters["scans"] += 1
+        clips = []
+        for path in self.root.glob(f"*/*{self.extension}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            clips.append((stat.st_mtime, stat.st_size, path))
+        clips.sort()
+        total = sum(size for _, size, _ in clips)
+        evicted = []
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TO
+            for _, size, path in clips:
+                if total <= target:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted.append(path)
+        self._write_index(total, len(clips) - len(evicted))
+        return evicted
+
+    def _store(self, path: Path, data: bytes) -> int:
+        """Write a clip and account for it; returns how many clips were evicted to make room"""
+        self._write(path, data)
+        with self._locked():
+            index = self._read_index()
+            if index is None:
+                return len(self._rescan_locked(keep=path))
+            total, entries = index[0] + len(data), index[1] + 1
+            if total <= self.max_bytes:
+                self._write_index(total, entries)
+                return 0
+            # Over budget (or overcounted, e.g. two workers writing one clip): recount from disk
+            return len(self._rescan_locked(keep=path))
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{self.extension}"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Path of a cached clip, marking it recently used; None on a miss (blocking)"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial clip
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def _synthesize(self, key: str, text: str, language: str, voice: str, synthesize) -> Path:
+        audio = await synthesize(text, language, voice)
+        self.counters["syntheses"] += 1
+        path = self.path(key)
+        self.counters["evictions"] += await asyncio.to_thread(self._store, path, audio)
+        return path
+
+    async def get_or_synthesize(
+        self,
+        text: str,
+        language: str,
+        voice: str,
+        synthesize: Callable[[str, str, str], Awaitable[bytes]]
+    ) -> Tuple[str, Path, bool]:
+        """Path of the clip for (text, language, voice), synthesizing it on a miss
+
+        Returns ``(key, path, cached)``. Another worker may evict the clip at any time;
+        use ``open_clip`` to read it.
+        """
+        key = tts_cache_key(text, language, voice)
+        path = await asyncio.to_thread(self.lookup, key)
+        if path is not None:
+            self.counters["hits"] += 1
+            return key, path, True
+
+        self.counters["misses"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._synthesize(key, text, language, voice, synthesize))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return key, await asyncio.shield(task), False
+
+    async def open_clip(
+        self,
+        text: str,
+        language: str,
+        voice: str,
+        synthesize: Callable[[str, str, str], Awaitable[bytes]]
+    ) -> Tuple[str, BinaryIO, bool]:
+        """Like ``get_or_synthesize``, but returns the clip open for reading; the caller closes it"""
+        for _ in range(2):
+            key, path, cached = await self.get_or_synthesize(text, language, voice, synthesize)
+            try:
+                return key, await asyncio.to_thread(open, path, "rb"), cached
+            except FileNotFoundError:
+                # Evicted between lookup and open: the next lookup misses and synthesizes it again
+                continue
+        raise RuntimeError("Synthesized audio disappeared from the cache")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
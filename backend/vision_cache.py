@@ -0,0 +1,218 @@
+"""
+Result cache in front of the vision backend.
+
+Entries are keyed on the exact SHA-256 of the image and also matched by a
+64-bit perceptual difference hash (dHash), so near-identical burst shots of the
+same leaf reuse one diagnosis. The in-memory tier is a bounded LRU with TTL;
+an optional MongoDB collection keeps entries across restarts.
+
+Both tiers accept a perceptual match within ``max_distance`` bits. To find
+candidates without scanning every entry, each hash is split into
+``max_distance + 1`` bands: two hashes that differ in at most that many bits
+agree exactly on at least one band. The memory tier keeps a dict from band to
+entries, and the MongoDB tier stores the bands in an indexed array field.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DHASH_SIZE = 8
+HASH_BITS = DHASH_SIZE * DHASH_SIZE
+# Persistent documents sharing a band with the lookup that are compared by distance
+PERSISTENT_CANDIDATES = 32
+
+
+def dhash(img: Image.Image) -> int:
+    """64-bit difference hash of an already decoded image"""
+    pixels = list(img.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(DHASH_SIZE):
+        offset = row * (DHASH_SIZE + 1)
+        for col in range(DHASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def hash_bands(phash: int, count: int) -> List[str]:
+    """``phash`` split into ``count`` bit ranges, each tagged with its position ("<band>:<hex value>")"""
+    bands = []
+    start = 0
+    for band in range(count):
+        width = HASH_BITS // count + (band < HASH_BITS % count)
+        value = (phash >> (HASH_BITS - start - width)) & ((1 << width) - 1)
+        bands.append(f"{band}:{value:x}")
+        start += width
+    return bands
+
+
+class VisionResultCache:
+    """LRU + TTL cache of vision results keyed on exact and perceptual image hashes"""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_distance: int = 4,
+        collection=None
+    ):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"max_distance must be between 0 and {HASH_BITS - 1}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.collection = collection
+        # sha256 -> (perceptual hash, result, expires_at monotonic)
+        self._entries: "OrderedDict[str, Tuple[Optional[int], Dict[str, Any], float]]" = OrderedDict()
+        # hash band -> sha256 of the entries whose perceptual hash has it
+        self._bands: Dict[str, Set[str]] = {}
+        self.counters = {
+            "exact_hits": 0,
+            "perceptual_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    async def ensure_indexes(self) -> None:
+        if self.collection is None:
+            return
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        await self.collection.create_index("phash_bands")
+
+    def _bands_of(self, phash: int) -> List[str]:
+        return hash_bands(phash, self.max_distance + 1)
+
+    def _forget(self, sha256: str) -> None:
+        phash = self._entries.pop(sha256)[0]
+        if phash is None:
+            return
+        for band in self._bands_of(phash):
+            keys = self._bands[band]
+            keys.discard(sha256)
+            if not keys:
+                del self._bands[band]
+
+    def _remember(self, sha256: str, phash: Optional[int], result: Dict[str, Any], expires_at: float) -> None:
+        if sha256 in self._entries:
+            self._forget(sha256)
+        self._entries[sha256] = (phash, result, expires_at)
+        if phash is not None:
+            for band in self._bands_of(phash):
+                self._bands.setdefault(band, set()).add(sha256)
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+            self.counters["evictions"] += 1
+
+    def _lookup_memory(self, sha256: str, phash: Optional[int]) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        entry = self._entries.get(sha256)
+        if entry is not None:
+            if entry[2] > now:
+                self._entries.move_to_end(sha256)
+                self.counters["exact_hits"] += 1
+                return entry[1]
+            self._forget(sha256)
+            self.counters["expirations"] += 1
+
+        if phash is None:
+            return None
+
+        candidates = set()
+        for band in self._bands_of(phash):
+            candidates.update(self._bands.get(band, ()))
+        best_key, best_distance = None, self.max_distance + 1
+        for key in candidates:
+            other_phash, _, expires_at = self._entries[key]
+            if expires_at <= now:
+                continue
+            distance = hamming_distance(phash, other_phash)
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        if best_key is None:
+            return None
+
+        self._entries.move_to_end(best_key)
+        self.counters["perceptual_hits"] += 1
+        return self._entries[best_key][1]
+
+    async def get(self, sha256: str, phash: Optional[int]) -> Optional[Dict[str, Any]]:
+        result = self._lookup_memory(sha256, phash)
+        if result is not None:
+            return result
+
+        if self.collection is not None:
+            doc = await self._lookup_persistent(sha256, phash)
+            if doc is not None:
+                remaining = self.ttl_seconds - (datetime.utcnow() - doc["created_at"]).total_seconds()
+                self._remember(sha256, phash, doc["result"], time.monotonic() + remaining)
+                self.counters["persistent_hits"] += 1
+                return doc["result"]
+
+        self.counters["misses"] += 1
+        return None
+
+    async def _lookup_persistent(self, sha256: str, phash: Optional[int]) -> Optional[Dict[str, Any]]:
+        """The stored entry for this exact image, else the closest one within ``max_distance``"""
+        query: Dict[str, Any] = {"_id": sha256}
+        if phash is not None:
+            query = {"$or": [{"_id": sha256}, {"phash_bands": {"$in": self._bands_of(phash)}}]}
+        query["created_at"] = {"$gt": datetime.utcnow() - timedelta(seconds=self.ttl_seconds)}
+        try:
+            docs = await self.collection.find(query).to_list(length=PERSISTENT_CANDIDATES)
+        except Exception as e:
+            logger.warning(f"Vision cache lookup failed: {e}")
+            return None
+
+        best, best_distance = None, self.max_distance + 1
+        for doc in docs:
+            if doc["_id"] == sha256:
+                return doc
+            if doc.get("phash") is None:
+                continue
+            distance = hamming_distance(phash, int(doc["phash"], 16))
+            if distance < best_distance:
+                best, best_distance = doc, distance
+        return best
+
+    async def put(self, sha256: str, phash: Optional[int], result: Dict[str, Any]) -> None:
+        self._remember(sha256, phash, result, time.monotonic() + self.ttl_seconds)
+        if self.collection is None:
+            return
+        try:
+            await self.collection.replace_one(
+                {"_id": sha256},
+                {
+                    "_id": sha256,
+                    "phash": format(phash, "016x") if phash is not None else None,
+                    "phash_bands": self._bands_of(phash) if phash is not None else [],
+                    "result": result,
+                    "created_at": datetime.utcnow(),
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Vision cache persist failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.counters["exact_hits"] + self.counters["perceptual_hits"] + self.counters["persistent_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self.collection is not None,
+        }
@@ -0,0 +1,105 @@
+"""
+Voice assistant pipeline: streamed answer text -> per-sentence speech.
+
+The answer is split into sentences as it streams in, and each complete sentence
+goes to TTS straight away, so the first sentence can be played while the rest
+of the answer is still being generated. Results come out in sentence order.
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Sentence ends: Latin punctuation and the Devanagari danda, plus closing quotes/brackets
+SENTENCE_END = re.compile(r"[.!?।॥]+[\"'”’)\]]*(?=\s)")
+
+
+class SentenceSplitter:
+    """Incrementally cut streamed text into sentences of at least ``min_chars``"""
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            # Short fragments ("2-3 days." / "Dr.") are merged into the next sentence
+            if match.end() - start >= self.min_chars:
+                sentences.append(self._buffer[start:match.end()].strip())
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return [sentence for sentence in sentences if sentence]
+
+    def flush(self) -> Optional[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
+
+
+async def speak_as_generated(
+    chunks: AsyncIterator[str],
+    synthesize: Callable[[str], Awaitable[Any]],
+    timings: Dict[str, float],
+    started: float,
+    max_pending: int = 4
+) -> AsyncIterator[Tuple[int, str, Any]]:
+    """Yield ``(index, sentence, synthesize(sentence))`` in order while text is still streaming
+
+    Fills ``timings`` with ``first_token_ms``, ``answer_ms`` and ``tts_ms`` (total
+    synthesis time across sentences), measured from ``started``.
+    """
+    pending: "asyncio.Queue[Optional[Tuple[str, asyncio.Task]]]" = asyncio.Queue(maxsize=max_pending)
+    timings["tts_ms"] = 0.0
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    async def timed_synthesis(sentence: str) -> Any:
+        synthesis_started = time.perf_counter()
+        try:
+            return await synthesize(sentence)
+        finally:
+            timings["tts_ms"] = round(timings["tts_ms"] + (time.perf_counter() - synthesis_started) * 1000, 1)
+
+    async def produce() -> None:
+        splitter = SentenceSplitter()
+        try:
+            async for chunk in chunks:
+                timings.setdefault("first_token_ms", elapsed_ms())
+                for sentence in splitter.feed(chunk):
+                    # Bounded queue: generation waits if TTS falls too far behind
+                    await pending.put((sentence, asyncio.create_task(timed_synthesis(sentence))))
+            last = splitter.flush()
+            if last:
+                await pending.put((last, asyncio.create_task(timed_synthesis(last))))
+            timings["answer_ms"] = elapsed_ms()
+        except Exception:
+            await pending.put(None)
+            raise
+        await pending.put(None)
+
+    producer = asyncio.create_task(produce())
+    tasks: List[asyncio.Task] = []
+    try:
+        index = 0
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            sentence, task = item
+            tasks.append(task)
+            yield index, sentence, await task
+            index += 1
+        # Surface errors from the answer stream
+        await producer
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                tasks.append(item[1])
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,176 @@
+"""
+Write-behind persistence for documents the request doesn't need to wait on.
+
+Handlers enqueue documents and return; a background worker writes them with
+``insert_many`` once ``max_batch_size`` documents are waiting or
+``flush_interval_ms`` after the first one arrived. The queue is bounded, so
+when MongoDB falls behind, enqueueing waits (backpressure) instead of growing
+memory without limit. ``stop`` drains everything still queued. An optional
+``after_write`` callback receives each batch of documents that made it in,
+for keeping derived data (such as rollups) up to date.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+DUPLICATE_KEY = 11000
+
+
+def _duplicate_id(error: Dict[str, Any]) -> bool:
+    # Servers before 4.4 don't report keyPattern
+    return error.get("code") == DUPLICATE_KEY and "_id" in error.get("keyPattern", {"_id": 1})
+
+
+class WriteBehindQueue:
+    """Bounded queue of documents flushed to one collection in batches"""
+
+    def __init__(
+        self,
+        collection,
+        max_batch_size: int = 100,
+        flush_interval_ms: float = 50,
+        max_queue_size: int = 10000,
+        max_retries: int = 3,
+        name: str = "write-behind",
+        after_write: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None
+    ):
+        self.collection = collection
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.name = name
+        self.after_write = after_write
+        self._queue: Optional["asyncio.Queue[Optional[Dict[str, Any]]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.counters = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "retries": 0,
+            "failed": 0,
+            "backpressure_waits": 0,
+            "after_write_errors": 0,
+        }
+        self.max_depth = 0
+        self.total_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = asyncio.create_task(self._run(), name=f"{self.name}-worker")
+
+    async def enqueue(self, document: Dict[str, Any]) -> None:
+        """Queue a document for insertion; waits only while the queue is full"""
+        self._ensure_worker()
+        if self._queue.full():
+            self.counters["backpressure_waits"] += 1
+        await self._queue.put(document)
+        self.counters["enqueued"] += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    document = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if document is None:
+                    stopping = True
+                    break
+                batch.append(document)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        written: List[Dict[str, Any]] = []
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                written = batch
+                break
+            except BulkWriteError as e:
+                # Per-document errors (e.g. duplicate keys) won't succeed on retry
+                errors = e.details.get("writeErrors", [])
+                if attempt > 0:
+                    # insert_many gave each document its _id on the first attempt, so a duplicate _id
+                    # now means an earlier attempt stored it before failing
+                    errors = [error for error in errors if not _duplicate_id(error)]
+                rejected = {error["index"] for error in errors}
+                written = [document for i, document in enumerate(batch) if i not in rejected]
+                if rejected:
+                    self.counters["failed"] += len(rejected)
+                    logger.warning(f"{self.name}: {len(rejected)} documents rejected")
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"{self.name}: dropping {len(batch)} documents after {attempt + 1} attempts: {e}")
+                    self.counters["failed"] += len(batch)
+                    break
+                self.counters["retries"] += 1
+                logger.warning(f"{self.name}: insert of {len(batch)} documents failed, retrying: {e}")
+                await asyncio.sleep(min(0.1 * 2 ** attempt, 2.0))
+        self.counters["written"] += len(written)
+
+        if written and self.after_write is not None:
+            try:
+                await self.after_write(written)
+            except Exception as e:
+                self.counters["after_write_errors"] += 1
+                logger.warning(f"{self.name}: after_write failed for {len(written)} documents: {e}")
+
+        elapsed = time.perf_counter() - started
+        self.counters["batches"] += 1
+        self.total_flush_seconds += elapsed
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything queued so far, then stop the worker"""
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(self._worker, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{self.name}: {self._queue.qsize()} documents not written before shutdown")
+        self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_depth,
+            "max_queue_size": self.max_queue_size,
+            "max_batch_size": self.max_batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "avg_batch_size": round((self.counters["written"] + self.counters["failed"]) / batches, 2) if batches else 0.0,
+            "avg_flush_ms": round(self.total_flush_seconds * 1000 / batches, 2) if batches else 0.0,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+        }
@@ -7,6 +7,7 @@ Tests all API endpoints with proper data validation and error handling
 import requests
 import json
 import base64
+import hashlib
 import time
 from typing import Dict, Any, List
 import os
@@ -123,6 +124,170 @@ class KisanAITester:
         except Exception as e:
             self.log_test("Crop Disease Analysis", False, f"Exception: {str(e)}")
     
+    def test_crop_disease_binary_upload(self):
+        """Test binary uploads to /api/analyze-crop-disease (multipart and raw body)"""
+        image_bytes = base64.b64decode(self.create_sample_image_base64())
+        try:
+            # Multipart file part
+            response = self.session.post(f"{API_BASE_URL}/analyze-crop-disease",
+                                       files={"image": ("crop.png", image_bytes, "image/png")},
+                                       data={"language": "hi"})
+            
+            if response.status_code == 200 and response.json().get("success"):
+                self.log_test("Crop Disease Analysis (Multipart)", True, 
+                            f"Disease: {response.json()['analysis']['disease_name']}")
+            else:
+                self.log_test("Crop Disease Analysis (Multipart)", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+            
+            # Raw octet-stream body
+            response = self.session.post(f"{API_BASE_URL}/analyze-crop-disease/raw?language=en",
+                                       data=image_bytes,
+                                       headers={"Content-Type": "application/octet-stream"})
+            
+            if response.status_code == 200 and response.json().get("success"):
+                self.log_test("Crop Disease Analysis (Raw)", True, 
+                            f"Disease: {response.json()['analysis']['disease_name']}")
+            else:
+                self.log_test("Crop Disease Analysis (Raw)", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+            
+            # Stored image (the preprocessed JPEG) is retrievable by its content hash
+            image_hash = response.json().get("image_sha256") if response.status_code == 200 else None
+            if image_hash:
+                response = self.session.get(f"{API_BASE_URL}/images/{image_hash}")
+                if (response.status_code == 200 and 
+                    response.headers.get("content-type") == "image/jpeg" and
+                    hashlib.sha256(response.content).hexdigest() == image_hash):
+                    self.log_test("Image Store Retrieval", True, f"Image {image_hash[:12]} served from store")
+                else:
+                    self.log_test("Image Store Retrieval", False, f"Status: {response.status_code}")
+            else:
+                self.log_test("Image Store Retrieval", False, "No image_sha256 in analysis response")
+            
+            # Missing image
+            response = self.session.post(f"{API_BASE_URL}/analyze-crop-disease", data={"language": "en"})
+            if response.status_code == 400:
+                self.log_test("Crop Disease Analysis (No Image)", True, "Correctly returns 400")
+            else:
+                self.log_test("Crop Disease Analysis (No Image)", False, 
+                            f"Expected 400, got {response.status_code}")
+            
+            # Bytes that don't decode as an image are rejected before the vision call
+            response = self.session.post(f"{API_BASE_URL}/analyze-crop-disease/raw",
+                                       data=b"not an image",
+                                       headers={"Content-Type": "application/octet-stream"})
+            if response.status_code == 400:
+                self.log_test("Crop Disease Analysis (Invalid Image)", True, "Correctly returns 400")
+            else:
+                self.log_test("Crop Disease Analysis (Invalid Image)", False, 
+                            f"Expected 400, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_test("Crop Disease Binary Upload", False, f"Exception: {str(e)}")
+    
+    def test_write_behind_stats(self):
+        """Test GET /api/write-stats - Crop analyses persisted through the write-behind queue"""
+        try:
+            # Give the queue a flush interval to write the analyses from earlier tests
+            time.sleep(0.5)
+            response = self.session.get(f"{API_BASE_URL}/write-stats")
+            
+            if response.status_code == 200:
+                data = response.json()
+                writer = data.get("writers", {}).get("crop_analyses", {})
+                if (data.get("success") and 
+                    writer.get("enqueued", 0) > 0 and
+                    writer.get("written", 0) + writer.get("queue_depth", 0) > 0):
+                    self.log_test("Write-Behind Stats", True, 
+                                f"Written: {writer['written']}, depth: {writer['queue_depth']}, "
+                                f"avg flush: {writer['avg_flush_ms']}ms")
+                else:
+                    self.log_test("Write-Behind Stats", False, 
+                                f"No crop analyses went through the queue: {data}")
+            else:
+                self.log_test("Write-Behind Stats", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Write-Behind Stats", False, f"Exception: {str(e)}")
+    
+    def test_analysis_history(self):
+        """Test GET /api/crop-analyses - Cursor-paginated analysis history"""
+        try:
+            time.sleep(0.5)  # Let the write-behind queue flush earlier analyses
+            response = self.session.get(f"{API_BASE_URL}/crop-analyses", params={"limit": 2})
+            
+            if response.status_code == 200:
+                data = response.json()
+                items = data.get("items", [])
+                if not (data.get("success") and items and 
+                        all("image_base64" not in item for item in items)):
+                    self.log_test("Analysis History", False, 
+                                f"Invalid response structure: {data}")
+                    return
+                
+                if data.get("next_cursor"):
+                    next_page = self.session.get(f"{API_BASE_URL}/crop-analyses",
+                                                 params={"limit": 2, "cursor": data["next_cursor"]}).json()
+                    overlap = {item["id"] for item in items} & {item["id"] for item in next_page.get("items", [])}
+                    if overlap:
+                        self.log_test("Analysis History", False, f"Pages overlap: {overlap}")
+                        return
+                
+                self.log_test("Analysis History", True, 
+                            f"Latest: {items[0]['disease_name']}, more pages: {data.get('has_more')}")
+            else:
+                self.log_test("Analysis History", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Analysis History", False, f"Exception: {str(e)}")
+    
+    def test_disease_outbreaks(self):
+        """Test GET /api/disease-outbreaks - Outbreak dashboard from rollups"""
+        try:
+            time.sleep(0.5)  # Rollups are updated when the write-behind queue flushes
+            response = self.session.get(f"{API_BASE_URL}/disease-outbreaks", params={"interval": "week"})
+            
+            if response.status_code == 200:
+                data = response.json()
+                periods = data.get("periods", [])
+                if (data.get("success") and periods and
+                    all(key in periods[0] for key in ("state", "disease", "period_start", "count", "avg_confidence"))):
+                    self.log_test("Disease Outbreaks", True, 
+                                f"{len(periods)} buckets, totals: {data.get('totals')}")
+                else:
+                    self.log_test("Disease Outbreaks", False, 
+                                f"Invalid response structure: {data}")
+            else:
+                self.log_test("Disease Outbreaks", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Disease Outbreaks", False, f"Exception: {str(e)}")
+    
+    def test_vision_cache(self):
+        """Test that repeat uploads of the same image are served from the vision cache"""
+        try:
+            before = self.session.get(f"{API_BASE_URL}/cache-stats").json()["caches"]["vision"]
+            
+            payload = {"image_base64": self.create_sample_image_base64(), "language": "en"}
+            first = self.session.post(f"{API_BASE_URL}/analyze-crop-disease", data=payload).json()
+            second = self.session.post(f"{API_BASE_URL}/analyze-crop-disease", data=payload).json()
+            
+            after = self.session.get(f"{API_BASE_URL}/cache-stats").json()["caches"]["vision"]
+            
+            if (first["analysis"]["disease_name"] == second["analysis"]["disease_name"] and
+                after["hits"] > before["hits"]):
+                self.log_test("Vision Result Cache", True, 
+                            f"Hits: {after['hits']}, Misses: {after['misses']}, Hit rate: {after['hit_rate']}")
+            else:
+                self.log_test("Vision Result Cache", False, f"Cache stats: {after}")
+                
+        except Exception as e:
+            self.log_test("Vision Result Cache", False, f"Exception: {str(e)}")
+    
     def test_market_prices(self):
         """Test GET /api/market-prices/{state} - Market prices by state"""
         states_to_test = ["Maharashtra", "Punjab", "Bihar"]
@@ -178,6 +343,66 @@ class KisanAITester:
         except Exception as e:
             self.log_test("Market Prices - Invalid State", False, f"Exception: {str(e)}")
     
+    def test_market_price_update_requires_admin(self):
+        """Test PUT /api/market-prices/{state} - Rejected without the admin token"""
+        update = {"crops": [{"name": "Wheat", "msp": 2275, "mandi": 2400}]}
+        try:
+            response = self.session.put(f"{API_BASE_URL}/market-prices/Punjab", json=update)
+            if response.status_code in (401, 403):
+                self.log_test("Market Price Update - No Token", True, f"Rejected with {response.status_code}")
+            else:
+                self.log_test("Market Price Update - No Token", False, 
+                            f"Expected 401/403, got {response.status_code}")
+            
+            token = os.environ.get("ADMIN_API_TOKEN")
+            if not token:
+                return
+            headers = {"Authorization": f"Bearer {token}"}
+            zero_msp = {"crops": [{"name": "Gold", "msp": 0, "mandi": 10}]}
+            response = self.session.put(f"{API_BASE_URL}/market-prices/Punjab", json=zero_msp, headers=headers)
+            unknown = self.session.put(f"{API_BASE_URL}/market-prices/Atlantis", json=update, headers=headers)
+            if response.status_code == 422 and unknown.status_code == 404:
+                self.log_test("Market Price Update - Validation", True, "msp=0 and unknown states rejected")
+            else:
+                self.log_test("Market Price Update - Validation", False, 
+                            f"msp=0: {response.status_code}, unknown state: {unknown.status_code}")
+                
+        except Exception as e:
+            self.log_test("Market Price Update", False, f"Exception: {str(e)}")
+    
+    def test_market_analytics(self):
+        """Test cross-state price queries backed by the columnar price table"""
+        try:
+            response = self.session.get(f"{API_BASE_URL}/market-prices?crop=Rice")
+            if (response.status_code == 200 and 
+                len(response.json().get("prices", [])) > 1 and
+                all(row["crop_name"] == "Rice" for row in response.json()["prices"])):
+                self.log_test("Market Prices - Crop Across States", True, 
+                            f"Rice found in {len(response.json()['prices'])} states")
+            else:
+                self.log_test("Market Prices - Crop Across States", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+            
+            response = self.session.get(f"{API_BASE_URL}/market-analytics/top-spreads?n=5")
+            if response.status_code == 200 and len(response.json().get("results", [])) == 5:
+                top = response.json()["results"][0]
+                self.log_test("Market Analytics - Top Spreads", True, 
+                            f"Best: {top['crop_name']} in {top['state']} ({top['profit_margin']}%)")
+            else:
+                self.log_test("Market Analytics - Top Spreads", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+            
+            response = self.session.get(f"{API_BASE_URL}/market-analytics/national")
+            if response.status_code == 200 and len(response.json().get("crops", [])) > 0:
+                self.log_test("Market Analytics - National", True, 
+                            f"Aggregates for {len(response.json()['crops'])} crops")
+            else:
+                self.log_test("Market Analytics - National", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Market Analytics", False, f"Exception: {str(e)}")
+    
     def test_government_schemes(self):
         """Test GET /api/government-schemes - Government schemes"""
         try:
@@ -252,9 +477,16 @@ class KisanAITester:
                     self.log_test("Farm Tasks (HI)", False, 
                                 f"Hindi support missing: {data}")
             else:
-                self.log_test("Farm Tasks (HI)", False, 
+                self.log_test("Farm Tasks (HI)", False,
                             f"Status: {response.status_code}")
-                
+
+            # Bodies are pre-serialized, so task ids must not change between requests
+            first = self.session.get(f"{API_BASE_URL}/farm-tasks?language=en").json()
+            second = self.session.get(f"{API_BASE_URL}/farm-tasks?language=en").json()
+            first_ids = [task["id"] for task in first["tasks"]]
+            second_ids = [task["id"] for task in second["tasks"]]
+            self.log_test("Farm Tasks (stable ids)", first_ids == second_ids, f"IDs: {first_ids}")
+
         except Exception as e:
             self.log_test("Farm Tasks", False, f"Exception: {str(e)}")
     
@@ -287,6 +519,32 @@ class KisanAITester:
         except Exception as e:
             self.log_test("Translation Service", False, f"Exception: {str(e)}")
     
+    def test_batch_translation(self):
+        """Test POST /api/translate/batch - Batch translation with translation memory"""
+        try:
+            texts = ["Market Prices", "My Farm", "Market Prices", "Government Schemes"]
+            payload = {"texts": texts, "target_language": "hi"}
+            
+            response = self.session.post(f"{API_BASE_URL}/translate/batch", json=payload)
+            
+            if response.status_code == 200:
+                data = response.json()
+                translations = data.get("translations", [])
+                if (data.get("success") and 
+                    len(translations) == len(texts) and
+                    [t["original_text"] for t in translations] == texts):
+                    self.log_test("Batch Translation", True, 
+                                f"Translated {len(translations)} strings in one call")
+                else:
+                    self.log_test("Batch Translation", False, 
+                                f"Invalid response structure: {data}")
+            else:
+                self.log_test("Batch Translation", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Batch Translation", False, f"Exception: {str(e)}")
+    
     def test_speech_to_text(self):
         """Test POST /api/voice/speech-to-text - Voice transcription"""
         try:
@@ -316,6 +574,69 @@ class KisanAITester:
         except Exception as e:
             self.log_test("Speech to Text", False, f"Exception: {str(e)}")
     
+    def test_voice_stream(self):
+        """Test WS /api/voice/stream - Streaming speech to text with interim transcripts"""
+        try:
+            from websockets.sync.client import connect
+
+            ws_url = API_BASE_URL.replace("http", "ws", 1) + "/voice/stream?language=en"
+            messages = []
+            with connect(ws_url, open_timeout=10, close_timeout=10) as websocket:
+                # 16 kHz 16-bit mono in 100 ms frames, as a phone recorder would send it
+                for _ in range(20):
+                    websocket.send(os.urandom(3200))
+                websocket.send(json.dumps({"event": "end"}))
+                # The server closes the socket after the final transcript
+                for message in websocket:
+                    messages.append(json.loads(message))
+            
+            partials = [m for m in messages if m.get("type") == "partial"]
+            final = messages[-1] if messages else {}
+            elapsed = [m.get("elapsed_ms", -1) for m in messages]
+            if (partials and
+                final.get("type") == "final" and
+                final.get("transcript") == "Tell me about tomato diseases" and
+                final.get("language") == "en" and
+                all(final["transcript"].startswith(p["transcript"]) for p in partials) and
+                elapsed == sorted(elapsed) and elapsed[0] >= 0):
+                self.log_test("Voice Stream", True, 
+                            f"{len(partials)} partials, final '{final['transcript']}' at {final['elapsed_ms']} ms")
+            else:
+                self.log_test("Voice Stream", False, 
+                            f"Unexpected messages: {messages}")
+                
+        except Exception as e:
+            self.log_test("Voice Stream", False, f"Exception: {str(e)}")
+    
+    def test_voice_assistant(self):
+        """Test POST /api/voice/assistant - STT, answer and TTS in one streamed response"""
+        try:
+            payload = {
+                "audio_base64": self.create_sample_audio_base64(),
+                "language": "hi"
+            }
+            
+            response = self.session.post(f"{API_BASE_URL}/voice/assistant", json=payload)
+            
+            if response.status_code == 200:
+                events = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+                types = [event.get("type") for event in events]
+                sentences = [event for event in events if event.get("type") == "sentence"]
+                if (types and types[0] == "transcript" and types[-1] == "done" and
+                    sentences and all(event.get("audio_base64") for event in sentences) and
+                    "first_audio_ms" in events[-1].get("timings", {})):
+                    self.log_test("Voice Assistant", True, 
+                                f"{len(sentences)} sentences, timings: {events[-1]['timings']}")
+                else:
+                    self.log_test("Voice Assistant", False, 
+                                f"Unexpected event stream: {types}")
+            else:
+                self.log_test("Voice Assistant", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Voice Assistant", False, f"Exception: {str(e)}")
+    
     def test_text_to_speech(self):
         """Test POST /api/voice/text-to-speech - Voice synthesis"""
         try:
@@ -328,14 +649,22 @@ class KisanAITester:
                                        data=payload)
             
             if response.status_code == 200:
-                data = response.json()
-                if (data.get("success") and 
-                    "audio_base64" in data):
-                    self.log_test("Text to Speech", True, 
-                                f"Audio generated: {len(data['audio_base64'])} chars")
+                if (response.headers.get("content-type", "").startswith("audio/") and
+                    response.content[:4] == b"RIFF"):
+                    # Same text again should come from the audio cache, and support Range
+                    partial = self.session.get(f"{API_BASE_URL}/voice/text-to-speech",
+                                               params=payload, headers={"Range": "bytes=0-99"})
+                    if (partial.status_code == 206 and
+                        len(partial.content) == 100 and
+                        partial.headers.get("x-tts-cache") == "hit"):
+                        self.log_test("Text to Speech", True, 
+                                    f"Audio generated: {len(response.content)} bytes, cached range served")
+                    else:
+                        self.log_test("Text to Speech", False, 
+                                    f"Range request failed: {partial.status_code}, {dict(partial.headers)}")
                 else:
                     self.log_test("Text to Speech", False, 
-                                f"Invalid response structure: {data}")
+                                f"Invalid response: {response.headers.get('content-type')}")
             else:
                 self.log_test("Text to Speech", False, 
                             f"Status: {response.status_code}, Response: {response.text}")
@@ -343,6 +672,59 @@ class KisanAITester:
         except Exception as e:
             self.log_test("Text to Speech", False, f"Exception: {str(e)}")
     
+    def test_provider_stats(self):
+        """Test GET /api/provider-stats - Provider gateway deadlines, hedging and circuit breakers"""
+        try:
+            response = self.session.get(f"{API_BASE_URL}/provider-stats")
+            
+            if response.status_code == 200:
+                data = response.json()
+                providers = data.get("providers", {})
+                expected = {"gemini_vision", "gemini_pro", "translate", "speech_to_text", "text_to_speech"}
+                pools = data.get("connection_pools", {})
+                if (data.get("success") and 
+                    expected <= set(providers) and
+                    sum(p.get("successes", 0) for p in providers.values()) > 0 and
+                    pools and all(pool.get("started") for pool in pools.values())):
+                    self.log_test("Provider Gateway Stats", True, 
+                                ", ".join(f"{name}: {p['circuit']}/{p['successes']} ok" 
+                                          for name, p in sorted(providers.items())) +
+                                f"; pools: {', '.join(sorted(pools))}")
+                else:
+                    self.log_test("Provider Gateway Stats", False, 
+                                f"Missing providers, pools or calls: {data}")
+            else:
+                self.log_test("Provider Gateway Stats", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Provider Gateway Stats", False, f"Exception: {str(e)}")
+    
+    def test_reference_data(self):
+        """Test GET /api/reference-stats - Shared reference data snapshot"""
+        try:
+            response = self.session.get(f"{API_BASE_URL}/reference-stats")
+            
+            if response.status_code == 200:
+                reference = response.json().get("reference_data", {})
+                prices = self.session.get(f"{API_BASE_URL}/market-prices", params={"crop": "Wheat"}).json()
+                if (reference.get("version", 0) >= 1 and
+                    reference.get("price_rows", 0) > 0 and
+                    reference.get("schemes", 0) > 0 and
+                    prices.get("data_version") == reference["version"]):
+                    self.log_test("Reference Data Snapshot", True, 
+                                f"v{reference['version']}, {reference['price_rows']} price rows, "
+                                f"{reference['mapped_bytes']} bytes mapped")
+                else:
+                    self.log_test("Reference Data Snapshot", False, 
+                                f"Unexpected snapshot stats: {reference}, prices: {prices.get('data_version')}")
+            else:
+                self.log_test("Reference Data Snapshot", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Reference Data Snapshot", False, f"Exception: {str(e)}")
+    
     def test_supported_languages(self):
         """Test GET /api/languages - Supported languages"""
         try:
@@ -377,6 +759,58 @@ class KisanAITester:
         except Exception as e:
             self.log_test("Supported Languages", False, f"Exception: {str(e)}")
     
+    def test_string_bundles(self):
+        """Test GET /api/i18n/{language} - Precompiled UI string bundles with ETags"""
+        try:
+            response = self.session.get(f"{API_BASE_URL}/i18n/mr")
+            
+            if response.status_code == 200:
+                data = response.json()
+                etag = response.headers.get("ETag")
+                if data.get("success") and data.get("strings") and etag:
+                    self.log_test("String Bundle (MR)", True, 
+                                f"{len(data['strings'])} strings, fallbacks: {data['fallbacks']}")
+                else:
+                    self.log_test("String Bundle (MR)", False, f"Invalid response structure: {data}")
+                
+                response = self.session.get(f"{API_BASE_URL}/i18n/mr", headers={"If-None-Match": etag})
+                if response.status_code == 304:
+                    self.log_test("String Bundle Revalidation", True, "Unchanged bundle returns 304")
+                else:
+                    self.log_test("String Bundle Revalidation", False, 
+                                f"Expected 304, got {response.status_code}")
+            else:
+                self.log_test("String Bundle (MR)", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("String Bundles", False, f"Exception: {str(e)}")
+    
+    def test_conditional_get(self):
+        """Test ETag revalidation and compression on catalog endpoints"""
+        for path in ["/languages", "/government-schemes?language=hi", "/market-prices/Punjab?language=en"]:
+            try:
+                response = self.session.get(f"{API_BASE_URL}{path}", headers={"Accept-Encoding": "gzip"})
+                etag = response.headers.get("ETag")
+                if response.status_code != 200 or not etag or "Cache-Control" not in response.headers:
+                    self.log_test(f"Conditional GET {path}", False, 
+                                f"Status: {response.status_code}, Headers: {dict(response.headers)}")
+                    continue
+                
+                # The ETag belongs to the gzip variant, so revalidate with the same Accept-Encoding
+                revalidated = self.session.get(
+                    f"{API_BASE_URL}{path}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+                )
+                if revalidated.status_code == 304:
+                    self.log_test(f"Conditional GET {path}", True, 
+                                f"304 on revalidation, encoding: {response.headers.get('Content-Encoding', 'identity')}")
+                else:
+                    self.log_test(f"Conditional GET {path}", False, 
+                                f"Expected 304, got {revalidated.status_code}")
+                    
+            except Exception as e:
+                self.log_test(f"Conditional GET {path}", False, f"Exception: {str(e)}")
+    
     def test_database_operations(self):
         """Test database operations by checking if crop analysis is saved"""
         try:
@@ -404,6 +838,27 @@ class KisanAITester:
         except Exception as e:
             self.log_test("Database Operations", False, f"Exception: {str(e)}")
     
+    def test_metrics(self):
+        """Test GET /api/metrics - Prometheus metrics"""
+        try:
+            response = self.session.get(f"{API_BASE_URL}/metrics")
+            
+            if response.status_code == 200:
+                text = response.text
+                if ("kisan_http_request_duration_seconds_bucket" in text and
+                    'kind="provider"' in text):
+                    samples = [line for line in text.splitlines() if line and not line.startswith("#")]
+                    self.log_test("Prometheus Metrics", True, f"{len(samples)} samples")
+                else:
+                    self.log_test("Prometheus Metrics", False, 
+                                f"Missing request or provider metrics: {text[:500]}")
+            else:
+                self.log_test("Prometheus Metrics", False, 
+                            f"Status: {response.status_code}, Response: {response.text}")
+                
+        except Exception as e:
+            self.log_test("Prometheus Metrics", False, f"Exception: {str(e)}")
+    
     def run_all_tests(self):
         """Run all backend tests"""
         print("=" * 60)
@@ -414,14 +869,29 @@ class KisanAITester:
         # Run all tests
         self.test_root_endpoint()
         self.test_crop_disease_analysis()
+        self.test_crop_disease_binary_upload()
+        self.test_vision_cache()
+        self.test_write_behind_stats()
+        self.test_analysis_history()
+        self.test_disease_outbreaks()
         self.test_market_prices()
+        self.test_market_analytics()
+        self.test_market_price_update_requires_admin()
         self.test_government_schemes()
         self.test_farm_tasks()
         self.test_translation()
+        self.test_batch_translation()
         self.test_speech_to_text()
+        self.test_voice_stream()
+        self.test_voice_assistant()
         self.test_text_to_speech()
+        self.test_provider_stats()
+        self.test_reference_data()
         self.test_supported_languages()
+        self.test_string_bundles()
+        self.test_conditional_get()
         self.test_database_operations()
+        self.test_metrics()
         
         # Print summary
         print()
@@ -338,6 +338,29 @@ const VoiceRecorder = ({ language, onTranscription }) => {
   const [audioStream, setAudioStream] = useState(null);
   const mediaRecorderRef = useRef(null);
   const audioChunksRef = useRef([]);
+  const socketRef = useRef(null);
+
+  const closeSocket = () => {
+    if (socketRef.current) {
+      socketRef.current.close();
+      socketRef.current = null;
+    }
+  };
+
+  // Don't leave the microphone or the transcript socket open after unmounting
+  useEffect(() => {
+    return () => {
+      if (socketRef.current) {
+        socketRef.current.close();
+      }
+      const mediaRecorder = mediaRecorderRef.current;
+      if (mediaRecorder && mediaRecorder.state !== 'inactive') {
+        mediaRecorder.onstop = null;
+        mediaRecorder.stop();
+        mediaRecorder.stream.getTracks().forEach(track => track.stop());
+      }
+    };
+  }, []);
 
   const startRecording = async () => {
     try {
@@ -348,13 +371,46 @@ const VoiceRecorder = ({ language, onTranscription }) => {
       mediaRecorderRef.current = mediaRecorder;
       audioChunksRef.current = [];
 
+      // Stream audio chunks over a WebSocket for live partial transcripts
+      closeSocket();
+      const socket = new WebSocket(`${API.replace(/^http/, 'ws')}/voice/stream?language=${language}`);
+      socketRef.current = socket;
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'partial' || message.type === 'final') {
+          onTranscription(message.transcript);
+        }
+        // Nothing more comes after the final transcript or an error
+        if (message.type === 'final' || message.type === 'error') {
+          socket.close();
+        }
+      };
+      socket.onclose = () => {
+        if (socketRef.current === socket) {
+          socketRef.current = null;
+        }
+      };
+
       mediaRecorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
           audioChunksRef.current.push(event.data);
+          if (socket.readyState === WebSocket.OPEN) {
+            socket.send(event.data);
+          }
         }
       };
 
       mediaRecorder.onstop = async () => {
+        if (socket.readyState === WebSocket.OPEN) {
+          // The final transcript arrives on the socket, which is closed once it has
+          socket.send(JSON.stringify({ event: 'end' }));
+          // Don't wait forever if it never comes
+          setTimeout(() => socket.close(), 10000);
+          return;
+        }
+
+        // WebSocket unavailable: drop it and fall back to uploading the whole clip
+        socket.close();
         const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/wav' });
         const reader = new FileReader();
         
@@ -379,7 +435,8 @@ const VoiceRecorder = ({ language, onTranscription }) => {
         reader.readAsDataURL(audioBlob);
       };
 
-      mediaRecorder.start();
+      // Emit a chunk every 250 ms instead of one blob at the end
+      mediaRecorder.start(250);
       setIsRecording(true);
       
       // Stop recording after 5 seconds (or implement stop button)
@@ -586,8 +643,10 @@ const DiseaseDetection = ({ language }) => {
     
     setLoading(true);
     try {
+      // Send the photo as a binary file part instead of a base64 string
+      const imageBlob = await (await fetch(selectedImage)).blob();
       const formData = new FormData();
-      formData.append('image_base64', selectedImage.split(',')[1]);
+      formData.append('image', imageBlob, 'crop.jpg');
       formData.append('language', language);
 
       const response = await axios.post(`${API}/analyze-crop-disease`, formData);
@@ -759,13 +818,11 @@ const GovernmentSchemes = ({ language }) => {
                       language === 'pa' ? 'pa-IN' : 'en-US';
       speechSynthesis.speak(utterance);
     } else {
-      // Fallback to backend TTS
+      // Fallback to backend TTS, streamed so playback starts while it downloads
       try {
-        const response = await axios.post(`${API}/voice/text-to-speech`, {
-          text: text,
-          language: language
-        });
-        // Play the returned audio (would need additional implementation)
+        const params = new URLSearchParams({ text: text, language: language });
+        const audio = new Audio(`${API}/voice/text-to-speech?${params}`);
+        await audio.play();
       } catch (error) {
         console.error('TTS failed:', error);
       }
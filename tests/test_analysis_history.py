@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from analysis_history import decode_cursor, encode_cursor, list_history
+
+
+def _analyses():
+    start = datetime(2024, 3, 1, 9)
+    analyses = []
+    for i in range(7):
+        analyses.append({
+            "id": f"id-{i:02d}",
+            "disease_name": "Rust" if i % 2 else "Blight",
+            "confidence": 0.9,
+            "treatment": "Spray",
+            "treatment_hi": "छिड़काव",
+            "state": "Punjab",
+            # Pairs share a timestamp, so the id has to break ties
+            "timestamp": start + timedelta(hours=i // 2),
+            "image_sha256": f"sha-{i}",
+            "image_base64": "aGVsbG8=",
+        })
+    return analyses
+
+
+def _collection():
+    collection = AsyncMongoMockClient()["kisan_test"]["crop_analyses"]
+    asyncio.run(collection.insert_many(_analyses()))
+    return collection
+
+
+def _all_pages(collection, limit, **filters):
+    async def run():
+        pages, cursor = [], None
+        while True:
+            page = await list_history(collection, limit, cursor, **filters)
+            pages.append([item["id"] for item in page["items"]])
+            if not page["has_more"]:
+                assert page["next_cursor"] is None
+                return pages
+            cursor = page["next_cursor"]
+
+    return asyncio.run(run())
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 3, 1, 9, 30, 15, 250000)
+
+    cursor = encode_cursor(timestamp, "id-07")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, "id-07")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", encode_cursor(datetime(2024, 3, 1), "x")[:-4]])
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_pages_are_newest_first_with_ties_broken_by_id():
+    pages = _all_pages(_collection(), 3)
+
+    assert pages == [["id-06", "id-05", "id-04"], ["id-03", "id-02", "id-01"], ["id-00"]]
+
+
+def test_disease_filter_pages_through_matching_rows():
+    pages = _all_pages(_collection(), 2, disease="Rust")
+
+    assert pages == [["id-05", "id-03"], ["id-01"]]
+
+
+def test_items_carry_state_and_leave_out_images_unless_asked():
+    collection = _collection()
+
+    item = asyncio.run(list_history(collection, 1))["items"][0]
+    assert item["state"] == "Punjab"
+    assert "image_base64" not in item and "_id" not in item
+
+    item = asyncio.run(list_history(collection, 1, include_image=True))["items"][0]
+    assert item["image_base64"] == "aGVsbG8="
@@ -0,0 +1,114 @@
+import asyncio
+
+from batching import MicroBatcher
+
+
+class RecordingBatchFn:
+    """Doubles every item, remembering the batches it was called with"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False, short: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.short = short
+        self.batches = []
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        results = [item * 2 for item in items]
+        return results[:-1] if self.short else results
+
+
+def _submit_all(batcher, items):
+    async def run():
+        try:
+            return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(run())
+
+
+def test_concurrent_submissions_share_batches_and_get_their_own_results():
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+
+    results = _submit_all(batcher, list(range(10)))
+
+    assert results == [item * 2 for item in range(10)]
+    assert batch_fn.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    stats = batcher.stats()
+    assert stats["batches"] == 3 and stats["items"] == 10
+    assert stats["full_flushes"] == 2 and stats["timeout_flushes"] == 1
+    assert stats["batch_size_histogram"] == {"2": 1, "4": 2}
+
+
+def test_lone_submission_flushes_after_max_wait():
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await batcher.submit(21)
+        waited = loop.time() - started
+        await batcher.stop()
+        return result, waited
+
+    result, waited = asyncio.run(run())
+    assert result == 42
+    assert 0.015 <= waited < 0.5
+    assert batch_fn.batches == [[21]]
+
+
+def test_batch_failure_reaches_every_caller_in_the_batch():
+    batcher = MicroBatcher(RecordingBatchFn(fail=True), max_batch_size=3, max_wait_ms=50)
+
+    results = _submit_all(batcher, [1, 2, 3])
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["errors"] == 1
+
+
+def test_wrong_result_count_fails_the_batch():
+    batcher = MicroBatcher(RecordingBatchFn(short=True), max_batch_size=2, max_wait_ms=50)
+
+    results = _submit_all(batcher, [1, 2])
+
+    assert all(isinstance(result, RuntimeError) and "2 items" in str(result) for result in results)
+
+
+def test_next_batch_is_collected_while_one_is_in_flight():
+    batch_fn = RecordingBatchFn(delay=0.2)
+    batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_ms=10)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await asyncio.gather(*(batcher.submit(item) for item in range(6)))
+        elapsed = loop.time() - started
+        await batcher.stop()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+    assert results == [0, 2, 4, 6, 8, 10]
+    # Three 200 ms batches overlap rather than running back to back
+    assert elapsed < 0.45
+
+
+def test_stop_fails_submissions_not_yet_dispatched():
+    batch_fn = RecordingBatchFn()
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=5000)
+        submissions = [asyncio.create_task(batcher.submit(item)) for item in (1, 2)]
+        # Both are now in the batch the worker is still collecting
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(*submissions, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) and "shutting down" in str(result) for result in results)
+    assert batch_fn.batches == []
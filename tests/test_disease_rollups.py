@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from disease_rollups import ROLLUP_COLLECTION, _day, apply_rollups, query_outbreaks, rebuild_rollups, rollup_operations
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+class MergingDatabase:
+    """mongomock database whose crop_analyses applies the final ``$merge`` stage mongomock lacks"""
+
+    def __init__(self, db):
+        self.db = db
+        self.crop_analyses = _MergingCollection(db)
+
+    def __getitem__(self, name):
+        return self.db[name]
+
+
+class _MergingCollection:
+    def __init__(self, db):
+        self.db = db
+
+    def aggregate(self, pipeline, **kwargs):
+        *stages, merge = pipeline
+        options = merge["$merge"]
+        assert options["on"] == "_id" and options["whenMatched"] == "replace"
+        target = self.db[options["into"]]
+        source = self.db.crop_analyses
+
+        class Result:
+            async def to_list(self, length=None):
+                async for document in source.aggregate(stages):
+                    await target.replace_one({"_id": document["_id"]}, document, upsert=True)
+                return []
+
+        return Result()
+
+
+def _analyses():
+    # Stored as MongoDB returns them: naive UTC
+    return [
+        {"state": "Punjab", "disease_name": "Rust", "confidence": 0.5, "timestamp": datetime(2024, 3, 4, 9)},
+        {"state": "Punjab", "disease_name": "Rust", "confidence": 0.75, "timestamp": datetime(2024, 3, 4, 23, 59)},
+        {"state": "Punjab", "disease_name": "Rust", "confidence": 0.25, "timestamp": datetime(2024, 3, 6, 1)},
+        {"state": None, "disease_name": "Blight", "confidence": 1.0, "timestamp": datetime(2024, 3, 5, 12)},
+        {"disease_name": "Blight", "confidence": 0.5, "timestamp": datetime(2024, 3, 12, 8)},
+    ]
+
+
+async def _rollups(db):
+    return sorted(await db[ROLLUP_COLLECTION].find({}).to_list(length=None), key=lambda rollup: rollup["_id"])
+
+
+def test_day_is_the_utc_day():
+    assert _day(datetime(2024, 3, 5, 18, 45, 12)) == datetime(2024, 3, 5)
+    # 02:00 on the 6th in India is still the 5th in UTC
+    assert _day(datetime(2024, 3, 6, 2, 0, tzinfo=IST)) == datetime(2024, 3, 5)
+    assert _day(datetime(2024, 3, 6, 2, 0, tzinfo=timezone.utc)) == datetime(2024, 3, 6)
+
+    operation = rollup_operations([
+        {"state": "Punjab", "disease_name": "Rust", "confidence": 0.5, "timestamp": datetime(2024, 3, 6, 2, tzinfo=IST)}
+    ])[0]
+    assert operation._filter == {"_id": "2024-03-05|Punjab|Rust"}
+
+
+def test_rebuild_matches_incremental_rollups():
+    client = AsyncMongoMockClient()
+    incremental, rebuilt = client["incremental"], MergingDatabase(client["rebuilt"])
+
+    async def run():
+        analyses = _analyses()
+        for analysis in analyses:
+            await apply_rollups(incremental[ROLLUP_COLLECTION], [analysis])
+        await rebuilt["crop_analyses"].insert_many([dict(analysis) for analysis in analyses])
+        # Left over from before: dropped by a full rebuild
+        await rebuilt[ROLLUP_COLLECTION].insert_one({"_id": "2024-02-01|Punjab|Rust", "day": datetime(2024, 2, 1)})
+        buckets = await rebuild_rollups(rebuilt)
+        return buckets, await _rollups(incremental), await _rollups(rebuilt)
+
+    buckets, expected, actual = asyncio.run(run())
+    assert buckets == 4
+    assert actual == expected
+    assert [rollup["_id"] for rollup in actual] == [
+        "2024-03-04|Punjab|Rust", "2024-03-05|Unknown|Blight", "2024-03-06|Punjab|Rust", "2024-03-12|Unknown|Blight",
+    ]
+    assert actual[0]["count"] == 2 and actual[0]["confidence_sum"] == 1.25
+    assert actual[0]["last_seen"] == datetime(2024, 3, 4, 23, 59)
+
+
+def test_rebuild_since_only_replaces_later_buckets():
+    db = MergingDatabase(AsyncMongoMockClient()["kisan_test"])
+
+    async def run():
+        await db["crop_analyses"].insert_many(_analyses())
+        await rebuild_rollups(db)
+        # Buckets before the cutoff are kept as they are, even if they disagree with crop_analyses
+        await db[ROLLUP_COLLECTION].update_one({"_id": "2024-03-04|Punjab|Rust"}, {"$set": {"count": 99}})
+        await db[ROLLUP_COLLECTION].update_one({"_id": "2024-03-06|Punjab|Rust"}, {"$set": {"count": 99}})
+        await db["crop_analyses"].delete_many({"disease_name": "Blight"})
+        # Midnight of the 6th in India: the rebuild starts from the UTC day, the 5th
+        buckets = await rebuild_rollups(db, since=datetime(2024, 3, 6, 0, 0, tzinfo=IST))
+        return buckets, {rollup["_id"]: rollup["count"] for rollup in await _rollups(db)}
+
+    buckets, counts = asyncio.run(run())
+    assert buckets == 1
+    assert counts == {"2024-03-04|Punjab|Rust": 99, "2024-03-06|Punjab|Rust": 1}
+
+
+def test_outbreaks_combine_days_into_weeks():
+    db = AsyncMongoMockClient()["kisan_test"]
+
+    async def run():
+        await apply_rollups(db[ROLLUP_COLLECTION], _analyses())
+        return await query_outbreaks(db[ROLLUP_COLLECTION], datetime(2024, 3, 1), datetime(2024, 3, 31))
+
+    rows = asyncio.run(run())
+    assert [(row["period_start"], row["state"], row["disease"], row["count"]) for row in rows] == [
+        ("2024-03-04", "Punjab", "Rust", 3),
+        ("2024-03-04", "Unknown", "Blight", 1),
+        ("2024-03-11", "Unknown", "Blight", 1),
+    ]
+    assert rows[0]["avg_confidence"] == 0.5
@@ -0,0 +1,92 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from http_cache import CachedBody, _negotiate_encoding, cached_response, file_response
+
+
+def _file_app(path):
+    async def serve(request):
+        clip = open(path, "rb")
+        # Removed (e.g. evicted by another worker) after opening, before the body is streamed
+        path.unlink()
+        return file_response(request, clip, '"clip"', "no-cache", "audio/wav")
+
+    return TestClient(Starlette(routes=[Route("/clip", serve)]))
+
+
+def test_file_response_streams_a_file_removed_after_opening(tmp_path):
+    audio = bytes(range(256)) * 1024
+    path = tmp_path / "clip.wav"
+
+    path.write_bytes(audio)
+    response = _file_app(path).get("/clip")
+    assert response.status_code == 200
+    assert response.content == audio
+
+    path.write_bytes(audio)
+    response = _file_app(path).get("/clip", headers={"Range": "bytes=1000-1999"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 1000-1999/{len(audio)}"
+    assert response.content == audio[1000:2000]
+
+
+def test_file_response_not_modified(tmp_path):
+    path = tmp_path / "clip.wav"
+    path.write_bytes(b"audio")
+    response = _file_app(path).get("/clip", headers={"If-None-Match": '"clip"'})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def _cached_app(cached):
+    async def serve(request):
+        return cached_response(request, cached, "no-cache")
+
+    return TestClient(Starlette(routes=[Route("/data", serve)]))
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0.2, gzip;q=0.8, identity;q=0.5", "gzip"),
+    ("gzip;q=0.4, identity", None),
+    ("br;q=0, gzip", "gzip"),
+    ("*;q=0.5, gzip;q=0.1", "br"),
+    ("gzip;q=0, br;q=0", None),
+    ("deflate", None),
+    ("", None),
+])
+def test_negotiate_encoding_picks_the_highest_q_value(accept_encoding, encoding):
+    assert _negotiate_encoding(accept_encoding) == encoding
+
+
+def test_each_encoding_has_its_own_etag():
+    cached = CachedBody(b'{"prices": [' + b"2300, " * 200 + b"2400]}")
+    client = _cached_app(cached)
+
+    etags = {}
+    for accept_encoding in ("identity", "gzip", "br"):
+        response = client.get("/data", headers={"Accept-Encoding": accept_encoding})
+        assert response.status_code == 200
+        assert response.content == cached.body
+        etags[accept_encoding] = response.headers["etag"]
+    assert etags["identity"] == cached.etag
+    assert etags["gzip"] == cached.etag[:-1] + '-gzip"'
+    assert len(set(etags.values())) == 3
+
+    revalidated = client.get("/data", headers={"Accept-Encoding": "gzip", "If-None-Match": etags["gzip"]})
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == etags["gzip"]
+    # A stored gzip response doesn't validate the brotli one
+    assert client.get("/data", headers={"Accept-Encoding": "br", "If-None-Match": etags["gzip"]}).status_code == 200
+    weak = client.get("/data", headers={"Accept-Encoding": "br", "If-None-Match": f"W/{etags['br']}"})
+    assert weak.status_code == 304
+
+
+def test_small_bodies_keep_the_plain_etag():
+    cached = CachedBody(b'{"ok": true}')
+
+    response = _cached_app(cached).get("/data", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == cached.etag
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+
+import http_pool
+from http_pool import HTTPClientPool, UpstreamClient, UpstreamConfig
+
+
+async def _serve_ok(reader, writer):
+    # Minimal HTTP/1.1 keep-alive server: answer every request on the connection
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            if not request:
+                break
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nContent-Type: text/plain\r\n\r\nok")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def test_config_env_overrides(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_TRANSLATE_MAX_CONNECTIONS", "64")
+    monkeypatch.setenv("UPSTREAM_TRANSLATE_KEEPALIVE_EXPIRY", "30")
+    monkeypatch.setenv("UPSTREAM_TRANSLATE_HTTP2", "off")
+
+    config = UpstreamConfig.from_env("translate", base_url="https://translate.example", max_keepalive_connections=5)
+
+    assert config == UpstreamConfig(
+        base_url="https://translate.example", max_connections=64, max_keepalive_connections=5,
+        keepalive_expiry=30.0, http2=False
+    )
+
+
+def test_client_is_unavailable_before_startup():
+    upstream = UpstreamClient("gemini", UpstreamConfig("https://gemini.example"))
+
+    with pytest.raises(RuntimeError, match="before app startup"):
+        upstream.client
+    assert upstream.stats()["connections"] == {"open": 0, "active": 0, "idle": 0, "http2": 0}
+    assert upstream.stats()["started"] is False
+
+
+def test_requests_reuse_one_keep_alive_connection():
+    async def run():
+        server = await asyncio.start_server(_serve_ok, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        pool = HTTPClientPool({"local": {"base_url": f"http://127.0.0.1:{port}", "max_connections": 4, "http2": False}})
+        await pool.start()
+        try:
+            for _ in range(3):
+                response = await pool["local"].request("GET", "/health")
+                assert response.text == "ok"
+            return pool.stats()["local"]
+        finally:
+            await pool.aclose()
+            server.close()
+            await server.wait_closed()
+
+    stats = asyncio.run(run())
+    assert stats["requests"] == 3 and stats["errors"] == 0 and stats["in_flight"] == 0
+    assert stats["connections"] == {"open": 1, "active": 0, "idle": 1, "http2": 0}
+    assert stats["utilization"] == 0.0
+
+
+def test_failed_requests_are_counted():
+    async def run():
+        # Grab a free port, then close it so connecting fails
+        server = await asyncio.start_server(_serve_ok, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+        upstream = UpstreamClient("down", UpstreamConfig(f"http://127.0.0.1:{port}", http2=False))
+        upstream.start()
+        try:
+            with pytest.raises(httpx.ConnectError):
+                await upstream.request("GET", "/")
+        finally:
+            await upstream.aclose()
+        return upstream.stats()
+
+    stats = asyncio.run(run())
+    assert stats["requests"] == 1 and stats["errors"] == 1 and stats["in_flight"] == 0
+
+
+def test_stats_say_unavailable_when_the_pool_cannot_be_read(monkeypatch, caplog):
+    class PoolessTransport(httpx.AsyncBaseTransport):
+        def __init__(self, **kwargs):
+            pass
+
+    monkeypatch.setattr(http_pool.httpx, "AsyncHTTPTransport", PoolessTransport)
+    upstream = UpstreamClient("gemini", UpstreamConfig("https://gemini.example"))
+
+    with caplog.at_level(logging.WARNING, logger="http_pool"):
+        upstream.start()
+
+    assert "Connection stats unavailable for gemini" in caplog.text
+    # Reported as unknown rather than as an empty pool
+    assert upstream.stats()["connections"] is None and upstream.stats()["utilization"] is None
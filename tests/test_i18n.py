@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from i18n import compile_bundles, fallback_chain, load_ui_strings, localized
+
+UI_STRINGS = {
+    "en": {"title": "Crop Doctor", "upload": "Upload photo", "weather": "Weather"},
+    "hi": {"title": "फसल डॉक्टर", "upload": "फोटो अपलोड करें", "weather": ""},
+    "mr": {"title": "पीक डॉक्टर"},
+}
+
+
+def test_fallback_chain_ends_with_english():
+    assert fallback_chain("mr") == ["mr", "hi", "en"]
+    assert fallback_chain("ta") == ["ta", "en"]
+    assert fallback_chain("en") == ["en"]
+
+
+def test_bundles_fall_back_from_marathi_to_hindi_to_english():
+    bundles = compile_bundles(UI_STRINGS, ["en", "hi", "mr", "ta"])
+
+    assert dict(bundles["mr"].strings) == {
+        "title": "पीक डॉक्टर", "upload": "फोटो अपलोड करें", "weather": "Weather"
+    }
+    # Empty strings count as missing
+    assert bundles["hi"].strings["weather"] == "Weather"
+    assert dict(bundles["ta"].strings) == UI_STRINGS["en"]
+
+    body = json.loads(bundles["mr"].body)
+    assert body == {"success": True, "language": "mr", "fallbacks": ["hi", "en"], "strings": dict(bundles["mr"].strings)}
+    # Serialized as UTF-8, not \u escapes
+    assert "पीक डॉक्टर".encode("utf-8") in bundles["mr"].body
+
+
+def test_bundles_are_read_only():
+    bundle = compile_bundles(UI_STRINGS, ["hi"])["hi"]
+
+    with pytest.raises(TypeError):
+        bundle.strings["title"] = "changed"
+
+
+def test_etag_follows_the_content():
+    bundles = compile_bundles(UI_STRINGS, ["en", "hi", "mr"])
+    again = compile_bundles(UI_STRINGS, ["en", "hi", "mr"])
+    edited = compile_bundles({**UI_STRINGS, "hi": {**UI_STRINGS["hi"], "upload": "अपलोड"}}, ["en", "hi", "mr"])
+
+    assert all(bundles[code].etag == again[code].etag for code in bundles)
+    assert len({bundle.etag for bundle in bundles.values()}) == 3
+    assert bundles["hi"].etag.startswith('"') and bundles["hi"].etag.endswith('"')
+    assert edited["en"].etag == bundles["en"].etag
+    # Marathi falls back to the edited Hindi string, so its bundle changes too
+    assert edited["hi"].etag != bundles["hi"].etag and edited["mr"].etag != bundles["mr"].etag
+
+
+def test_shipped_strings_cover_every_key():
+    ui_strings = load_ui_strings()
+    bundles = compile_bundles(ui_strings, list(ui_strings))
+
+    for bundle in bundles.values():
+        assert set(bundle.strings) == set(ui_strings["en"])
+
+
+def test_localized_field_follows_the_fallback_chain():
+    scheme = {"description": "Income support", "description_hi": "आय सहायता", "description_ta": ""}
+
+    assert localized(scheme, "description", "mr") == "आय सहायता"
+    assert localized(scheme, "description", "ta") == "Income support"
+    assert localized(scheme, "description", "en") == "Income support"
@@ -0,0 +1,116 @@
+import asyncio
+import io
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from image_preprocess import (
+    ImageDimensionsTooLarge, ImagePreprocessor, ImageRejected, UnsupportedImageFormat, preprocess_image
+)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+BENCHMARKS_DIR = BACKEND_DIR / "benchmarks"
+
+
+def _jpeg(width: int = 640, height: int = 480) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (40, 120, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def _png_header(width: int, height: int) -> bytes:
+    """A PNG that only declares its size: no pixel data follows"""
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IEND", b"")
+
+
+def _rejection(data: bytes, **limits) -> ImageRejected:
+    with pytest.raises(ImageRejected) as rejected:
+        preprocess_image(data, **limits)
+    return rejected.value
+
+
+def test_unreadable_upload_is_rejected():
+    error = _rejection(b"not an image")
+    assert type(error) is ImageRejected and error.status_code == 400
+
+
+def test_unaccepted_format_is_415():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32)).save(buffer, "GIF")
+
+    error = _rejection(buffer.getvalue())
+    assert isinstance(error, UnsupportedImageFormat) and error.status_code == 415
+
+
+def test_too_many_pixels_is_413_before_decoding():
+    error = _rejection(_png_header(4000, 3000), max_pixels=10_000_000)
+    assert isinstance(error, ImageDimensionsTooLarge) and error.status_code == 413
+    assert "4000x3000" in str(error)
+
+
+def test_decompression_bomb_is_413():
+    # Over Pillow's own limit, which Image.open enforces before we see the size
+    bomb = _png_header(20000, 20000)
+    assert Image.MAX_IMAGE_PIXELS * 2 < 20000 * 20000
+
+    error = _rejection(bomb)
+    assert isinstance(error, ImageDimensionsTooLarge) and error.status_code == 413
+
+
+def test_truncated_image_is_rejected():
+    data = _jpeg()
+    error = _rejection(data[:len(data) // 2])
+    assert type(error) is ImageRejected and "corrupt" in str(error)
+
+
+def test_upload_is_turned_upright_and_flattened_without_exif():
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to view
+    Image.new("RGBA", (400, 200), (0, 0, 0, 0)).save(buffer, "PNG", exif=exif)
+
+    image = preprocess_image(buffer.getvalue(), max_side=100)
+    with Image.open(io.BytesIO(image.data)) as output:
+        assert output.format == "JPEG" and output.size == (50, 100)
+        assert not output.getexif()
+        # Transparent pixels come out white
+        assert output.convert("L").getextrema()[0] > 240
+    assert (image.original_width, image.original_height) == (400, 200)
+
+
+def test_benchmark_modules_do_not_shadow_backend_modules():
+    # Benchmarks put their own directory first on sys.path, and spawned pool workers inherit it
+    backend = {path.stem for path in BACKEND_DIR.glob("*.py")}
+    benchmarks = {path.stem for path in BENCHMARKS_DIR.glob("*.py")}
+    assert not backend & benchmarks
+
+
+def test_spawn_pool_processes_uploads_with_benchmarks_on_path(monkeypatch):
+    # The same sys.path the benchmark scripts run with
+    monkeypatch.setattr(sys, "path", [str(BENCHMARKS_DIR), str(BACKEND_DIR)] + sys.path)
+
+    async def run():
+        preprocessor = ImagePreprocessor(workers=1, max_side=256)
+        await preprocessor.start()
+        try:
+            image = await preprocessor.process(_jpeg())
+            with pytest.raises(ImageRejected):
+                await preprocessor.process(b"not an image")
+            return image, preprocessor.stats()
+        finally:
+            await preprocessor.stop()
+
+    image, stats = asyncio.run(run())
+    assert image.content_type == "image/jpeg"
+    assert (image.width, image.height) == (256, 192)
+    assert (image.original_width, image.original_height) == (640, 480)
+    assert stats["mode"] == "process"
+    assert stats["processed"] == 1 and stats["rejected"] == 1 and stats["failed"] == 0
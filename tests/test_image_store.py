@@ -0,0 +1,121 @@
+import asyncio
+import base64
+import hashlib
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import image_store
+from image_store import GridFSImageStore, LocalImageStore, guess_image_content_type, migrate_embedded_images
+
+JPEG = b"\xff\xd8\xff\xe0" + b"leaf" * 100
+PNG = b"\x89PNG\r\n\x1a\n" + b"leaf" * 100
+
+
+class MemoryBucket:
+    """Stands in for motor's GridFS bucket, which needs a real MongoDB"""
+
+    def __init__(self, db, bucket_name):
+        self.files = {}
+
+    async def upload_from_stream(self, filename, data, metadata=None):
+        # Yield like a real upload, so concurrent puts interleave
+        await asyncio.sleep(0)
+        file_id = len(self.files) + 1
+        self.files[file_id] = data
+        return file_id
+
+    async def delete(self, file_id):
+        del self.files[file_id]
+
+    async def open_download_stream(self, file_id):
+        data = self.files[file_id]
+
+        class Stream:
+            async def read(self):
+                return data
+
+        return Stream()
+
+
+@pytest.mark.parametrize("data, content_type", [
+    (JPEG, "image/jpeg"),
+    (PNG, "image/png"),
+    (b"GIF89a...", "image/gif"),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"%PDF-1.7", "application/octet-stream"),
+])
+def test_content_type_is_sniffed_from_magic_bytes(data, content_type):
+    assert guess_image_content_type(data) == content_type
+
+
+def test_local_store_round_trip_and_dedup(tmp_path):
+    store = LocalImageStore(tmp_path)
+
+    async def run():
+        first = await store.put(JPEG)
+        again = await store.put(JPEG)
+        other = await store.put(PNG)
+        return first, again, other, await store.get(first), await store.get("0" * 64)
+
+    first, again, other, stored, missing = asyncio.run(run())
+    assert first == again == hashlib.sha256(JPEG).hexdigest()
+    assert other != first
+    assert stored == {"data": JPEG, "content_type": "image/jpeg"}
+    assert missing is None
+    # One file per distinct image, no temp files left behind
+    assert sorted(path.name for path in tmp_path.rglob("*") if path.is_file()) == sorted([first, other])
+
+
+def test_gridfs_store_round_trip_and_dedup(monkeypatch):
+    monkeypatch.setattr(image_store, "AsyncIOMotorGridFSBucket", MemoryBucket)
+    store = GridFSImageStore(AsyncMongoMockClient()["kisan_test"])
+
+    async def run():
+        sha256 = await store.put(JPEG)
+        assert await store.put(JPEG) == sha256
+        return sha256, await store.get(sha256), await store.index.find_one({"_id": sha256})
+
+    sha256, stored, entry = asyncio.run(run())
+    assert stored == {"data": JPEG, "content_type": "image/jpeg"}
+    assert entry["size"] == len(JPEG) and entry["content_type"] == "image/jpeg"
+    assert len(store.bucket.files) == 1
+
+
+def test_gridfs_concurrent_uploads_of_one_image_keep_one_copy(monkeypatch):
+    monkeypatch.setattr(image_store, "AsyncIOMotorGridFSBucket", MemoryBucket)
+    store = GridFSImageStore(AsyncMongoMockClient()["kisan_test"])
+
+    async def run():
+        return await asyncio.gather(*(store.put(PNG) for _ in range(3)))
+
+    hashes = asyncio.run(run())
+    assert len(set(hashes)) == 1
+    # Every upload passed the exists check; the losers removed their copies
+    assert len(store.bucket.files) == 1
+
+
+def test_migration_moves_embedded_images_into_the_store(tmp_path):
+    db = AsyncMongoMockClient()["kisan_test"]
+    store = LocalImageStore(tmp_path)
+
+    async def run():
+        await db.crop_analyses.insert_many([
+            {"_id": "a", "image_base64": base64.b64encode(JPEG).decode()},
+            {"_id": "b", "image_base64": base64.b64encode(JPEG).decode()},
+            {"_id": "c", "image_base64": "not base64!"},
+            {"_id": "d", "image_sha256": "already migrated"},
+        ])
+        migrated = await migrate_embedded_images(db, store, batch_size=2)
+        docs = {doc["_id"]: doc for doc in await db.crop_analyses.find().to_list(length=None)}
+        return migrated, docs
+
+    migrated, docs = asyncio.run(run())
+    assert migrated == 2
+    sha256 = hashlib.sha256(JPEG).hexdigest()
+    for key in ("a", "b"):
+        assert "image_base64" not in docs[key]
+        assert docs[key]["image_sha256"] == sha256 and docs[key]["image_content_type"] == "image/jpeg"
+    # Undecodable payloads stay put and are flagged, so later passes skip them
+    assert docs["c"]["image_base64"] == "not base64!" and "image_migration_error" in docs["c"]
+    assert asyncio.run(store.get(sha256))["data"] == JPEG
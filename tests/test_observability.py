@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+import observability
+from observability import configure_trace_export, span, traced
+
+
+@pytest.fixture
+def exported_spans(tmp_path):
+    """Exports spans to a temp file; call the returned function to stop exporting and read them"""
+    path = tmp_path / "spans.jsonl"
+    configure_trace_export(str(path))
+
+    def read():
+        configure_trace_export(None)
+        return {record["name"]: record for record in map(json.loads, path.read_text().splitlines())}
+
+    yield read
+    configure_trace_export(None)
+
+
+@traced("provider", "child")
+async def child_call():
+    return observability._current_span.get().name
+
+
+def _stream(fail_after=None):
+    @traced("provider", "stream")
+    async def stream():
+        for i in range(3):
+            if i == fail_after:
+                raise RuntimeError("provider dropped the stream")
+            yield i, observability._current_span.get().name, await child_call()
+
+    return stream
+
+
+def test_stream_span_is_current_only_inside_the_generator():
+    async def run():
+        seen = []
+        with span("http", "request"):
+            async for i, inside, child in _stream()():
+                seen.append((i, inside, child, observability._current_span.get().name))
+        return seen
+
+    # The generator (and calls it makes) see the stream span; the consumer keeps its own
+    assert asyncio.run(run()) == [(i, "stream", "child", "request") for i in range(3)]
+
+
+def test_stream_records_one_span_parented_to_the_caller(exported_spans):
+    async def run():
+        children = []
+        with span("http", "request"):
+            async for _, _, child in _stream()():
+                children.append(child)
+        return children
+
+    assert asyncio.run(run()) == ["child"] * 3
+    spans = exported_spans()
+    assert spans["stream"]["status"] == "ok"
+    assert spans["stream"]["parent_id"] == spans["request"]["span_id"]
+    assert spans["child"]["parent_id"] == spans["stream"]["span_id"]
+
+
+def test_stream_closed_from_another_context(exported_spans):
+    async def run():
+        stream = _stream()()
+        # First item pulled in one task, the stream closed from another (e.g. a disconnect handler)
+        first = await asyncio.create_task(stream.__anext__())
+        await stream.aclose()
+        return first, observability._current_span.get()
+
+    first, current = asyncio.run(run())
+    assert first[0] == 0 and current is None
+    assert exported_spans()["stream"]["status"] == "ok"
+
+
+def test_stream_error_is_recorded_and_raised(exported_spans):
+    async def run():
+        items = []
+        with pytest.raises(RuntimeError, match="dropped"):
+            async for item in _stream(fail_after=1)():
+                items.append(item[0])
+        return items
+
+    assert asyncio.run(run()) == [0]
+    stream = exported_spans()["stream"]
+    assert stream["status"] == "error" and "dropped" in stream["error"]
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import OperationFailure
+
+import price_history
+from price_history import (
+    PRICE_HISTORY_COLLECTION, PriceHistoryUnavailable, ensure_price_history_collection, iter_price_documents,
+    load_price_file, parse_dates, query_price_history
+)
+
+CSV = """State,District Name,Market Name,Commodity,Variety,Arrival_Date,Min_x0020_Price,Max_x0020_Price,Modal_x0020_Price
+Punjab,Ludhiana,Khanna,Wheat,Dara,05/03/2024,2200,2400,2300
+Punjab,Ludhiana,Khanna,Wheat,Dara,2024-03-06,,2450,2350
+Punjab,Ludhiana,Khanna,Wheat,Dara,31/03/2024,2250,2500,
+Punjab,Ludhiana,Khanna,Wheat,Dara,not a date,2250,2500,2400
+"""
+
+
+def test_parse_dates_reads_iso_as_iso_and_the_rest_day_first():
+    dates = parse_dates(pd.Series(["2024-03-05", "05/03/2024", "05-Mar-2024", "2024-03-05T10:00:00+05:30", "", "x"]))
+    assert dates.tolist()[:4] == [
+        pd.Timestamp("2024-03-05"), pd.Timestamp("2024-03-05"), pd.Timestamp("2024-03-05"),
+        pd.Timestamp("2024-03-05 04:30")
+    ]
+    assert dates.isna().tolist()[4:] == [True, True]
+
+
+def test_iter_price_documents_maps_columns_and_drops_unusable_rows(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text(CSV)
+
+    chunks = list(iter_price_documents(path, chunk_size=2))
+    documents = [document for chunk in chunks for document in chunk]
+    assert len(chunks) == 2
+    # The row without a modal price and the row without a date are dropped
+    assert [document["date"] for document in documents] == [datetime(2024, 3, 5), datetime(2024, 3, 6)]
+    assert documents[0] == {
+        "date": datetime(2024, 3, 5),
+        "meta": {
+            "state": "Punjab", "district": "Ludhiana", "market": "Khanna", "commodity": "Wheat", "variety": "Dara"
+        },
+        "modal_price": 2300.0,
+        "min_price": 2200.0,
+        "max_price": 2400.0,
+    }
+    assert "min_price" not in documents[1]
+
+
+def test_load_price_file_inserts_every_chunk(tmp_path, monkeypatch):
+    path = tmp_path / "prices.csv"
+    path.write_text(CSV)
+    db = AsyncMongoMockClient()["kisan_test"]
+
+    # mongomock has no time-series collections
+    async def ensure_collection(database):
+        pass
+
+    monkeypatch.setattr(price_history, "ensure_price_history_collection", ensure_collection)
+    summary = asyncio.run(load_price_file(db, path, chunk_size=2))
+    assert summary["inserted"] == 2 and summary["failed"] == 0
+
+    async def stored():
+        return await db[PRICE_HISTORY_COLLECTION].count_documents({"meta.commodity": "Wheat"})
+
+    assert asyncio.run(stored()) == 2
+
+
+class FakeAggregation:
+    """Stands in for a $dateTrunc aggregation (which mongomock lacks): applies the pipeline's $sort and $limit"""
+
+    def __init__(self, buckets, pipeline):
+        self.buckets = buckets
+        self.pipeline = pipeline
+
+    async def to_list(self, length):
+        buckets = list(self.buckets)
+        for stage in self.pipeline:
+            if "$sort" in stage:
+                buckets.sort(key=lambda bucket: bucket["_id"], reverse=stage["$sort"]["_id"] < 0)
+            elif "$limit" in stage:
+                buckets = buckets[:stage["$limit"]]
+        return buckets[:length]
+
+
+class FakeDatabase:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.pipelines = []
+
+    def __getitem__(self, name):
+        return self
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeAggregation(self.buckets, pipeline)
+
+
+def _daily_buckets(days):
+    return [
+        {
+            "_id": datetime(2024, 3, day), "avg_modal_price": 2000 + day,
+            "min_price": 1900, "max_price": 2100, "samples": 1
+        }
+        for day in range(1, days + 1)
+    ]
+
+
+def test_query_keeps_newest_buckets_when_truncated():
+    db = FakeDatabase(_daily_buckets(10))
+    start, end = datetime(2024, 3, 1), datetime(2024, 4, 1)
+    history = asyncio.run(query_price_history(db, "Wheat", start, end, "day", state="Punjab", max_points=3))
+    assert history["truncated"]
+    assert [bucket["period_start"] for bucket in history["buckets"]] == [
+        "2024-03-08T00:00:00", "2024-03-09T00:00:00", "2024-03-10T00:00:00"
+    ]
+    match = db.pipelines[0][0]["$match"]
+    assert match["meta.commodity"] == "Wheat" and match["meta.state"] == "Punjab"
+
+
+def test_query_within_limit_is_not_truncated():
+    db = FakeDatabase(_daily_buckets(3))
+    history = asyncio.run(
+        query_price_history(db, "Wheat", datetime(2024, 3, 1), datetime(2024, 4, 1), "week", max_points=3)
+    )
+    assert not history["truncated"]
+    assert [bucket["avg_modal_price"] for bucket in history["buckets"]] == [2001, 2002, 2003]
+    group = db.pipelines[0][1]["$group"]
+    assert group["_id"]["$dateTrunc"] == {"date": "$date", "unit": "week", "startOfWeek": "monday"}
+
+
+class PreTimeSeriesDatabase:
+    """A MongoDB 4.x server: creating a time-series collection fails"""
+
+    async def list_collection_names(self):
+        return []
+
+    async def create_collection(self, name, **options):
+        raise OperationFailure("BSON field 'create.timeseries' is an unknown field.", code=40415)
+
+
+def test_older_mongodb_raises_price_history_unavailable():
+    with pytest.raises(PriceHistoryUnavailable, match="5.0"):
+        asyncio.run(ensure_price_history_collection(PreTimeSeriesDatabase()))
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pytest
+
+from price_table import PriceTable
+
+STATE_DATA = {
+    "Punjab": [
+        {"name": "Wheat", "name_hi": "गेहूं", "name_local": "ਕਣਕ", "msp": 2275, "mandi": 2500},
+        {"name": "Rice", "name_hi": "चावल", "name_local": "ਚੌਲ", "msp": 2183, "mandi": 2100},
+    ],
+    "Bihar": [
+        {"name": "Rice", "name_hi": "चावल", "name_local": "चाउर", "msp": 2183, "mandi": 2400.5},
+        {"name": "Maize", "name_hi": "मक्का", "msp": 2090, "mandi": 2000},
+    ],
+    "Kerala": [
+        # No MSP for this crop here
+        {"name": "Rice", "name_hi": "चावल", "msp": 0, "mandi": 3000},
+    ],
+}
+
+
+@pytest.fixture
+def table():
+    return PriceTable.from_state_data(STATE_DATA)
+
+
+def test_state_data_round_trips(table):
+    assert len(table) == 5
+    assert table.state_data() == {
+        state: [{"name_local": crop["name"], **crop} for crop in crops] for state, crops in STATE_DATA.items()
+    }
+    assert table.has_state("Bihar") and not table.has_state("Atlantis")
+    assert table.state_crops("Atlantis") is None
+    assert isinstance(table.state_crops("Punjab")[0]["msp"], int)
+
+
+def test_columns_round_trip(table):
+    arrays, names = table.columns()
+    copy = PriceTable.from_columns(arrays, names)
+
+    assert copy.state_data() == table.state_data()
+    assert copy.top_spreads(5) == table.top_spreads(5)
+
+
+def test_crop_across_states_is_ordered_by_margin(table):
+    rows = table.crop_across_states(" rice ")
+
+    assert [row["state"] for row in rows] == ["Bihar", "Punjab", "Kerala"]
+    assert rows[0]["profit_margin"] == round((2400.5 - 2183) / 2183 * 100, 2)
+    assert rows[1]["spread"] == -83.0
+    # No MSP, no margin
+    assert rows[2]["profit_margin"] is None and rows[2]["spread"] == 3000.0
+    assert table.crop_across_states("Cotton") is None
+
+
+def test_top_spreads_by_margin_and_by_spread(table):
+    by_margin = table.top_spreads(3)
+    assert [(row["state"], row["crop_name"]) for row in by_margin] == [
+        ("Bihar", "Rice"), ("Punjab", "Wheat"), ("Punjab", "Rice")
+    ]
+
+    by_spread = table.top_spreads(2, by="spread")
+    assert [(row["state"], row["spread"]) for row in by_spread] == [("Kerala", 3000.0), ("Punjab", 225.0)]
+
+    assert len(table.top_spreads(100)) == 5
+    assert [row["state"] for row in table.top_spreads(10, crop="rice")] == ["Bihar", "Punjab", "Kerala"]
+    assert table.top_spreads(3, crop="Cotton") is None
+
+
+def test_national_aggregates(table):
+    aggregates = {row["crop_name"]: row for row in table.national_aggregates()}
+
+    rice = aggregates["Rice"]
+    assert rice["states"] == 3
+    assert rice["avg_msp_price"] == round((2183 + 2183 + 0) / 3, 2)
+    assert rice["min_mandi_price"] == 2100.0 and rice["max_mandi_price"] == 3000.0
+    # Averaged over the states with an MSP; Kerala's missing margin doesn't count as 0%
+    margins = [(2100 - 2183) / 2183 * 100, (2400.5 - 2183) / 2183 * 100]
+    assert rice["avg_profit_margin"] == round(sum(margins) / 2, 2)
+    assert rice["best_state"] == "Bihar"
+    assert aggregates["Wheat"]["best_state"] == "Punjab"
+
+
+def test_crop_without_any_msp_has_no_margin():
+    table = PriceTable.from_state_data({"Kerala": [{"name": "Pepper", "msp": 0, "mandi": 50000}]})
+
+    [aggregate] = table.national_aggregates()
+    assert aggregate["avg_profit_margin"] is None
+    assert aggregate["best_state"] == "Kerala"
+    assert math.isnan(table.margin[0]) and np.isfinite(table.spread[0])
+
+
+def test_empty_table():
+    table = PriceTable.from_state_data({})
+
+    assert table.national_aggregates() == [] and table.top_spreads(5) == []
@@ -0,0 +1,241 @@
+import asyncio
+import time
+
+import pytest
+
+from provider_gateway import (
+    CallerInput,
+    FaultSpec,
+    ProviderClient,
+    ProviderError,
+    ProviderPolicy,
+    ProviderTimeout,
+    ProviderUnavailable,
+)
+
+
+class FakeProvider:
+    """Answers after ``delay`` seconds, or fails while ``failing`` is set; counts its invocations"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.failing = False
+        self.calls = 0
+
+    async def __call__(self, value):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.failing:
+            raise RuntimeError("provider down")
+        return value
+
+
+def _client(**policy) -> ProviderClient:
+    return ProviderClient("fake", ProviderPolicy(**{"hedge_percentile": None, **policy}))
+
+
+def test_call_past_deadline_times_out_and_counts_against_breaker():
+    client = _client(timeout=0.05)
+
+    async def run():
+        with pytest.raises(ProviderTimeout):
+            await client.call(FakeProvider(delay=1.0), "late")
+
+    asyncio.run(run())
+    assert client.counters["timeouts"] == 1
+    assert client.breaker.consecutive_failures == 1
+    assert client.in_flight == 0
+
+
+def test_slow_call_is_hedged_and_the_hedge_wins():
+    client = _client(timeout=1.0, hedge_percentile=50, hedge_min_samples=2, hedge_min_delay=0.02)
+    attempts = []
+
+    async def first_attempt_stalls(value):
+        attempts.append(value)
+        if len(attempts) == 3:
+            await asyncio.sleep(5)
+        return value
+
+    async def run():
+        # Two fast calls establish the latency percentile the hedge delay is taken from
+        for _ in range(2):
+            await client.call(first_attempt_stalls, "warmup")
+        started = time.perf_counter()
+        result = await client.call(first_attempt_stalls, "answer")
+        return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == "answer"
+    assert elapsed < 0.5
+    assert len(attempts) == 4
+    assert client.counters["hedges"] == 1
+    assert client.counters["hedge_wins"] == 1
+    assert client.in_flight == 0
+
+
+def test_hedging_is_opt_in(monkeypatch):
+    assert ProviderPolicy().hedge_percentile is None
+    assert ProviderPolicy.from_env("gemini_pro").hedge_percentile is None
+
+    monkeypatch.setenv("PROVIDER_GEMINI_PRO_HEDGE_PERCENTILE", "95")
+    assert ProviderPolicy.from_env("gemini_pro").hedge_percentile == 95.0
+    monkeypatch.setenv("PROVIDER_GEMINI_PRO_HEDGE_PERCENTILE", "off")
+    assert ProviderPolicy.from_env("gemini_pro", hedge_percentile=99).hedge_percentile is None
+
+
+def test_unhedged_slow_call_is_sent_once():
+    client = ProviderClient("fake", ProviderPolicy(timeout=1.0, hedge_min_samples=2, hedge_min_delay=0.01))
+    provider = FakeProvider()
+
+    async def run():
+        for _ in range(2):
+            await client.call(provider, "warmup")
+        provider.delay = 0.1
+        return await client.call(provider, "answer")
+
+    assert asyncio.run(run()) == "answer"
+    assert provider.calls == 3
+    assert client.counters["hedges"] == 0
+
+
+def test_breaker_opens_short_circuits_and_closes_after_successful_probe():
+    client = _client(failure_threshold=2, reset_timeout=0.1)
+    provider = FakeProvider()
+    provider.failing = True
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ProviderError):
+                await client.call(provider, "x")
+        assert client.breaker.state == "open"
+
+        # Open: fails fast without reaching the provider
+        with pytest.raises(ProviderUnavailable):
+            await client.call(provider, "x")
+        assert provider.calls == 2
+
+        await asyncio.sleep(0.15)
+        provider.failing = False
+        provider.delay = 0.05
+        # Half-open: one probe goes through, concurrent calls are still refused
+        probe = asyncio.create_task(client.call(provider, "probe"))
+        await asyncio.sleep(0)
+        assert client.breaker.state == "half_open"
+        with pytest.raises(ProviderUnavailable):
+            await client.call(provider, "x")
+        assert await probe == "probe"
+        assert client.breaker.state == "closed"
+        assert await client.call(provider, "after") == "after"
+
+    asyncio.run(run())
+    assert client.breaker.times_opened == 1
+    assert client.counters["short_circuited"] == 2
+
+
+def test_failed_probe_reopens_breaker():
+    client = _client(failure_threshold=1, reset_timeout=0.05)
+    provider = FakeProvider()
+    provider.failing = True
+
+    async def run():
+        with pytest.raises(ProviderError):
+            await client.call(provider, "x")
+        await asyncio.sleep(0.08)
+        with pytest.raises(ProviderError):
+            await client.call(provider, "probe")
+        assert client.breaker.state == "open"
+        with pytest.raises(ProviderUnavailable):
+            await client.call(provider, "x")
+
+    asyncio.run(run())
+    assert client.breaker.times_opened == 2
+
+
+def test_injected_faults_surface_as_provider_errors():
+    errors = ProviderClient("fake", ProviderPolicy(hedge_percentile=None), FaultSpec(error_rate=1.0))
+    latency = ProviderClient(
+        "fake", ProviderPolicy(timeout=0.05, hedge_percentile=None), FaultSpec(latency=1.0, latency_rate=1.0)
+    )
+
+    async def run():
+        with pytest.raises(ProviderError, match="Injected fault"):
+            await errors.call(FakeProvider(), "x")
+        with pytest.raises(ProviderTimeout):
+            await latency.call(FakeProvider(), "x")
+
+    asyncio.run(run())
+
+
+async def _recognize(chunks):
+    """Fake streaming recognizer: a partial per chunk, then a final"""
+    heard = []
+    async for chunk in chunks:
+        heard.append(chunk)
+        yield {"is_final": False, "transcript": " ".join(heard)}
+    yield {"is_final": True, "transcript": " ".join(heard)}
+
+
+async def _slow_client(chunks, pause):
+    for chunk in chunks:
+        await asyncio.sleep(pause)
+        yield chunk
+
+
+def test_stream_waiting_on_slow_client_is_not_a_provider_stall():
+    client = _client(stream_timeout=0.05, max_concurrency=1, failure_threshold=1)
+    other = FakeProvider()
+
+    async def run():
+        results = []
+        async for result in client.stream(_recognize, CallerInput(_slow_client(["tell", "me"], 0.15))):
+            results.append(result)
+            # The open stream holds no slot while the client is silent, so other calls aren't starved
+            assert await client.call(other, "post") == "post"
+        return results
+
+    results = asyncio.run(run())
+    assert [r["transcript"] for r in results] == ["tell", "tell me", "tell me"]
+    assert results[-1]["is_final"]
+    assert client.counters["timeouts"] == 0
+    assert client.breaker.state == "closed"
+    assert client.in_flight == 0
+
+
+def test_stream_provider_stall_times_out_and_opens_breaker():
+    client = _client(stream_timeout=0.05, failure_threshold=1)
+
+    async def stalls_after_first_chunk(chunks):
+        async for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(1)
+
+    async def run():
+        received = []
+        with pytest.raises(ProviderTimeout):
+            async for item in client.stream(stalls_after_first_chunk, CallerInput(_slow_client(["a", "b"], 0))):
+                received.append(item)
+        return received
+
+    assert asyncio.run(run()) == ["a"]
+    assert client.counters["timeouts"] == 1
+    assert client.breaker.state == "open"
+    assert client.in_flight == 0
+
+
+def test_stream_caller_input_error_does_not_count_against_provider():
+    client = _client(failure_threshold=1)
+
+    async def broken_client():
+        yield "a"
+        raise ConnectionResetError("client went away")
+
+    async def run():
+        with pytest.raises(ConnectionResetError):
+            async for _ in client.stream(_recognize, CallerInput(broken_client())):
+                pass
+
+    asyncio.run(run())
+    assert client.counters["errors"] == 0
+    assert client.breaker.state == "closed"
+    assert client.in_flight == 0
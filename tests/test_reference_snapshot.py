@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from reference_snapshot import ReferenceStore, Snapshot, SnapshotError
+
+STATE_DATA = {
+    "Punjab": [
+        {"name": "Wheat", "name_hi": "गेहूं", "name_local": "ਕਣਕ", "msp": 2275, "mandi": 2350},
+        {"name": "Rice", "name_hi": "चावल", "name_local": "ਚੌਲ", "msp": 2183, "mandi": 2100},
+    ],
+    "Bihar": [
+        {"name": "Wheat", "name_hi": "गेहूं", "name_local": "गहूम", "msp": 2275, "mandi": 2200},
+    ],
+}
+SCHEMES = [{"name": "PM-KISAN", "description": "Income support"}]
+
+
+def _set_wheat(price):
+    def mutate(state_data, schemes):
+        for crop in state_data["Punjab"]:
+            if crop["name"] == "Wheat":
+                crop["mandi"] = price
+    return mutate
+
+
+def _wheat(reference):
+    return next(crop for crop in reference.state_crops("Punjab") if crop["name"] == "Wheat")
+
+
+def test_second_store_picks_up_a_version_published_by_the_first(tmp_path):
+    path = tmp_path / "reference.snapshot"
+    publisher = ReferenceStore(path)
+    reader = ReferenceStore(path, check_interval=0)
+    assert publisher.ensure(STATE_DATA, SCHEMES).version == 1
+    # Same seed: the second worker maps the published snapshot instead of publishing again
+    assert reader.ensure(STATE_DATA, SCHEMES).version == 1
+    changes = []
+    reader.on_change(lambda old, new: changes.append((old.version, new.version)))
+
+    version = publisher.publish(_set_wheat(2500))
+
+    assert version == 2
+    # publish alone doesn't switch the publishing process over
+    assert publisher.stats()["version"] == 1
+    reference = reader.current()
+    assert reference.version == 2
+    assert _wheat(reference)["mandi"] == 2500
+    assert reference.schemes == SCHEMES
+    assert changes == [(1, 2)]
+
+
+def test_publish_from_a_thread_and_refresh_on_the_loop(tmp_path):
+    path = tmp_path / "reference.snapshot"
+    store = ReferenceStore(path, check_interval=60)
+    store.ensure(STATE_DATA, SCHEMES)
+    other = ReferenceStore(path, check_interval=60)
+    other.ensure(STATE_DATA, SCHEMES)
+
+    async def run():
+        # Both publishers re-read under the lock, so neither update is lost
+        await asyncio.gather(
+            asyncio.to_thread(store.publish, _set_wheat(2400)),
+            asyncio.to_thread(other.publish, lambda state_data, schemes: state_data.pop("Bihar")),
+        )
+        return store.refresh(force=True)
+
+    assert asyncio.run(run())
+    reference = store.current()
+    assert reference.version == 3
+    assert _wheat(reference)["mandi"] == 2400
+    assert not reference.has_state("Bihar")
+    # Checked at most every check_interval: the other store is still on its version until forced
+    assert other.current().version == 1
+    assert other.refresh(force=True) and other.current().version == 3
+
+
+def test_changed_seed_replaces_published_updates(tmp_path):
+    path = tmp_path / "reference.snapshot"
+    store = ReferenceStore(path)
+    store.ensure(STATE_DATA, SCHEMES)
+    store.update(_set_wheat(2500))
+
+    # A restart with the same seed keeps the update, a new seed replaces it
+    assert _wheat(ReferenceStore(path).ensure(STATE_DATA, SCHEMES))["mandi"] == 2500
+    reseeded = ReferenceStore(path).ensure({"Punjab": STATE_DATA["Punjab"]}, SCHEMES)
+    assert reseeded.version == 3
+    assert _wheat(reseeded)["mandi"] == 2350
+    assert reseeded.states == ["Punjab"]
+
+
+def test_unreadable_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "reference.snapshot"
+    path.write_bytes(b"not a snapshot" * 10)
+    with pytest.raises(SnapshotError):
+        Snapshot(path)
@@ -0,0 +1,127 @@
+import asyncio
+
+import orjson
+import pytest
+
+from response_cache import VersionedResponseCache
+
+
+class CountingBuilder:
+    """Builds ``{"version": v, "build": n}``, optionally waiting on an event first"""
+
+    def __init__(self, gate: asyncio.Event = None, payload: dict = None):
+        self.gate = gate
+        self.payload = payload or {}
+        self.calls = 0
+
+    async def __call__(self, version):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return {"version": version, "build": self.calls, **self.payload}
+
+
+def _payload(body):
+    return orjson.loads(body.body)
+
+
+def test_body_is_built_once_per_version_and_key():
+    cache = VersionedResponseCache("prices")
+    builder = CountingBuilder()
+
+    async def run():
+        first = await cache.get_or_build(("Punjab", "en"), builder)
+        again = await cache.get_or_build(("Punjab", "en"), builder)
+        other = await cache.get_or_build(("Bihar", "en"), builder)
+        return first, again, other
+
+    first, again, other = asyncio.run(run())
+    assert again is first
+    assert _payload(first) == {"version": 1, "build": 1}
+    assert _payload(other) == {"version": 1, "build": 2}
+    assert first.etag != other.etag
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2 and cache.stats()["entries"] == 2
+
+
+def test_bump_version_drops_every_body_and_changes_the_etag():
+    cache = VersionedResponseCache("prices")
+    builder = CountingBuilder()
+
+    async def run():
+        before = await cache.get_or_build("Punjab", builder)
+        assert cache.bump_version() == 2
+        assert cache.peek("Punjab") is None
+        after = await cache.get_or_build("Punjab", builder)
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert _payload(after) == {"version": 2, "build": 2}
+    assert after.etag != before.etag
+    assert after.last_modified >= before.last_modified
+    assert cache.stats()["invalidations"] == 1 and cache.stats()["version"] == 2
+
+
+def test_concurrent_requests_share_one_build():
+    cache = VersionedResponseCache("prices")
+
+    async def run():
+        builder = CountingBuilder(gate=asyncio.Event())
+        waiters = [asyncio.create_task(cache.get_or_build("Punjab", builder)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        builder.gate.set()
+        return builder, await asyncio.gather(*waiters)
+
+    builder, bodies = asyncio.run(run())
+    assert builder.calls == 1
+    assert all(body is bodies[0] for body in bodies)
+
+
+def test_body_built_across_a_version_bump_is_not_cached():
+    cache = VersionedResponseCache("prices")
+
+    async def run():
+        builder = CountingBuilder(gate=asyncio.Event())
+        stale = asyncio.create_task(cache.get_or_build("Punjab", builder))
+        await asyncio.sleep(0.01)
+        cache.bump_version()
+        builder.gate.set()
+        # The in-flight request still gets its answer, but it isn't kept for the new version
+        assert _payload(await stale)["version"] == 1
+        assert cache.peek("Punjab") is None
+        return await cache.get_or_build("Punjab", builder)
+
+    fresh = asyncio.run(run())
+    assert _payload(fresh) == {"version": 2, "build": 2}
+
+
+def test_degraded_payload_is_served_but_not_cached():
+    cache = VersionedResponseCache("prices")
+    builder = CountingBuilder(payload={"degraded": True})
+
+    async def run():
+        await cache.get_or_build("Punjab", builder)
+        return await cache.get_or_build("Punjab", builder)
+
+    body = asyncio.run(run())
+    assert _payload(body)["build"] == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_failed_build_reaches_waiters_and_is_retried():
+    cache = VersionedResponseCache("prices")
+    attempts = []
+
+    async def flaky(version):
+        attempts.append(version)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        return {"ok": True}
+
+    async def run():
+        with pytest.raises(RuntimeError, match="database unavailable"):
+            await cache.get_or_build("Punjab", flaky)
+        return await cache.get_or_build("Punjab", flaky)
+
+    body = asyncio.run(run())
+    assert _payload(body) == {"ok": True}
+    assert len(attempts) == 2
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+import singleflight
+from singleflight import SingleFlightCache, normalize_prompt
+
+
+class GatedLoader:
+    """Returns ``value`` (or raises ``error``) once ``gate`` is set, tracking concurrency"""
+
+    def __init__(self, value="answer", error: Exception = None):
+        self.value = value
+        self.error = error
+        self.gate = asyncio.Event()
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await self.gate.wait()
+            if self.error is not None:
+                raise self.error
+            return self.value
+        finally:
+            self.running -= 1
+
+
+def test_concurrent_identical_calls_share_one_load():
+    cache = SingleFlightCache("advice")
+
+    async def run():
+        loader = GatedLoader()
+        callers = [asyncio.create_task(cache.get("key", loader)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        loader.gate.set()
+        results = await asyncio.gather(*callers)
+        # Now cached: a later call doesn't load again
+        assert await cache.get("key", loader) == "answer"
+        return loader, results
+
+    loader, results = asyncio.run(run())
+    assert results == ["answer"] * 5
+    assert loader.calls == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 4 and stats["hits"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    cache = SingleFlightCache("advice")
+
+    async def run():
+        failing = GatedLoader(error=RuntimeError("quota exceeded"))
+        callers = [asyncio.create_task(cache.get("key", failing)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        failing.gate.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert cache.peek("key") is None
+
+        retry = GatedLoader(value="recovered")
+        retry.gate.set()
+        return failing, results, await cache.get("key", retry)
+
+    failing, results, recovered = asyncio.run(run())
+    assert failing.calls == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "quota exceeded" for result in results)
+    assert recovered == "recovered"
+    assert cache.stats()["errors"] == 1
+
+
+def test_one_caller_cancelling_does_not_cancel_the_shared_load():
+    cache = SingleFlightCache("advice")
+
+    async def run():
+        loader = GatedLoader()
+        leaving = asyncio.create_task(cache.get("key", loader))
+        staying = asyncio.create_task(cache.get("key", loader))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        loader.gate.set()
+        return await staying, leaving
+
+    result, leaving = asyncio.run(run())
+    assert result == "answer"
+    assert leaving.cancelled()
+
+
+def test_loads_for_different_keys_are_capped_by_max_concurrency():
+    cache = SingleFlightCache("advice", max_concurrency=2)
+
+    async def run():
+        loader = GatedLoader()
+        callers = [asyncio.create_task(cache.get(key, loader)) for key in range(5)]
+        await asyncio.sleep(0.01)
+        assert loader.running == 2
+        loader.gate.set()
+        await asyncio.gather(*callers)
+        return loader
+
+    loader = asyncio.run(run())
+    assert loader.calls == 5 and loader.peak == 2
+
+
+def test_expired_entries_reload_but_stay_available_as_stale(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(singleflight.time, "monotonic", lambda: now[0])
+    cache = SingleFlightCache("advice", ttl_seconds=60)
+    cache.put("key", "old")
+
+    now[0] += 61
+    assert cache.peek("key") is None
+    assert cache.peek("key", allow_stale=True) == "old"
+
+    loader = GatedLoader(value="new")
+    loader.gate.set()
+    assert asyncio.run(cache.get("key", loader)) == "new"
+    assert loader.calls == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SingleFlightCache("advice", max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.peek("a") == 1
+    cache.put("c", 3)
+
+    assert cache.peek("b") is None
+    assert cache.peek("a") == 1 and cache.peek("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize("prompt", ["What is MSP?", "  what   is\nmsp? "])
+def test_normalize_prompt_ignores_case_and_whitespace(prompt):
+    assert normalize_prompt(prompt) == "what is msp?"
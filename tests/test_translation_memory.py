@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from translation_memory import TranslationMemory
+
+
+class RecordingProvider:
+    """Uppercases strings, remembering each batch it was asked for"""
+
+    def __init__(self, short: bool = False):
+        self.short = short
+        self.calls = []
+
+    async def __call__(self, texts, target_language):
+        self.calls.append(list(texts))
+        translations = [f"{target_language}:{text.upper()}" for text in texts]
+        return translations[:-1] if self.short else translations
+
+
+def _collection():
+    return AsyncMongoMockClient()["kisan_test"]["translation_memory"]
+
+
+def test_duplicates_are_translated_once_and_returned_in_order():
+    memory = TranslationMemory()
+    provider = RecordingProvider()
+
+    result = asyncio.run(memory.translate_many(["wheat", "rice", "wheat", "maize", "rice"], "hi", provider))
+
+    assert result == ["hi:WHEAT", "hi:RICE", "hi:WHEAT", "hi:MAIZE", "hi:RICE"]
+    assert provider.calls == [["wheat", "rice", "maize"]]
+    assert memory.counters["lookups"] == 3 and memory.counters["provider_strings"] == 3
+
+
+def test_lru_hits_skip_the_provider_and_misses_go_in_one_call():
+    memory = TranslationMemory()
+    provider = RecordingProvider()
+
+    async def run():
+        await memory.translate_many(["wheat", "rice"], "hi", provider)
+        return await memory.translate_many(["rice", "cotton", "wheat", "sugarcane"], "hi", provider)
+
+    result = asyncio.run(run())
+    assert result == ["hi:RICE", "hi:COTTON", "hi:WHEAT", "hi:SUGARCANE"]
+    assert provider.calls == [["wheat", "rice"], ["cotton", "sugarcane"]]
+    assert memory.counters["lru_hits"] == 2
+    # Languages are remembered separately
+    assert asyncio.run(memory.translate("wheat", "ta", provider)) == "ta:WHEAT"
+
+
+def test_stored_translations_are_shared_through_mongodb():
+    collection = _collection()
+    provider = RecordingProvider()
+
+    async def run():
+        await TranslationMemory(collection).translate_many(["wheat", "rice"], "hi", provider)
+        # Another worker, or this one after a restart
+        other = TranslationMemory(collection)
+        return other, await other.translate_many(["rice", "wheat"], "hi", provider)
+
+    other, result = asyncio.run(run())
+    assert result == ["hi:RICE", "hi:WHEAT"]
+    assert len(provider.calls) == 1
+    assert other.counters["db_hits"] == 2 and other.counters["provider_calls"] == 0
+
+
+def test_entries_from_another_provider_are_misses_and_replaced():
+    collection = _collection()
+
+    async def run():
+        await TranslationMemory(collection, provider="mock").translate("wheat", "hi", RecordingProvider())
+        real = RecordingProvider()
+        memory = TranslationMemory(collection, provider="google")
+        translation = await memory.translate("wheat", "hi", real)
+        return real, translation, await collection.find_one({})
+
+    real, translation, stored = asyncio.run(run())
+    assert real.calls == [["wheat"]]
+    assert stored["provider"] == "google" and stored["translation"] == translation
+    assert stored["updated_at"] is not None
+
+
+def test_short_provider_result_fails_without_storing_anything():
+    collection = _collection()
+    memory = TranslationMemory(collection)
+
+    async def run():
+        with pytest.raises(RuntimeError, match="1 translations for 2 strings"):
+            await memory.translate_many(["wheat", "rice"], "hi", RecordingProvider(short=True))
+        return await collection.count_documents({})
+
+    assert asyncio.run(run()) == 0
+    assert memory.stats()["entries"] == 0
+
+
+def test_stored_translations_expire():
+    collection = _collection()
+    memory = TranslationMemory(collection, ttl_seconds=3600)
+
+    async def run():
+        await memory.ensure_indexes()
+        return await collection.index_information()
+
+    indexes = asyncio.run(run())
+    assert any(
+        index["key"] == [("updated_at", 1)] and index.get("expireAfterSeconds") == 3600 for index in indexes.values()
+    )
@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from trends import FAST_SPAN, SLOW_SPAN, TrendEngine, TrendStore
+
+
+def _daily_prices(state, crop, prices, start=datetime(2024, 1, 1)):
+    return pd.DataFrame({
+        "state": state,
+        "crop": crop,
+        "date": [start + timedelta(days=i) for i in range(len(prices))],
+        "price": prices,
+    })
+
+
+def _wavy_prices(count, drift=0.0):
+    # Deterministic day-to-day swings of a few percent around a drifting level
+    prices = [2000.0]
+    for i in range(1, count):
+        prices.append(prices[-1] * (1 + drift + 0.03 * (-1) ** i * (1 + i % 3) / 3))
+    return prices
+
+
+def test_rebuild_matches_incremental_updates():
+    punjab, bihar = _wavy_prices(60, drift=0.004), _wavy_prices(45, drift=-0.003)
+    frame = pd.concat([
+        _daily_prices(" Punjab", "Wheat ", punjab),
+        _daily_prices("Bihar", "Rice", bihar),
+    ]).sample(frac=1, random_state=7)
+    rebuilt = TrendEngine()
+    assert rebuilt.rebuild(frame) == 2
+
+    incremental = TrendEngine()
+    for state, crop, prices in (("Punjab", "Wheat", punjab), ("BIHAR", "rice", bihar)):
+        for i, price in enumerate(prices):
+            incremental.observe(state, crop, price, datetime(2024, 1, 1) + timedelta(days=i))
+
+    for state, crop in (("Punjab", "Wheat"), ("Bihar", "Rice")):
+        fast, slow = rebuilt.get(state, crop), incremental.get(state, crop)
+        assert fast.count == slow.count
+        assert fast.last_observed == slow.last_observed
+        for field in ("last_price", "ema_fast", "ema_slow", "return_mean", "return_var"):
+            assert getattr(fast, field) == pytest.approx(getattr(slow, field), rel=1e-9), field
+        assert fast.to_dict() == slow.to_dict()
+
+
+def test_moving_averages_and_momentum():
+    engine = TrendEngine()
+    for price in (100, 110, 120):
+        stats = engine.observe("Punjab", "Wheat", price)
+
+    fast, slow = 2 / (FAST_SPAN + 1), 2 / (SLOW_SPAN + 1)
+    ema_fast = ema_slow = 100
+    for price in (110, 120):
+        ema_fast += fast * (price - ema_fast)
+        ema_slow += slow * (price - ema_slow)
+    assert stats.ema_fast == pytest.approx(ema_fast)
+    assert stats.ema_slow == pytest.approx(ema_slow)
+    assert stats.momentum == pytest.approx((ema_fast - ema_slow) / ema_slow)
+    # Returns of +10% then +9.09%
+    assert stats.return_mean == pytest.approx(0.1 + slow * (120 / 110 - 1.1))
+
+
+@pytest.mark.parametrize("prices, signal", [
+    ([2000.0] * 4, "insufficient_data"),
+    ([2000.0] * 20, "neutral"),
+    ([2000.0 * 1.02 ** i for i in range(20)], "hold"),
+    ([2000.0 * 0.98 ** i for i in range(20)], "sell"),
+])
+def test_signal_follows_momentum(prices, signal):
+    engine = TrendEngine()
+    engine.rebuild(_daily_prices("Punjab", "Wheat", prices))
+
+    stats = engine.get("Punjab", "Wheat")
+    assert stats.signal == signal
+    advice = engine.recommendation("Punjab", "Wheat")
+    if signal == "insufficient_data":
+        assert advice is None
+    else:
+        assert advice.startswith({"neutral": "Prices are stable", "hold": "Prices are rising",
+                                  "sell": "Prices are falling"}[signal])
+        assert "volatile" not in advice
+
+
+def test_volatile_series_adds_a_warning():
+    engine = TrendEngine()
+    engine.rebuild(_daily_prices("Punjab", "Wheat", [2000.0, 2300.0] * 10))
+
+    stats = engine.get("Punjab", "Wheat")
+    assert stats.volatility > 0.05
+    assert stats.to_dict()["volatility_pct"] == round(stats.volatility * 100, 2)
+    assert "volatile" in engine.recommendation("Punjab", "Wheat")
+    assert "उतार-चढ़ाव" in engine.recommendation("Punjab", "Wheat", "hi")
+
+
+def test_rebuild_published_by_one_worker_is_loaded_by_another(tmp_path):
+    path = tmp_path / "trends.snapshot"
+    rebuilding, other = TrendEngine(), TrendEngine()
+    publisher = TrendStore(rebuilding, path)
+    reader = TrendStore(other, path, check_interval=0)
+    loads = []
+    reader.on_load(lambda: loads.append(other.stats()["series"]))
+    other.observe("Punjab", "Wheat", 2000)
+
+    rebuilding.rebuild(pd.concat([
+        _daily_prices("Punjab", "Wheat", [2000 + 10 * i for i in range(40)]),
+        _daily_prices("Bihar", "Rice", [2100 - 5 * i for i in range(40)]),
+    ]))
+    publisher.publish(rebuilding.export())
+
+    assert reader.refresh()
+    assert loads == [2]
+    for state, crop in (("Punjab", "Wheat"), ("Bihar", "Rice")):
+        assert other.get(state, crop).to_dict() == rebuilding.get(state, crop).to_dict()
+    assert other.recommendation("Punjab", "Wheat") == rebuilding.recommendation("Punjab", "Wheat")
+    # Nothing new since
+    assert not reader.refresh()
+    # The publisher already has the series it published
+    assert not publisher.refresh(force=True)
+    assert publisher.stats()["publishes"] == 1 and reader.stats()["loads"] == 1
+
+
+def test_loaded_series_keep_updating_incrementally(tmp_path):
+    path = tmp_path / "trends.snapshot"
+    rebuilt = TrendEngine()
+    rebuilt.rebuild(_daily_prices("Punjab", "Wheat", [2000.0] * 10))
+    TrendStore(rebuilt, path).publish(rebuilt.export())
+    loaded = TrendEngine()
+    assert TrendStore(loaded, path).refresh(force=True)
+
+    for engine in (rebuilt, loaded):
+        engine.observe("Punjab", "Wheat", 2200, datetime(2024, 1, 11))
+    assert loaded.get("punjab", "wheat").to_dict() == rebuilt.get("Punjab", "Wheat").to_dict()
+
+
+def test_missing_or_unreadable_snapshot_keeps_current_series(tmp_path):
+    path = tmp_path / "trends.snapshot"
+    engine = TrendEngine()
+    engine.observe("Punjab", "Wheat", 2000)
+    store = TrendStore(engine, path)
+    assert not store.refresh(force=True)
+
+    path.write_bytes(b"garbage" * 20)
+    assert not store.refresh(force=True)
+    assert store.stats()["errors"] == 1
+    assert engine.get("Punjab", "Wheat").last_price == 2000
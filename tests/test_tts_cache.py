@@ -0,0 +1,92 @@
+import asyncio
+import os
+
+from tts_cache import TTSAudioCache, tts_cache_key
+
+
+class FakeSynthesizer:
+    def __init__(self, size: int = 1000):
+        self.size = size
+        self.calls = 0
+
+    async def __call__(self, text, language, voice):
+        self.calls += 1
+        return text.encode("utf-8").ljust(self.size, b"\0")
+
+
+def _age(cache: TTSAudioCache, text: str, seconds_ago: float) -> None:
+    path = cache.path(tts_cache_key(text, "hi", "standard"))
+    stamp = path.stat().st_mtime - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_workers_share_one_budget_and_lru_order(tmp_path):
+    synthesize = FakeSynthesizer()
+    # Two processes' caches on one directory
+    first = TTSAudioCache(tmp_path, max_bytes=3500)
+    second = TTSAudioCache(tmp_path, max_bytes=3500)
+
+    async def run():
+        for age, text in enumerate(["one", "two", "three"]):
+            await first.get_or_synthesize(text, "hi", "standard", synthesize)
+            _age(first, text, 100 - age * 10)
+        # Used again by the other worker: now the most recently used
+        assert (await second.get_or_synthesize("one", "hi", "standard", synthesize))[2]
+        await second.get_or_synthesize("four", "hi", "standard", synthesize)
+
+    asyncio.run(run())
+    remaining = sorted(path.stem for path in tmp_path.glob("*/*.wav"))
+    # Evicted down to 90% of the budget, least recently used first
+    assert remaining == sorted(tts_cache_key(text, "hi", "standard") for text in ("one", "three", "four"))
+    assert second.stats()["bytes"] == 3000 and second.stats()["entries"] == 3
+    assert second.counters["evictions"] == 1
+    assert first.lookup(tts_cache_key("two", "hi", "standard")) is None
+    # A restart reads the shared totals instead of starting from zero
+    assert TTSAudioCache(tmp_path, max_bytes=3500).stats()["bytes"] == 3000
+
+
+def test_clip_removed_by_another_worker_is_a_miss(tmp_path):
+    synthesize = FakeSynthesizer()
+    cache = TTSAudioCache(tmp_path, max_bytes=10_000)
+
+    async def run():
+        await cache.get_or_synthesize("hello", "hi", "standard", synthesize)
+        cache.path(tts_cache_key("hello", "hi", "standard")).unlink()
+        key, clip, cached = await cache.open_clip("hello", "hi", "standard", synthesize)
+        with clip:
+            return cached, clip.read()
+
+    cached, audio = asyncio.run(run())
+    assert not cached
+    assert audio.startswith(b"hello")
+    assert synthesize.calls == 2
+    assert cache.counters["misses"] == 2
+
+
+def test_open_clip_stays_readable_after_eviction(tmp_path):
+    synthesize = FakeSynthesizer(size=100_000)
+    cache = TTSAudioCache(tmp_path, max_bytes=150_000)
+
+    async def run():
+        await cache.get_or_synthesize("first", "hi", "standard", synthesize)
+        key, clip, _ = await cache.open_clip("first", "hi", "standard", synthesize)
+        _age(cache, "first", 60)
+        # Another worker's write evicts the clip while this response is still streaming it
+        await TTSAudioCache(tmp_path, max_bytes=150_000).get_or_synthesize("second", "hi", "standard", synthesize)
+        assert not cache.path(key).exists()
+        with clip:
+            return clip.read()
+
+    audio = asyncio.run(run())
+    assert len(audio) == 100_000 and audio.startswith(b"first")
+
+
+def test_missing_index_is_rebuilt_from_disk(tmp_path):
+    synthesize = FakeSynthesizer()
+    cache = TTSAudioCache(tmp_path, max_bytes=10_000)
+    for text in ("a", "b"):
+        asyncio.run(cache.get_or_synthesize(text, "hi", "standard", synthesize))
+    (tmp_path / "index").unlink()
+
+    stats = TTSAudioCache(tmp_path, max_bytes=10_000).stats()
+    assert stats["bytes"] == 2000 and stats["entries"] == 2
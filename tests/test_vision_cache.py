@@ -0,0 +1,115 @@
+import asyncio
+import random
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import vision_cache
+from vision_cache import VisionResultCache, hamming_distance, hash_bands
+
+PHASH = 0x0F0F_3C3C_A5A5_FF00
+
+
+def _flip(phash: int, *bits: int) -> int:
+    for bit in bits:
+        phash ^= 1 << bit
+    return phash
+
+
+def _result(name: str):
+    return {"disease_name": name, "confidence": 0.9}
+
+
+def test_hashes_within_max_distance_always_share_a_band():
+    rng = random.Random(7)
+    for max_distance in (0, 1, 4, 10):
+        for _ in range(200):
+            phash = rng.getrandbits(64)
+            near = _flip(phash, *rng.sample(range(64), max_distance))
+            assert hamming_distance(phash, near) == max_distance
+            assert set(hash_bands(phash, max_distance + 1)) & set(hash_bands(near, max_distance + 1))
+
+
+def test_memory_tier_matches_exact_and_near_duplicates():
+    cache = VisionResultCache(max_distance=4)
+
+    async def run():
+        await cache.put("sha-a", PHASH, _result("Rust"))
+        exact = await cache.get("sha-a", None)
+        near = await cache.get("sha-b", _flip(PHASH, 0, 17, 40, 63))
+        far = await cache.get("sha-c", _flip(PHASH, 0, 17, 40, 62, 63))
+        return exact, near, far
+
+    exact, near, far = asyncio.run(run())
+    assert exact == near == _result("Rust")
+    assert far is None
+    assert cache.counters["exact_hits"] == 1 and cache.counters["perceptual_hits"] == 1
+    assert cache.counters["misses"] == 1
+
+
+def test_memory_tier_prefers_the_closest_match():
+    cache = VisionResultCache(max_distance=4)
+
+    async def run():
+        await cache.put("far", _flip(PHASH, 1, 2, 3), _result("Blight"))
+        await cache.put("close", _flip(PHASH, 1), _result("Rust"))
+        return await cache.get("new", PHASH)
+
+    assert asyncio.run(run()) == _result("Rust")
+
+
+def test_persistent_tier_uses_the_same_distance():
+    collection = AsyncMongoMockClient()["kisan_test"]["vision_cache"]
+
+    async def run():
+        await VisionResultCache(max_distance=4, collection=collection).put("sha-a", PHASH, _result("Rust"))
+        # A fresh process: nothing in memory, so both lookups go to MongoDB
+        restarted = VisionResultCache(max_distance=4, collection=collection)
+        near = await restarted.get("sha-b", _flip(PHASH, 5, 30, 50))
+        far = await VisionResultCache(max_distance=4, collection=collection).get(
+            "sha-c", _flip(PHASH, 5, 30, 50, 51, 52)
+        )
+        return restarted, near, far
+
+    restarted, near, far = asyncio.run(run())
+    assert near == _result("Rust") and far is None
+    assert restarted.counters["persistent_hits"] == 1
+
+
+def test_evicted_and_expired_entries_stop_matching(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(vision_cache.time, "monotonic", lambda: now[0])
+    cache = VisionResultCache(max_entries=2, ttl_seconds=60)
+
+    async def run():
+        await cache.put("oldest", PHASH, _result("Rust"))
+        await cache.put("b", _flip(PHASH, 20, 21, 22, 23, 24, 25, 26, 27), _result("Blight"))
+        await cache.put("c", ~PHASH & (2 ** 64 - 1), _result("Mildew"))
+        evicted = await cache.get("x", _flip(PHASH, 1))
+        now[0] += 61
+        expired = await cache.get("y", _flip(~PHASH & (2 ** 64 - 1), 1))
+        return evicted, expired
+
+    evicted, expired = asyncio.run(run())
+    assert evicted is None and expired is None
+    assert cache.counters["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+    # The band index holds only what is still in the LRU
+    assert set().union(*cache._bands.values()) == {"b", "c"}
+
+
+def test_max_distance_must_fit_the_hash():
+    with pytest.raises(ValueError):
+        VisionResultCache(max_distance=64)
+
+
+def test_ensure_indexes_expires_entries_and_indexes_bands():
+    collection = AsyncMongoMockClient()["kisan_test"]["vision_cache"]
+
+    async def run():
+        await VisionResultCache(ttl_seconds=3600, collection=collection).ensure_indexes()
+        return await collection.index_information()
+
+    indexes = {tuple(index["key"]): index for index in asyncio.run(run()).values()}
+    assert indexes[(("created_at", 1),)]["expireAfterSeconds"] == 3600
+    assert (("phash_bands", 1),) in indexes
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from voice_pipeline import SentenceSplitter, speak_as_generated
+
+
+async def _stream(chunks, events=None, fail=None):
+    for chunk in chunks:
+        await asyncio.sleep(0)
+        if events is not None:
+            events.append(("chunk", chunk))
+        yield chunk
+    if fail:
+        raise fail
+
+
+def test_sentences_are_cut_across_chunk_boundaries():
+    splitter = SentenceSplitter(min_chars=10)
+
+    assert splitter.feed("Spray neem oil every ") == []
+    assert splitter.feed("evening. Repeat for a") == ["Spray neem oil every evening."]
+    assert splitter.feed(" week! Then") == ["Repeat for a week!"]
+    assert splitter.flush() == "Then"
+    assert splitter.flush() is None
+
+
+def test_danda_and_closing_quotes_end_sentences():
+    splitter = SentenceSplitter(min_chars=5)
+
+    assert splitter.feed("पत्तों पर नीम का तेल छिड़कें। हर हफ्ते दोहराएं॥ ") == [
+        "पत्तों पर नीम का तेल छिड़कें।", "हर हफ्ते दोहराएं॥"
+    ]
+    assert splitter.feed('He said "water less." Then (wait.) ok') == ['He said "water less."', "Then (wait.)"]
+
+
+def test_short_fragments_join_the_next_sentence():
+    splitter = SentenceSplitter(min_chars=20)
+
+    # "Dr." and "2-3 days." are too short to speak on their own
+    assert splitter.feed("Ask Dr. Rao. Wait 2-3 days. Then spray again. ") == ["Ask Dr. Rao. Wait 2-3 days."]
+    # A decimal point isn't followed by a space, so it doesn't end a sentence
+    assert splitter.feed("Use 2.5 ml per litre of water") == []
+    assert splitter.flush() == "Then spray again. Use 2.5 ml per litre of water"
+
+
+def test_sentences_come_out_in_order_while_the_answer_streams():
+    events = []
+    delays = {"First sentence is long.": 0.03, "Second sentence is long.": 0.0}
+
+    async def synthesize(sentence):
+        events.append(("tts_start", sentence))
+        await asyncio.sleep(delays.get(sentence, 0.0))
+        return sentence.upper()
+
+    async def run():
+        timings = {}
+        results = []
+        chunks = ["First sentence is long. ", "Second sentence is long. ", "And the tail"]
+        async for index, sentence, speech in speak_as_generated(
+            _stream(chunks, events), synthesize, timings, time.perf_counter()
+        ):
+            events.append(("yield", sentence))
+            results.append((index, sentence, speech))
+        return results, timings
+
+    results, timings = asyncio.run(run())
+    # The slow first clip still comes out first
+    assert results == [
+        (0, "First sentence is long.", "FIRST SENTENCE IS LONG."),
+        (1, "Second sentence is long.", "SECOND SENTENCE IS LONG."),
+        (2, "And the tail", "AND THE TAIL"),
+    ]
+    # Synthesis of the first sentence starts before the rest of the answer has arrived
+    assert events.index(("tts_start", "First sentence is long.")) < events.index(("chunk", "And the tail"))
+    assert set(timings) == {"first_token_ms", "answer_ms", "tts_ms"}
+    assert timings["first_token_ms"] <= timings["answer_ms"]
+    assert timings["tts_ms"] >= 30
+
+
+def test_stream_errors_surface_after_the_sentences_already_spoken():
+    async def synthesize(sentence):
+        return sentence
+
+    async def run():
+        spoken = []
+        with pytest.raises(ConnectionError):
+            async for _, sentence, _ in speak_as_generated(
+                _stream(["One complete sentence here. ", "half a"], fail=ConnectionError("stream dropped")),
+                synthesize, {}, time.perf_counter()
+            ):
+                spoken.append(sentence)
+        return spoken
+
+    assert asyncio.run(run()) == ["One complete sentence here."]
+
+
+def test_closing_early_cancels_pending_synthesis():
+    cancelled = []
+
+    async def synthesize(sentence):
+        try:
+            await asyncio.sleep(0 if sentence.startswith("One") else 10)
+        except asyncio.CancelledError:
+            cancelled.append(sentence)
+            raise
+        return sentence
+
+    async def run():
+        chunks = ["One complete sentence here. ", "Two complete sentences here. ", "Three complete ones here. "]
+        pipeline = speak_as_generated(_stream(chunks), synthesize, {}, time.perf_counter())
+        first = await pipeline.__anext__()
+        await pipeline.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    assert asyncio.run(run())[1] == "One complete sentence here."
+    assert "Two complete sentences here." in cancelled
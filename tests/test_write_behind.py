@@ -0,0 +1,75 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import AutoReconnect
+
+from write_behind import WriteBehindQueue
+
+
+class DropsReplyOnce:
+    """Stores the first ``stored`` documents of the first batch, then fails as if the connection dropped"""
+
+    def __init__(self, collection, stored: int):
+        self.collection = collection
+        self.stored = stored
+        self.attempts = 0
+
+    async def insert_many(self, documents, ordered=True):
+        self.attempts += 1
+        if self.attempts == 1:
+            # Like the real driver, _id is assigned to every document before anything is sent
+            await self.collection.insert_many(documents[:self.stored], ordered=ordered)
+            for document in documents[self.stored:]:
+                document.setdefault("_id", f"retry-{id(document)}")
+            raise AutoReconnect("connection closed")
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+
+def _run_batch(collection, documents):
+    written = []
+
+    async def after_write(batch):
+        written.extend(batch)
+
+    async def run():
+        # One batch, flushed by stop()
+        queue = WriteBehindQueue(
+            collection, max_batch_size=len(documents), flush_interval_ms=1000, after_write=after_write
+        )
+        for document in documents:
+            await queue.enqueue(document)
+        await queue.stop()
+        return queue
+
+    return asyncio.run(run()), written
+
+
+def test_documents_stored_by_a_failed_attempt_count_as_written_on_retry(monkeypatch):
+    async def no_backoff(seconds):
+        pass
+
+    # Skip the retry backoff
+    monkeypatch.setattr(asyncio, "sleep", no_backoff)
+    store = AsyncMongoMockClient()["kisan_test"].crop_analyses
+    collection = DropsReplyOnce(store, stored=3)
+    documents = [{"n": n} for n in range(5)]
+
+    queue, written = _run_batch(collection, documents)
+
+    assert collection.attempts == 2
+    assert queue.counters["retries"] == 1
+    assert queue.counters["written"] == 5 and queue.counters["failed"] == 0
+    # The rollup hook sees every stored document, including the ones the first attempt wrote
+    assert sorted(document["n"] for document in written) == [0, 1, 2, 3, 4]
+    assert asyncio.run(store.count_documents({})) == 5
+
+
+def test_duplicates_on_first_attempt_are_rejected():
+    store = AsyncMongoMockClient()["kisan_test"].crop_analyses
+    asyncio.run(store.insert_one({"_id": "taken", "n": 0}))
+    documents = [{"_id": "taken", "n": 1}, {"_id": "fresh", "n": 2}]
+
+    queue, written = _run_batch(store, documents)
+
+    assert queue.counters["written"] == 1 and queue.counters["failed"] == 1
+    assert [document["_id"] for document in written] == ["fresh"]